@@ -0,0 +1,17 @@
+SELECT      strftime('%Y-%m-%dT%H:%M:%SZ', r.PeriodStart, 'unixepoch') AS Timestamp,
+            MAX(CASE WHEN r.Metric = 'temperature' THEN r.Sum / r.Count END) AS Temperature,
+            MAX(CASE WHEN r.Metric = 'temperature' THEN r.Min END) AS Temperature_Min,
+            MAX(CASE WHEN r.Metric = 'temperature' THEN r.Max END) AS Temperature_Max,
+            MAX(CASE WHEN r.Metric = 'pressure' THEN r.Sum / r.Count END) AS Pressure,
+            MAX(CASE WHEN r.Metric = 'pressure' THEN r.Min END) AS Pressure_Min,
+            MAX(CASE WHEN r.Metric = 'pressure' THEN r.Max END) AS Pressure_Max,
+            MAX(CASE WHEN r.Metric = 'humidity' THEN r.Sum / r.Count END) AS Humidity,
+            MAX(CASE WHEN r.Metric = 'humidity' THEN r.Min END) AS Humidity_Min,
+            MAX(CASE WHEN r.Metric = 'humidity' THEN r.Max END) AS Humidity_Max,
+            MAX(r.Count) AS Count
+FROM        READING_ROLLUPS r
+WHERE       r.Granularity = '$GRANULARITY'
+AND         r.Sensor = 'BME280'
+AND         (($DAYS IS NULL) OR ($DAYS IS NOT NULL AND r.PeriodStart >= CAST(strftime('%s', 'now', '-$DAYS days') AS INTEGER)))
+GROUP BY    r.PeriodStart
+ORDER BY    r.PeriodStart ASC;
@@ -0,0 +1,3 @@
+SELECT      Timestamp, Task, Rows, Chunks, Pages_Freed, Elapsed_MS
+FROM        MAINTENANCE_LOG
+ORDER BY    Timestamp ASC;
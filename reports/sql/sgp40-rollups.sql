@@ -0,0 +1,14 @@
+SELECT      strftime('%Y-%m-%dT%H:%M:%SZ', r.PeriodStart, 'unixepoch') AS Timestamp,
+            MAX(CASE WHEN r.Metric = 'sraw' THEN r.Sum / r.Count END) AS SRAW,
+            MAX(CASE WHEN r.Metric = 'sraw' THEN r.Min END) AS SRAW_Min,
+            MAX(CASE WHEN r.Metric = 'sraw' THEN r.Max END) AS SRAW_Max,
+            MAX(CASE WHEN r.Metric = 'voc_index' THEN r.Sum / r.Count END) AS VOCIndex,
+            MAX(CASE WHEN r.Metric = 'voc_index' THEN r.Min END) AS VOCIndex_Min,
+            MAX(CASE WHEN r.Metric = 'voc_index' THEN r.Max END) AS VOCIndex_Max,
+            MAX(r.Count) AS Count
+FROM        READING_ROLLUPS r
+WHERE       r.Granularity = '$GRANULARITY'
+AND         r.Sensor = 'SGP40'
+AND         (($DAYS IS NULL) OR ($DAYS IS NOT NULL AND r.PeriodStart >= CAST(strftime('%s', 'now', '-$DAYS days') AS INTEGER)))
+GROUP BY    r.PeriodStart
+ORDER BY    r.PeriodStart ASC;
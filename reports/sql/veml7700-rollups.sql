@@ -0,0 +1,11 @@
+SELECT      strftime('%Y-%m-%dT%H:%M:%SZ', r.PeriodStart, 'unixepoch') AS Timestamp,
+            r.Sum / r.Count AS Illuminance,
+            r.Min AS Illuminance_Min,
+            r.Max AS Illuminance_Max,
+            r.Count AS Count
+FROM        READING_ROLLUPS r
+WHERE       r.Granularity = '$GRANULARITY'
+AND         r.Sensor = 'VEML7700'
+AND         r.Metric = 'illuminance'
+AND         (($DAYS IS NULL) OR ($DAYS IS NOT NULL AND r.PeriodStart >= CAST(strftime('%s', 'now', '-$DAYS days') AS INTEGER)))
+ORDER BY    r.PeriodStart ASC;
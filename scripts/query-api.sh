@@ -34,6 +34,10 @@ endpoints=(
   "bme/latest"
   "veml/latest"
   "sgp/latest"
+  "latest"
+  "bme/history?step=1h"
+  "veml/history?step=1h"
+  "sgp/history?step=1h"
 )
 
 # Iterate over the endpoints
@@ -24,8 +24,16 @@ def simple():
 def graphical():
     return render_template("graphical.html")
 
+# A single session reuses the connection to the weather service between polls. The most recent
+# response and its ETag are kept, so an unchanged response is a 304 with no body
+session = requests.Session()
+latest_etag = None
+latest_readings = None
+
 @app.route("/api/current")
 def current_weather():
+    global latest_etag, latest_readings
+
     WEATHER_SCHEME = os.getenv("WEATHER_SCHEME")
     WEATHER_HOST = os.getenv("WEATHER_HOST")
     WEATHER_PORT = os.getenv("WEATHER_PORT")
@@ -33,26 +41,19 @@ def current_weather():
     TIMEOUT = int(os.getenv("TIMEOUT"))
 
     try:
-        # Get the latest BME280 readings
-        resp = requests.get(f"{WEATHER_API_BASE_URL}/bme/latest", timeout=TIMEOUT)
-        resp.raise_for_status()
-        bme_readings = resp.json()
-
-        # Get the latest VEML7700 readings
-        resp = requests.get(f"{WEATHER_API_BASE_URL}/veml/latest", timeout=TIMEOUT)
-        resp.raise_for_status()
-        veml_readings = resp.json()
-
-        # Get the latest SGP40 readings
-        resp = requests.get(f"{WEATHER_API_BASE_URL}/sgp/latest", timeout=TIMEOUT)
+        # Get the latest readings for all the sensors in one request
+        headers = {"If-None-Match": latest_etag} if latest_etag else {}
+        resp = session.get(f"{WEATHER_API_BASE_URL}/latest", headers=headers, timeout=TIMEOUT)
         resp.raise_for_status()
-        sgp_readings = resp.json()
+        if resp.status_code != 304:
+            latest_readings = resp.json()
+            latest_etag = resp.headers.get("ETag")
 
         # Build the response data
         data = {
-            "bme": bme_readings,
-            "veml": veml_readings,
-            "sgp": sgp_readings
+            "bme": latest_readings["bme"],
+            "veml": latest_readings["veml"],
+            "sgp": latest_readings["sgp"]
         }
 
     except Exception as e:
@@ -1,5 +1,14 @@
-from .database import Database
+from .database import Database, DEFAULT_JOURNAL_MODE, DEFAULT_SYNCHRONOUS, DEFAULT_SCHEMA_VERSION
+from .database_maintenance import DatabaseMaintenance
+from .overflow_policy import OverflowPolicy
+from .write_queue import WriteQueue
 
 __all__ = [
-    "Database"
+    "Database",
+    "DEFAULT_JOURNAL_MODE",
+    "DEFAULT_SYNCHRONOUS",
+    "DEFAULT_SCHEMA_VERSION",
+    "DatabaseMaintenance",
+    "OverflowPolicy",
+    "WriteQueue"
 ]
@@ -1,10 +1,63 @@
 import sqlite3
+import logging
+import threading
+import time
 import datetime as dt
+from pathlib import Path
+from .schema_v2 import SCHEMA_VERSION as SCHEMA_VERSION_V2
+from .schema_v2 import CREATE_SQL_V2, PURGE_SQL_V2, INSERT_BME_SQL_V2, INSERT_VEML_SQL_V2, INSERT_SGP_SQL_V2
+from .schema_v2 import INSERT_DEVICE_SQL, SELECT_DEVICE_SQL, MIGRATE_DEVICES_SQL, MIGRATE_READINGS_SQL
+from .schema_v2 import SELECT_ID_RANGE_SQL, DROP_V1_SQL
+from .rollups import ROLLUP_GRANULARITIES, ROLLUP_METRICS, CREATE_ROLLUPS_SQL, UPSERT_ROLLUP_SQL, DELETE_ROLLUPS_SQL
+from .rollups import SELECT_ROLLUPS_TABLE_SQL, EPOCH_EXPRESSION_V1, EPOCH_EXPRESSION_V2, rebuild_rollup_sql
+from .size_estimates import CREATE_SIZE_ESTIMATES_SQL, SELECT_SIZE_ESTIMATES_TABLE_SQL, SELECT_SIZE_ESTIMATES_SQL
+from .size_estimates import ADD_SIZE_ESTIMATE_SQL, REMOVE_SIZE_ESTIMATE_SQL, SET_SIZE_ESTIMATE_SQL, DELETE_SIZE_ESTIMATES_SQL
+from .size_estimates import ESTIMATED_TABLES, estimate_record_bytes
+from .history import HISTORY_CHUNK_SIZE, HISTORY_COLUMNS, HISTORY_METRICS, rollup_granularity
+from .voc_replay import CREATE_VOC_REPLAY_SQL, INSERT_VOC_REPLAY_SQL, SELECT_VOC_REPLAY_SQL
+from .history import select_raw_history_sql, select_bucketed_history_sql, select_rollup_history_sql
 
 PURGE_INTERVAL_MINUTES = 60
 SNAPSHOT_INTERVAL_MINUTES = 60
 
-CREATE_SQL = [
+# Connection tuning. WAL journaling lets readers proceed while the sampler writes and, with
+# synchronous=NORMAL, only syncs the WAL at checkpoints rather than on every commit
+DEFAULT_JOURNAL_MODE = "WAL"
+DEFAULT_SYNCHRONOUS = "NORMAL"
+JOURNAL_MODES = ["DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"]
+SYNCHRONOUS_MODES = ["OFF", "NORMAL", "FULL", "EXTRA"]
+STATEMENT_CACHE_SIZE = 64
+BUSY_TIMEOUT_SECONDS = 5.0
+
+# Schema versions. Version 1 stores ISO-8601 text timestamps and the bus/address on every row
+SCHEMA_VERSION_V1 = 1
+DEFAULT_SCHEMA_VERSION = SCHEMA_VERSION_V1
+SCHEMA_VERSIONS = [SCHEMA_VERSION_V1, SCHEMA_VERSION_V2]
+DEFAULT_MIGRATION_CHUNK_SIZE = 5000
+
+# Purge tuning. Old rows are deleted in chunks, pausing between chunks so other threads can write,
+# and freed pages are optionally returned to the file system a few at a time
+DEFAULT_PURGE_CHUNK_SIZE = 500
+DEFAULT_PURGE_CHUNK_DELAY_SECONDS = 0.05
+INCREMENTAL_VACUUM_PAGES = 256
+AUTO_VACUUM_INCREMENTAL = 2
+
+# Window used to time a representative range query on each reading table when snapshotting sizes
+QUERY_TIMING_WINDOW_HOURS = 24
+
+# Reading types accepted by write_readings()
+BME280_READING = "BME280"
+VEML7700_READING = "VEML7700"
+SGP40_READING = "SGP40"
+
+# Version 1 and version 2 tables for each reading type
+READING_TABLES = {
+    BME280_READING: ("BME280_READINGS", "BME280_READINGS_V2"),
+    VEML7700_READING: ("VEML7700_READINGS", "VEML7700_READINGS_V2"),
+    SGP40_READING: ("SGP40_READINGS", "SGP40_READINGS_V2")
+}
+
+CREATE_SNAPSHOT_SQL = [
 """
 CREATE TABLE IF NOT EXISTS DB_SIZE_SNAPSHOTS (
     Timestamp           TEXT NOT NULL,
@@ -16,6 +69,30 @@ CREATE TABLE IF NOT EXISTS DB_SIZE_SNAPSHOTS (
 CREATE INDEX IF NOT EXISTS IX_DB_SIZE_SNAPSHOTS_TS ON DB_SIZE_SNAPSHOTS(Timestamp);
 """,
 """
+CREATE TABLE IF NOT EXISTS DB_QUERY_SNAPSHOTS (
+    Timestamp           TEXT NOT NULL,
+    Object_Name         TEXT NOT NULL,
+    Window_Hours        INTEGER NOT NULL,
+    Rows                INTEGER NOT NULL,
+    Elapsed_MS          REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_DB_QUERY_SNAPSHOTS_TS ON DB_QUERY_SNAPSHOTS(Timestamp);
+""",
+"""
+CREATE TABLE IF NOT EXISTS MAINTENANCE_LOG (
+    Timestamp           TEXT NOT NULL,
+    Task                TEXT NOT NULL,
+    Rows                INTEGER NOT NULL,
+    Chunks              INTEGER NOT NULL,
+    Pages_Freed         INTEGER NOT NULL,
+    Elapsed_MS          REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS IX_MAINTENANCE_LOG_TS ON MAINTENANCE_LOG(Timestamp);
+"""
+]
+
+CREATE_SQL = [
+"""
 CREATE TABLE IF NOT EXISTS BME280_READINGS (
     Id                  INTEGER PRIMARY KEY AUTOINCREMENT,
     Timestamp           TEXT NOT NULL,
@@ -57,20 +134,36 @@ CREATE INDEX IF NOT EXISTS IX_SGP40_READINGS_TS ON SGP40_READINGS (Timestamp);
 """
 ]
 
-PURGE_SQL = [
-"""
-DELETE FROM BME280_READINGS WHERE Timestamp <= ?;
+# Purge statements delete at most a limited number of rows (the second parameter) at a time, so
+# old data can be removed in a series of short transactions
+PURGE_SQL = {
+"BME280_READINGS": """
+DELETE FROM BME280_READINGS WHERE Id IN (SELECT Id FROM BME280_READINGS WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
 """,
-"""
-DELETE FROM VEML7700_READINGS WHERE Timestamp <= ?;
+"VEML7700_READINGS": """
+DELETE FROM VEML7700_READINGS WHERE Id IN (SELECT Id FROM VEML7700_READINGS WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
 """,
+"SGP40_READINGS": """
+DELETE FROM SGP40_READINGS WHERE Id IN (SELECT Id FROM SGP40_READINGS WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
 """
-DELETE FROM SGP40_READINGS WHERE Timestamp <= ?;
+}
+
+PURGE_SNAPSHOTS_SQL = {
+"DB_SIZE_SNAPSHOTS": """
+DELETE FROM DB_SIZE_SNAPSHOTS WHERE rowid IN (SELECT rowid FROM DB_SIZE_SNAPSHOTS WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
+""",
+"DB_QUERY_SNAPSHOTS": """
+DELETE FROM DB_QUERY_SNAPSHOTS WHERE rowid IN (SELECT rowid FROM DB_QUERY_SNAPSHOTS WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
 """,
+"MAINTENANCE_LOG": """
+DELETE FROM MAINTENANCE_LOG WHERE rowid IN (SELECT rowid FROM MAINTENANCE_LOG WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
 """
-DELETE FROM DB_SIZE_SNAPSHOTS WHERE Timestamp <= ?;
+}
+
+INSERT_MAINTENANCE_LOG_SQL = """
+INSERT INTO MAINTENANCE_LOG (Timestamp, Task, Rows, Chunks, Pages_Freed, Elapsed_MS)
+VALUES (?,?,?,?,?,?);
 """
-]
 
 INSERT_SIZES_SQL = """
 INSERT INTO DB_SIZE_SNAPSHOTS (Timestamp, Object_Type, Object_Name, Bytes, Method)
@@ -92,6 +185,22 @@ INSERT INTO SGP40_READINGS (Timestamp, SRAW, VOCIndex, Label, Rating, Bus, Addre
 VALUES (?, ?, ?, ?, ?, ?, ?);
 """
 
+INSERT_QUERY_SNAPSHOT_SQL = """
+INSERT INTO DB_QUERY_SNAPSHOTS (Timestamp, Object_Name, Window_Hours, Rows, Elapsed_MS)
+VALUES (?,?,?,?,?);
+"""
+
+# Representative range queries, used to compare query speed between schema versions. The version 1
+# tables are queried using ISO-8601 text cutoffs and the version 2 tables using epoch seconds
+SELECT_QUERY_TIMING_SQL = {
+    "BME280_READINGS": "SELECT COUNT(*), AVG(Temperature), AVG(Pressure), AVG(Humidity) FROM BME280_READINGS WHERE Timestamp >= ?;",
+    "VEML7700_READINGS": "SELECT COUNT(*), AVG(Illuminance) FROM VEML7700_READINGS WHERE Timestamp >= ?;",
+    "SGP40_READINGS": "SELECT COUNT(*), AVG(VOCIndex) FROM SGP40_READINGS WHERE Timestamp >= ?;",
+    "BME280_READINGS_V2": "SELECT COUNT(*), AVG(Temperature), AVG(Pressure), AVG(Humidity) FROM BME280_READINGS_V2 WHERE Timestamp >= ?;",
+    "VEML7700_READINGS_V2": "SELECT COUNT(*), AVG(Illuminance) FROM VEML7700_READINGS_V2 WHERE Timestamp >= ?;",
+    "SGP40_READINGS_V2": "SELECT COUNT(*), AVG(VOCIndex) FROM SGP40_READINGS_V2 WHERE Timestamp >= ?;"
+}
+
 SELECT_TABLES_SQL = """
 SELECT name FROM sqlite_master
 WHERE type='table' AND name NOT LIKE 'sqlite_%'
@@ -120,6 +229,28 @@ AND Timestamp <  ?
 LIMIT 1;
 """
 
+def utc_timestamp():
+    """
+    Return the current UTC time as an ISO-8601 string, to the nearest second
+    """
+    return dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat() + "Z"
+
+
+def epoch_seconds(timestamp):
+    """
+    Convert an ISO-8601 timestamp, as returned by utc_timestamp(), to UTC epoch seconds
+    """
+    parsed = dt.datetime.strptime(timestamp[:19], "%Y-%m-%dT%H:%M:%S")
+    return int(parsed.replace(tzinfo=dt.timezone.utc).timestamp())
+
+
+def iso_timestamp(epoch):
+    """
+    Convert UTC epoch seconds to an ISO-8601 timestamp in the format returned by utc_timestamp()
+    """
+    return dt.datetime.fromtimestamp(epoch, dt.timezone.utc).isoformat() + "Z"
+
+
 class Database:
     db_path: str = None
     retention: int = None
@@ -129,8 +260,23 @@ class Database:
     veml_gain: float = None
     veml_integration_time_ms: int = None
     sgp_addr: str = None
+    journal_mode: str = None
+    synchronous: str = None
+    schema_version: int = None
+
+    def __init__(self, db_path, retention, bus, bme_address, veml_address, veml_gain, veml_integration_time_ms, sgp_address,
+                 journal_mode=DEFAULT_JOURNAL_MODE, synchronous=DEFAULT_SYNCHRONOUS, schema_version=DEFAULT_SCHEMA_VERSION):
+        # The journal mode and synchronous setting are interpolated into PRAGMA statements so
+        # only accept known values
+        journal_mode = journal_mode.upper()
+        synchronous = synchronous.upper()
+        if journal_mode not in JOURNAL_MODES:
+            raise ValueError(f"Invalid journal mode: {journal_mode}")
+        if synchronous not in SYNCHRONOUS_MODES:
+            raise ValueError(f"Invalid synchronous setting: {synchronous}")
+        if schema_version not in SCHEMA_VERSIONS:
+            raise ValueError(f"Invalid schema version: {schema_version}")
 
-    def __init__(self, db_path, retention, bus, bme_address, veml_address, veml_gain, veml_integration_time_ms, sgp_address):
         self.db_path = db_path
         self.retention = retention
         self.bus = bus
@@ -139,8 +285,64 @@ class Database:
         self.veml_gain = veml_gain
         self.veml_integration_time_ms = veml_integration_time_ms
         self.sgp_address = sgp_address
+        self.journal_mode = journal_mode
+        self.synchronous = synchronous
+        self.schema_version = schema_version
+        self.device_ids = {}
         self.last_purged = None
         self.last_snapshot_check = None
+        self.connection = None
+        self.lock = threading.RLock()
+
+    # --------------------------------------------------
+    # Connection management
+    # --------------------------------------------------
+
+    def _connect(self):
+        """
+        Open and configure a new connection. The connection is shared between the sampler and
+        HTTP threads, so access to it is serialised using the database lock
+        """
+        con = sqlite3.connect(
+            self.db_path,
+            timeout=BUSY_TIMEOUT_SECONDS,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE)
+
+        # Incremental auto-vacuum only takes effect if it's set before the database is created (or
+        # when it's next vacuumed) and must precede the journal mode, which writes the file header
+        con.execute("PRAGMA auto_vacuum=INCREMENTAL;")
+        con.execute(f"PRAGMA journal_mode={self.journal_mode};")
+        con.execute(f"PRAGMA synchronous={self.synchronous};")
+        return con
+
+    def _get_connection(self):
+        """
+        Return the long-lived connection, opening it on first use. Callers must hold the lock
+        """
+        if self.connection is None:
+            self.connection = self._connect()
+        return self.connection
+
+    def close(self):
+        """
+        Checkpoint the WAL and close the long-lived connection
+        """
+        with self.lock:
+            if self.connection is not None:
+                try:
+                    if self.journal_mode == "WAL":
+                        self.connection.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+                    self.connection.execute("PRAGMA optimize;")
+                except sqlite3.Error as ex:
+                    logging.warning("Error checkpointing database: %s", ex)
+                finally:
+                    self.connection.close()
+                    self.connection = None
+
+    # --------------------------------------------------
+    # Size snapshot helpers
+    # --------------------------------------------------
 
     def _has_dbstat(self, con):
         try:
@@ -160,6 +362,24 @@ class Database:
         parts = [f"IFNULL(LENGTH(CAST({c} AS BLOB)),0)" for c in cols]
         return " + ".join(parts) if parts else "0"
 
+    def _snapshot_query_timings(self, con, ts, now, tables):
+        """
+        Record the time taken by a representative range query against each reading table, so the
+        query speed of the two schema versions can be compared alongside their sizes
+        """
+        start = now - dt.timedelta(hours=QUERY_TIMING_WINDOW_HOURS)
+        iso_cutoff = start.replace(microsecond=0).isoformat() + "Z"
+        epoch_cutoff = int(start.timestamp())
+
+        for t in tables:
+            sql = SELECT_QUERY_TIMING_SQL.get(t)
+            if sql:
+                cutoff = epoch_cutoff if t.endswith("_V2") else iso_cutoff
+                started = time.perf_counter()
+                rows = con.execute(sql, (cutoff,)).fetchone()[0]
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                con.execute(INSERT_QUERY_SNAPSHOT_SQL, (ts, t, QUERY_TIMING_WINDOW_HOURS, rows, round(elapsed_ms, 3)))
+
     def _has_snapshot_for_today(self, con):
         # Get the date range
         start = dt.datetime.now(dt.timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
@@ -172,23 +392,176 @@ class Database:
         except:
             pass
 
-    def _insert_reading(self, sql, params):
-        con = sqlite3.connect(self.db_path)
-        try:
-            cur = con.cursor()
-            cur.execute(sql, params)
-            con.commit()
-        finally:
-            con.close()
+    def _device_id(self, con, device_type, address):
+        """
+        Return the version 2 device lookup ID for a device, adding it to the lookup table if needed
+        """
+        key = (device_type, self.bus, address)
+        device_id = self.device_ids.get(key)
+        if device_id is None:
+            con.execute(INSERT_DEVICE_SQL, key)
+            device_id = con.execute(SELECT_DEVICE_SQL, key).fetchone()[0]
+            self.device_ids[key] = device_id
+        return device_id
+
+    def _reading_insert_v2(self, con, reading_type, timestamp, values):
+        """
+        Return the version 2 INSERT statement and parameters for a reading of the specified type
+        """
+        epoch = epoch_seconds(timestamp)
+        if reading_type == BME280_READING:
+            return INSERT_BME_SQL_V2, (epoch, self._device_id(con, reading_type, self.bme_address), *values)
+        elif reading_type == VEML7700_READING:
+            return INSERT_VEML_SQL_V2, (epoch, self._device_id(con, reading_type, self.veml_address), *values, self.veml_gain, self.veml_integration_time_ms)
+        elif reading_type == SGP40_READING:
+            return INSERT_SGP_SQL_V2, (epoch, self._device_id(con, reading_type, self.sgp_address), *values)
+
+        raise ValueError(f"Unknown reading type: {reading_type}")
+
+    def _reading_table(self, reading_type):
+        """
+        Return the name of the table holding readings of the specified type
+        """
+        v1_table, v2_table = READING_TABLES[reading_type]
+        return v2_table if self.schema_version == SCHEMA_VERSION_V2 else v1_table
+
+    def _seed_size_estimates(self, con):
+        """
+        Initialise the size estimates with a one-off scan of the reading tables. After this, they're
+        maintained as rows are written and purged. Callers must hold the lock
+        """
+        tables = [r[0] for r in con.execute(SELECT_TABLES_SQL).fetchall()]
+        with con:
+            con.execute(DELETE_SIZE_ESTIMATES_SQL)
+            for t in [t for t in ESTIMATED_TABLES if t in tables]:
+                expr = self._payload_expr_for_table(con, t)
+                rows, size = con.execute(f"SELECT COUNT(*), COALESCE(SUM({expr}),0) FROM {t};").fetchone()
+                con.execute(SET_SIZE_ESTIMATE_SQL, (t, rows, int(size)))
+
+    def _update_rollups(self, con, reading_type, timestamp, values):
+        """
+        Fold a reading into the hourly and daily rollups for each of its metrics
+        """
+        epoch = epoch_seconds(timestamp)
+        for metric, index, _, _, _ in ROLLUP_METRICS[reading_type]:
+            value = values[index]
+            if value is not None:
+                for granularity, seconds in ROLLUP_GRANULARITIES.items():
+                    period_start = (epoch // seconds) * seconds
+                    con.execute(UPSERT_ROLLUP_SQL, (granularity, reading_type, metric, period_start, value, value, value))
+
+    def _reading_insert(self, con, reading_type, timestamp, values):
+        """
+        Return the INSERT statement and parameters for a reading of the specified type
+        """
+        if self.schema_version == SCHEMA_VERSION_V2:
+            return self._reading_insert_v2(con, reading_type, timestamp, values)
+
+        if reading_type == BME280_READING:
+            return INSERT_BME_SQL, (timestamp, *values, self.bus, self.bme_address)
+        elif reading_type == VEML7700_READING:
+            return INSERT_VEML_SQL, (timestamp, *values, self.veml_gain, self.veml_integration_time_ms, self.bus, self.veml_address)
+        elif reading_type == SGP40_READING:
+            return INSERT_SGP_SQL, (timestamp, *values, self.bus, self.sgp_address)
+
+        raise ValueError(f"Unknown reading type: {reading_type}")
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
 
     def create_database(self):
-        con = sqlite3.connect(self.db_path)
-        for sql in CREATE_SQL:
-            con.executescript(sql)
-            con.commit()
-        con.close()
+        with self.lock:
+            con = self._get_connection()
+            have_rollups = con.execute(SELECT_ROLLUPS_TABLE_SQL).fetchone() is not None
+            have_estimates = con.execute(SELECT_SIZE_ESTIMATES_TABLE_SQL).fetchone() is not None
+            reading_sql = CREATE_SQL_V2 if self.schema_version == SCHEMA_VERSION_V2 else CREATE_SQL
+            for sql in CREATE_SNAPSHOT_SQL + reading_sql + [CREATE_ROLLUPS_SQL, CREATE_SIZE_ESTIMATES_SQL, CREATE_VOC_REPLAY_SQL]:
+                con.executescript(sql)
+                con.commit()
+
+            # If the size estimates table has just been added to an existing database, populate it
+            if not have_estimates:
+                self._seed_size_estimates(con)
+
+            # If the rollups table has just been added to an existing database, populate it
+            if not have_rollups:
+                self.rebuild_rollups()
+
+    def rebuild_rollups(self):
+        """
+        Recalculate all the rollups from the raw readings. Rollups are normally maintained as readings
+        are written, so this is only needed when adding them to an existing database
+        """
+        if self.schema_version == SCHEMA_VERSION_V2:
+            epoch_expression, table_index = EPOCH_EXPRESSION_V2, 3
+        else:
+            epoch_expression, table_index = EPOCH_EXPRESSION_V1, 2
+
+        with self.lock:
+            con = self._get_connection()
+            with con:
+                con.executescript(CREATE_ROLLUPS_SQL)
+                con.execute(DELETE_ROLLUPS_SQL)
+                for sensor, metrics in ROLLUP_METRICS.items():
+                    for metric_definition in metrics:
+                        metric, table, column = metric_definition[0], metric_definition[table_index], metric_definition[4]
+                        for granularity, seconds in ROLLUP_GRANULARITIES.items():
+                            sql = rebuild_rollup_sql(granularity, seconds, sensor, metric, table, column, epoch_expression)
+                            con.execute(sql)
+
+    def _purge_table(self, table, sql, cutoff, chunk_size, chunk_delay):
+        """
+        Delete rows older than the cutoff in chunks, each in its own transaction. The lock is released
+        between chunks so the sampler and HTTP threads aren't locked out for the whole purge
+        """
+        deleted = 0
+        chunks = 0
+        while True:
+            with self.lock:
+                con = self._get_connection()
+                with con:
+                    count = con.execute(sql, (cutoff, chunk_size)).rowcount
+                    if count and table in ESTIMATED_TABLES:
+                        con.execute(REMOVE_SIZE_ESTIMATE_SQL, (count, count, table))
+
+            deleted += count
+            chunks += 1
+            if count < chunk_size:
+                break
+
+            time.sleep(chunk_delay)
+
+        return deleted, chunks
+
+    def _incremental_vacuum(self, chunk_delay):
+        """
+        Return free pages to the file system, a few at a time, and return the number freed. This is
+        only possible if the database uses incremental auto-vacuum
+        """
+        with self.lock:
+            con = self._get_connection()
+            if con.execute("PRAGMA auto_vacuum;").fetchone()[0] != AUTO_VACUUM_INCREMENTAL:
+                return 0
+            initial_free_pages = con.execute("PRAGMA freelist_count;").fetchone()[0]
+
+        free_pages = initial_free_pages
+        while free_pages > 0:
+            with self.lock:
+                con = self._get_connection()
+                con.execute(f"PRAGMA incremental_vacuum({INCREMENTAL_VACUUM_PAGES});").fetchall()
+                remaining = con.execute("PRAGMA freelist_count;").fetchone()[0]
 
-    def purge(self):
+            # Stop if no progress is being made, e.g. if another connection holds a read lock
+            if remaining >= free_pages:
+                break
+
+            free_pages = remaining
+            time.sleep(chunk_delay)
+
+        return initial_free_pages - free_pages
+
+    def purge(self, chunk_size=DEFAULT_PURGE_CHUNK_SIZE, chunk_delay=DEFAULT_PURGE_CHUNK_DELAY_SECONDS, incremental_vacuum=False):
         # Check there's a retention period applied
         if self.retention > 0:
             # Get the current timestamp and find out how long it is since old data was last purged. Only
@@ -198,16 +571,41 @@ class Database:
             if elapsed >= PURGE_INTERVAL_MINUTES:
                 # Set the "last purged" timestamp
                 self.last_purged = now
+                started = time.perf_counter()
 
-                # Connect to the database and purge old data
+                # Purge old data
                 timestamp = now - dt.timedelta(minutes=self.retention)
                 cutoff = timestamp.replace(microsecond=0).isoformat() + "Z"
-                con = sqlite3.connect(self.db_path)
-                cur = con.cursor()
-                for sql in PURGE_SQL:
-                    cur.execute(sql, (cutoff,))
-                con.commit()
-                con.close()
+                if self.schema_version == SCHEMA_VERSION_V2:
+                    purge_sql, reading_cutoff = PURGE_SQL_V2, epoch_seconds(cutoff)
+                else:
+                    purge_sql, reading_cutoff = PURGE_SQL, cutoff
+
+                deleted = 0
+                chunks = 0
+                for table, sql in purge_sql.items():
+                    count, chunk_count = self._purge_table(table, sql, reading_cutoff, chunk_size, chunk_delay)
+                    deleted += count
+                    chunks += chunk_count
+
+                # The rollups aren't purged. They're a few rows per metric per day and are what answers
+                # long-range history queries once the raw readings have gone
+                for table, sql in PURGE_SNAPSHOTS_SQL.items():
+                    count, chunk_count = self._purge_table(table, sql, cutoff, chunk_size, chunk_delay)
+                    deleted += count
+                    chunks += chunk_count
+
+                # Return the freed pages to the file system, if requested
+                pages_freed = self._incremental_vacuum(chunk_delay) if incremental_vacuum and deleted else 0
+
+                # Record how long the purge took
+                elapsed_ms = (time.perf_counter() - started) * 1000.0
+                with self.lock:
+                    con = self._get_connection()
+                    with con:
+                        con.execute(INSERT_MAINTENANCE_LOG_SQL, (utc_timestamp(), "purge", deleted, chunks, pages_freed, round(elapsed_ms, 3)))
+
+                logging.info(f"Purged {deleted} rows in {chunks} chunks, freed {pages_freed} pages in {elapsed_ms:.1f} ms")
 
     def snapshot_sizes(self):
         # Get the current timestamp and find out how long it is since old data was last purged. Only
@@ -219,46 +617,213 @@ class Database:
             self.last_snapshot_check = now
 
             # See if we have a size snapshot for today. If not, create one
-            con = sqlite3.connect(self.db_path)
-            if not self._has_snapshot_for_today(con):
-                # Capture the timestamp for "now" (UTC)
-                ts = now.replace(microsecond=0).isoformat()
-
-                # Database size
-                con = sqlite3.connect(self.db_path)
-                page_count = con.execute("PRAGMA page_count;").fetchone()[0]
-                page_size  = con.execute("PRAGMA page_size;").fetchone()[0]
-                con.execute(INSERT_SIZES_SQL, (ts, "db", "main", page_count * page_size, "pragma_pages"))
-
-                # Get a list of tables
-                tables = [r[0] for r in con.execute(SELECT_TABLES_SQL).fetchall()]
-
-                if self._has_dbstat(con):
-                    # Per-table bytes (table + indexes) using dbstat
-                    for t in tables:
-                        b = con.execute(SELECT_TABLE_SIZES_DBSTAT, (t, t)).fetchone()[0]
-                        con.execute(INSERT_SIZES_SQL, (ts, "table", t, int(b), "dbstat"))
-                else:
-                    # Fallback: per-table “payload bytes” estimate (data only, not indexes)
-                    for t in tables:
-                        expr = self._payload_expr_for_table(con, t)
-                        b = con.execute(f"SELECT COALESCE(SUM({expr}),0) FROM {t};").fetchone()[0]
-                        con.execute(INSERT_SIZES_SQL, (ts, "table", t, int(b), "payload_estimate"))
+            with self.lock:
+                con = self._get_connection()
+                if not self._has_snapshot_for_today(con):
+                    # Capture the timestamp for "now" (UTC)
+                    ts = now.replace(microsecond=0).isoformat()
+                    started = time.perf_counter()
 
-                con.commit()
+                    with con:
+                        # Database size
+                        page_count = con.execute("PRAGMA page_count;").fetchone()[0]
+                        page_size  = con.execute("PRAGMA page_size;").fetchone()[0]
+                        con.execute(INSERT_SIZES_SQL, (ts, "db", "main", page_count * page_size, "pragma_pages"))
+
+                        # Get a list of tables
+                        tables = [r[0] for r in con.execute(SELECT_TABLES_SQL).fetchall()]
+
+                        if self._has_dbstat(con):
+                            # Per-table bytes (table + indexes) using dbstat
+                            for t in tables:
+                                b = con.execute(SELECT_TABLE_SIZES_DBSTAT, (t, t)).fetchone()[0]
+                                con.execute(INSERT_SIZES_SQL, (ts, "table", t, int(b), "dbstat"))
+                        else:
+                            # Fallback: the reading tables use the incrementally maintained estimates. Only the
+                            # small auxiliary tables need a “payload bytes” scan (data only, not indexes)
+                            estimates = {r[0]: r[1] for r in con.execute(SELECT_SIZE_ESTIMATES_SQL).fetchall()}
+                            for t in tables:
+                                if t in estimates:
+                                    con.execute(INSERT_SIZES_SQL, (ts, "table", t, int(estimates[t]), "incremental_estimate"))
+                                else:
+                                    expr = self._payload_expr_for_table(con, t)
+                                    b = con.execute(f"SELECT COALESCE(SUM({expr}),0) FROM {t};").fetchone()[0]
+                                    con.execute(INSERT_SIZES_SQL, (ts, "table", t, int(b), "payload_estimate"))
+
+                        # Time a representative query against each reading table
+                        self._snapshot_query_timings(con, ts, now, tables)
+
+                        # Record how long the snapshot took, so its overhead can be tracked
+                        elapsed_ms = (time.perf_counter() - started) * 1000.0
+                        con.execute(INSERT_MAINTENANCE_LOG_SQL, (utc_timestamp(), "snapshot", len(tables), 0, 0, round(elapsed_ms, 3)))
+
+    def migrate_to_v2(self, chunk_size=DEFAULT_MIGRATION_CHUNK_SIZE, drop_v1=False):
+        """
+        Copy the version 1 reading tables into the version 2 schema. Rows are copied in chunks of
+        row IDs, each in its own transaction, so memory use is bounded and the sampler isn't locked
+        out for long. The copy is idempotent, so an interrupted migration can simply be re-run.
+        Returns a dictionary of the number of rows copied per table
+        """
+        with self.lock:
+            con = self._get_connection()
+            with con:
+                for sql in CREATE_SNAPSHOT_SQL + CREATE_SQL + CREATE_SQL_V2:
+                    con.executescript(sql)
+                for sql in MIGRATE_DEVICES_SQL:
+                    con.execute(sql)
+
+        copied = {}
+        for table, sql in MIGRATE_READINGS_SQL.items():
+            with self.lock:
+                min_id, max_id = self._get_connection().execute(SELECT_ID_RANGE_SQL[table]).fetchone()
+
+            copied[table] = 0
+            if min_id is not None:
+                lower = min_id - 1
+                while lower < max_id:
+                    upper = min(lower + chunk_size, max_id)
+                    with self.lock:
+                        con = self._get_connection()
+                        with con:
+                            copied[table] += con.execute(sql, (lower, upper)).rowcount
+                    lower = upper
+
+            logging.info(f"Migrated {copied[table]} rows from {table}")
+
+        if drop_v1:
+            with self.lock:
+                con = self._get_connection()
+                with con:
+                    for sql in DROP_V1_SQL:
+                        con.execute(sql)
+                con.execute("VACUUM;")
+
+        # The version 2 tables were populated directly, so recalculate the size estimates
+        with self.lock:
+            con = self._get_connection()
+            con.executescript(CREATE_SIZE_ESTIMATES_SQL)
+            self._seed_size_estimates(con)
+
+        self.schema_version = SCHEMA_VERSION_V2
+        self.device_ids = {}
+        return copied
+
+    def _history_query(self, reading_type, start, end, step):
+        """
+        Return the query and parameters for a range of history, and a function to convert each row
+        to a dictionary
+        """
+        is_v2 = self.schema_version == SCHEMA_VERSION_V2
+        table = self._reading_table(reading_type)
+
+        if not step:
+            # Raw readings, converting the version 2 epoch timestamps to match version 1
+            keys = ["time_utc"] + [key for key, _ in HISTORY_COLUMNS[reading_type]]
+            def convert(row):
+                values = dict(zip(keys, row))
+                values["time_utc"] = iso_timestamp(row[0]) if is_v2 else row[0]
+                return values
+
+            sql = select_raw_history_sql(reading_type, table)
+        else:
+            # Downsampled readings, each bucket reporting the mean, minimum and maximum of each metric
+            keys = ["time_utc", "count"]
+            for _, key, _ in HISTORY_METRICS[reading_type]:
+                keys += [key, f"{key}_min", f"{key}_max"]
+            def convert(row):
+                values = dict(zip(keys, row))
+                values["time_utc"] = iso_timestamp(row[0])
+                return values
+
+            granularity = rollup_granularity(step)
+            if granularity:
+                # Rollups cover whole periods, so align the start down to include the period containing it
+                seconds = ROLLUP_GRANULARITIES[granularity]
+                sql = select_rollup_history_sql(reading_type, step)
+                return sql, (granularity, reading_type, (start // seconds) * seconds, end), convert
+
+            sql = select_bucketed_history_sql(reading_type, table, is_v2, step)
+
+        # Version 1 timestamps are text, which compare correctly against the first 19 characters
+        if not is_v2:
+            start = iso_timestamp(start)[:19]
+            end = iso_timestamp(end)[:19]
+
+        return sql, (start, end), convert
+
+    def iter_history(self, reading_type, start, end, step=None, chunk_size=HISTORY_CHUNK_SIZE):
+        """
+        Generate lists of readings between the start (inclusive) and end (exclusive) epoch seconds. If a
+        step, in seconds, is specified, readings are grouped into buckets of that size and steps that
+        are whole hours or days are served from the rollups. Rows are fetched from the cursor a chunk at
+        a time, so memory use doesn't depend on the range. Each request uses its own read-only connection
+        so, with WAL journaling, a slow client doesn't hold up the sampler
+        """
+        sql, params, convert = self._history_query(reading_type, start, end, step)
+        con = sqlite3.connect(f"{Path(self.db_path).resolve().as_uri()}?mode=ro", uri=True, timeout=BUSY_TIMEOUT_SECONDS)
+        try:
+            cursor = con.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield [convert(row) for row in rows]
+        finally:
             con.close()
 
+    def write_readings(self, readings):
+        """
+        Write a batch of (reading type, timestamp, values) tuples in a single transaction
+        """
+        with self.lock:
+            con = self._get_connection()
+            with con:
+                # Write the readings, accumulating the row count and size estimates for each table
+                estimates = {}
+                for reading_type, timestamp, values in readings:
+                    # Version 2 ignores a second reading for a device in the same second. It isn't stored, so
+                    # it mustn't be counted in the rollups or size estimates
+                    sql, params = self._reading_insert(con, reading_type, timestamp, values)
+                    if con.execute(sql, params).rowcount != 1:
+                        continue
+
+                    self._update_rollups(con, reading_type, timestamp, values)
+
+                    table = self._reading_table(reading_type)
+                    rows, size = estimates.get(table, (0, 0))
+                    estimates[table] = (rows + 1, size + estimate_record_bytes(params))
+
+                for table, (rows, size) in estimates.items():
+                    con.execute(ADD_SIZE_ESTIMATE_SQL, (table, rows, size))
+
+    def write_voc_replay(self, algorithm, rows):
+        """
+        Write a VOC index series recalculated from an SRAW capture, as a list of (epoch, sraw, VOC index)
+        tuples, in a single transaction
+        """
+        with self.lock:
+            con = self._get_connection()
+            with con:
+                con.executemany(INSERT_VOC_REPLAY_SQL, ((algorithm, *row) for row in rows))
+
+    def read_voc_replay(self, algorithm):
+        """
+        Return a dictionary of recalculated VOC indices, keyed by epoch seconds, for an algorithm label
+        """
+        with self.lock:
+            return dict(self._get_connection().execute(SELECT_VOC_REPLAY_SQL, (algorithm,)).fetchall())
+
     def insert_bme_row(self, temperature, pressure, humidity):
-        timestamp = dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat() + "Z"
-        self._insert_reading(INSERT_BME_SQL, (timestamp, temperature, pressure, humidity, self.bus, self.bme_address))
+        timestamp = utc_timestamp()
+        self.write_readings([(BME280_READING, timestamp, (temperature, pressure, humidity))])
         return timestamp
 
     def insert_veml_row(self, als, white, lux, is_saturated):
-        timestamp = dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat() + "Z"
-        self._insert_reading(INSERT_VEML_SQL, (timestamp, als, white, lux, is_saturated, self.veml_gain, self.veml_integration_time_ms, self.bus, self.veml_address))
+        timestamp = utc_timestamp()
+        self.write_readings([(VEML7700_READING, timestamp, (als, white, lux, is_saturated))])
         return timestamp
 
     def insert_sgp_row(self, sraw, index, label, rating):
-        timestamp = dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat() + "Z"
-        self._insert_reading(INSERT_SGP_SQL, (timestamp, sraw, index, label, rating, self.bus, self.sgp_address))
+        timestamp = utc_timestamp()
+        self.write_readings([(SGP40_READING, timestamp, (sraw, index, label, rating))])
         return timestamp
@@ -0,0 +1,49 @@
+import logging
+import threading
+from .database import DEFAULT_PURGE_CHUNK_SIZE, DEFAULT_PURGE_CHUNK_DELAY_SECONDS
+
+DEFAULT_MAINTENANCE_INTERVAL_SECONDS = 60.0
+
+
+class DatabaseMaintenance(threading.Thread):
+    """
+    Background thread that runs the periodic database housekeeping tasks, so they don't hold up
+    sampling. The tasks themselves decide whether they're due, so this just gives them a chance to
+    run at the specified interval
+    """
+
+    def __init__(self, database, interval=DEFAULT_MAINTENANCE_INTERVAL_SECONDS, purge_chunk_size=DEFAULT_PURGE_CHUNK_SIZE,
+                 purge_chunk_delay=DEFAULT_PURGE_CHUNK_DELAY_SECONDS, incremental_vacuum=True):
+        super().__init__(daemon=True)
+        self.stop = threading.Event()
+        self.database = database
+        self.interval = interval
+        self.purge_chunk_size = purge_chunk_size
+        self.purge_chunk_delay = purge_chunk_delay
+        self.incremental_vacuum = incremental_vacuum
+
+    def run_once(self):
+        """
+        Run each of the maintenance tasks once
+        """
+        try:
+            self.database.purge(self.purge_chunk_size, self.purge_chunk_delay, self.incremental_vacuum)
+        except Exception as ex:
+            logging.warning("Database purge error: %s", ex)
+
+        try:
+            self.database.snapshot_sizes()
+        except Exception as ex:
+            logging.warning("Database size snapshot error: %s", ex)
+
+    def run(self):
+        """
+        Maintenance thread event loop
+        """
+        logging.info(f"Database maintenance started: interval={self.interval:.1f} s")
+
+        while not self.stop.is_set():
+            self.run_once()
+            self.stop.wait(self.interval)
+
+        logging.info("Database maintenance stopped.")
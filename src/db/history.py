@@ -0,0 +1,104 @@
+# Queries used to stream historical readings. Raw readings are returned as stored, while a step
+# (in seconds) groups them into UTC-aligned buckets. Steps that are whole hours or days are served
+# from the pre-aggregated rollups, rather than by scanning the raw readings
+
+from .rollups import ROLLUP_GRANULARITIES, EPOCH_EXPRESSION_V1, EPOCH_EXPRESSION_V2
+
+# Number of rows fetched from the cursor at a time, which bounds the memory used by each request
+HISTORY_CHUNK_SIZE = 500
+
+# Columns returned for the raw readings of each reading type, as (response key, column). The keys
+# match those used by the "latest" endpoints
+HISTORY_COLUMNS = {
+    "BME280": [
+        ("temperature_c", "Temperature"),
+        ("pressure_hpa", "Pressure"),
+        ("humidity_pct", "Humidity")
+    ],
+    "VEML7700": [
+        ("als", "ALS"),
+        ("white", "White"),
+        ("illuminance_lux", "Illuminance"),
+        ("saturated", "IsSaturated")
+    ],
+    "SGP40": [
+        ("sraw", "SRAW"),
+        ("voc_index", "VOCIndex"),
+        ("voc_label", "Label"),
+        ("voc_rating", "Rating")
+    ]
+}
+
+# Metrics returned for downsampled readings of each reading type, as (rollup metric, response key,
+# column). Each bucket reports the mean, minimum and maximum of each metric
+HISTORY_METRICS = {
+    "BME280": [
+        ("temperature", "temperature_c", "Temperature"),
+        ("pressure", "pressure_hpa", "Pressure"),
+        ("humidity", "humidity_pct", "Humidity")
+    ],
+    "VEML7700": [
+        ("illuminance", "illuminance_lux", "Illuminance")
+    ],
+    "SGP40": [
+        ("sraw", "sraw", "SRAW"),
+        ("voc_index", "voc_index", "VOCIndex")
+    ]
+}
+
+
+def rollup_granularity(step):
+    """
+    Return the rollup granularity that can serve a step, or None if it must come from the raw readings
+    """
+    for granularity in sorted(ROLLUP_GRANULARITIES, key=ROLLUP_GRANULARITIES.get, reverse=True):
+        if step % ROLLUP_GRANULARITIES[granularity] == 0:
+            return granularity
+    return None
+
+
+def select_raw_history_sql(reading_type, table):
+    """
+    Return a query for the raw readings in a range, with parameters (from, to)
+    """
+    columns = ", ".join(column for _, column in HISTORY_COLUMNS[reading_type])
+    return f"""
+SELECT      Timestamp, {columns}
+FROM        {table}
+WHERE       Timestamp >= ? AND Timestamp < ?
+ORDER BY    Timestamp ASC;
+"""
+
+
+def select_bucketed_history_sql(reading_type, table, is_v2, step):
+    """
+    Return a query that groups the raw readings in a range into buckets, with parameters (from, to)
+    """
+    epoch_expression = EPOCH_EXPRESSION_V2 if is_v2 else EPOCH_EXPRESSION_V1
+    aggregates = ", ".join(f"AVG({c}), MIN({c}), MAX({c})" for _, _, c in HISTORY_METRICS[reading_type])
+    return f"""
+SELECT      ({epoch_expression} / {step}) * {step} AS Bucket, COUNT(*), {aggregates}
+FROM        {table}
+WHERE       Timestamp >= ? AND Timestamp < ?
+GROUP BY    Bucket
+ORDER BY    Bucket ASC;
+"""
+
+
+def select_rollup_history_sql(reading_type, step):
+    """
+    Return a query that combines rollups into buckets, with parameters (granularity, sensor, from, to).
+    The from time should be aligned to the start of a period, so the period containing it is included
+    """
+    metrics = HISTORY_METRICS[reading_type]
+    aggregates = ", ".join(
+        f"SUM(CASE WHEN Metric = '{m}' THEN Sum END) / SUM(CASE WHEN Metric = '{m}' THEN Count END), "
+        f"MIN(CASE WHEN Metric = '{m}' THEN Min END), MAX(CASE WHEN Metric = '{m}' THEN Max END)"
+        for m, _, _ in metrics)
+    return f"""
+SELECT      (PeriodStart / {step}) * {step} AS Bucket, SUM(CASE WHEN Metric = '{metrics[0][0]}' THEN Count END), {aggregates}
+FROM        READING_ROLLUPS
+WHERE       Granularity = ? AND Sensor = ? AND PeriodStart >= ? AND PeriodStart < ?
+GROUP BY    Bucket
+ORDER BY    Bucket ASC;
+"""
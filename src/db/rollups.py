@@ -0,0 +1,76 @@
+# Pre-aggregated hourly and daily statistics for each sensor metric. Each row holds the count, sum,
+# minimum and maximum for one metric over one UTC period, so the rollups can be maintained with an
+# upsert as each reading is written and the mean is simply Sum / Count. The rollups are deliberately
+# kept when old raw readings are purged, so coarse history remains available beyond the retention period
+
+ROLLUP_GRANULARITIES = {
+    "hour": 3600,
+    "day": 86400
+}
+
+# Metrics that are rolled up for each reading type, as (metric name, index into the reading values,
+# version 1 table, version 2 table, column)
+ROLLUP_METRICS = {
+    "BME280": [
+        ("temperature", 0, "BME280_READINGS", "BME280_READINGS_V2", "Temperature"),
+        ("pressure", 1, "BME280_READINGS", "BME280_READINGS_V2", "Pressure"),
+        ("humidity", 2, "BME280_READINGS", "BME280_READINGS_V2", "Humidity")
+    ],
+    "VEML7700": [
+        ("illuminance", 2, "VEML7700_READINGS", "VEML7700_READINGS_V2", "Illuminance")
+    ],
+    "SGP40": [
+        ("sraw", 0, "SGP40_READINGS", "SGP40_READINGS_V2", "SRAW"),
+        ("voc_index", 1, "SGP40_READINGS", "SGP40_READINGS_V2", "VOCIndex")
+    ]
+}
+
+CREATE_ROLLUPS_SQL = """
+CREATE TABLE IF NOT EXISTS READING_ROLLUPS (
+    Granularity         TEXT NOT NULL,
+    Sensor              TEXT NOT NULL,
+    Metric              TEXT NOT NULL,
+    PeriodStart         INTEGER NOT NULL,
+    Count               INTEGER NOT NULL,
+    Sum                 REAL NOT NULL,
+    Min                 REAL NOT NULL,
+    Max                 REAL NOT NULL,
+    PRIMARY KEY (Granularity, Sensor, Metric, PeriodStart)
+) WITHOUT ROWID;
+"""
+
+UPSERT_ROLLUP_SQL = """
+INSERT INTO READING_ROLLUPS (Granularity, Sensor, Metric, PeriodStart, Count, Sum, Min, Max)
+VALUES (?, ?, ?, ?, 1, ?, ?, ?)
+ON CONFLICT (Granularity, Sensor, Metric, PeriodStart) DO UPDATE SET
+    Count = Count + 1,
+    Sum = Sum + excluded.Sum,
+    Min = MIN(Min, excluded.Min),
+    Max = MAX(Max, excluded.Max);
+"""
+
+DELETE_ROLLUPS_SQL = """
+DELETE FROM READING_ROLLUPS;
+"""
+
+SELECT_ROLLUPS_TABLE_SQL = """
+SELECT 1 FROM sqlite_master WHERE type='table' AND name='READING_ROLLUPS';
+"""
+
+# Expressions converting the timestamp column of each schema version to epoch seconds
+EPOCH_EXPRESSION_V1 = "CAST(strftime('%s', substr(Timestamp, 1, 19)) AS INTEGER)"
+EPOCH_EXPRESSION_V2 = "Timestamp"
+
+
+def rebuild_rollup_sql(granularity, seconds, sensor, metric, table, column, epoch_expression):
+    """
+    Return a statement that recalculates one metric's rollups at one granularity from the raw readings
+    """
+    return f"""
+INSERT INTO READING_ROLLUPS (Granularity, Sensor, Metric, PeriodStart, Count, Sum, Min, Max)
+SELECT      '{granularity}', '{sensor}', '{metric}', ({epoch_expression} / {seconds}) * {seconds} AS PeriodStart,
+            COUNT({column}), SUM({column}), MIN({column}), MAX({column})
+FROM        {table}
+WHERE       {column} IS NOT NULL
+GROUP BY    PeriodStart;
+"""
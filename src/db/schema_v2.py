@@ -0,0 +1,147 @@
+# Version 2 of the reading tables. Timestamps are stored as INTEGER UTC epoch seconds and form part
+# of a clustered (WITHOUT ROWID) primary key, so there's no separate rowid b-tree or timestamp index.
+# The bus and address are held once in a device lookup table rather than on every row
+
+SCHEMA_VERSION = 2
+
+CREATE_SQL_V2 = [
+"""
+CREATE TABLE IF NOT EXISTS DEVICES (
+    Id                  INTEGER PRIMARY KEY,
+    DeviceType          TEXT NOT NULL,
+    Bus                 INTEGER NOT NULL,
+    Address             TEXT NOT NULL,
+    UNIQUE (DeviceType, Bus, Address)
+);
+""",
+"""
+CREATE TABLE IF NOT EXISTS BME280_READINGS_V2 (
+    Timestamp           INTEGER NOT NULL,
+    DeviceId            INTEGER NOT NULL,
+    Temperature         REAL NOT NULL,
+    Pressure            REAL NOT NULL,
+    Humidity            REAL NOT NULL,
+    PRIMARY KEY (Timestamp, DeviceId)
+) WITHOUT ROWID;
+""",
+"""
+CREATE TABLE IF NOT EXISTS VEML7700_READINGS_V2 (
+    Timestamp           INTEGER NOT NULL,
+    DeviceId            INTEGER NOT NULL,
+    ALS                 INTEGER NOT NULL,
+    White               INTEGER NOT NULL,
+    Illuminance         REAL NOT NULL,
+    IsSaturated         INTEGER NOT NULL DEFAULT 0,
+    Gain                REAL NOT NULL,
+    IntegrationTime     INTEGER NOT NULL,
+    PRIMARY KEY (Timestamp, DeviceId)
+) WITHOUT ROWID;
+""",
+"""
+CREATE TABLE IF NOT EXISTS SGP40_READINGS_V2 (
+    Timestamp           INTEGER NOT NULL,
+    DeviceId            INTEGER NOT NULL,
+    SRAW                INTEGER NOT NULL,
+    VOCIndex            INTEGER NOT NULL,
+    Label               TEXT NOT NULL,
+    Rating              TEXT NOT NULL,
+    PRIMARY KEY (Timestamp, DeviceId)
+) WITHOUT ROWID;
+"""
+]
+
+# The version 2 tables have no rowid, so chunks are selected by primary key
+PURGE_SQL_V2 = {
+"BME280_READINGS_V2": """
+DELETE FROM BME280_READINGS_V2 WHERE (Timestamp, DeviceId) IN (SELECT Timestamp, DeviceId FROM BME280_READINGS_V2 WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
+""",
+"VEML7700_READINGS_V2": """
+DELETE FROM VEML7700_READINGS_V2 WHERE (Timestamp, DeviceId) IN (SELECT Timestamp, DeviceId FROM VEML7700_READINGS_V2 WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
+""",
+"SGP40_READINGS_V2": """
+DELETE FROM SGP40_READINGS_V2 WHERE (Timestamp, DeviceId) IN (SELECT Timestamp, DeviceId FROM SGP40_READINGS_V2 WHERE Timestamp <= ? ORDER BY Timestamp LIMIT ?);
+"""
+}
+
+INSERT_DEVICE_SQL = """
+INSERT OR IGNORE INTO DEVICES (DeviceType, Bus, Address)
+VALUES (?, ?, ?);
+"""
+
+SELECT_DEVICE_SQL = """
+SELECT Id FROM DEVICES WHERE DeviceType = ? AND Bus = ? AND Address = ?;
+"""
+
+# The clustered key permits one reading per device per second. A second reading in the same second is
+# ignored, so the caller can tell from the row count that it mustn't be added to the rollups
+INSERT_BME_SQL_V2 = """
+INSERT OR IGNORE INTO BME280_READINGS_V2 (Timestamp, DeviceId, Temperature, Pressure, Humidity)
+VALUES (?, ?, ?, ?, ?);
+"""
+
+INSERT_VEML_SQL_V2 = """
+INSERT OR IGNORE INTO VEML7700_READINGS_V2 (Timestamp, DeviceId, ALS, White, Illuminance, IsSaturated, Gain, IntegrationTime)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?);
+"""
+
+INSERT_SGP_SQL_V2 = """
+INSERT OR IGNORE INTO SGP40_READINGS_V2 (Timestamp, DeviceId, SRAW, VOCIndex, Label, Rating)
+VALUES (?, ?, ?, ?, ?, ?);
+"""
+
+# Migration from version 1. Version 1 timestamps have the form "2025-01-01T12:00:00+00:00Z" and are
+# all UTC, so the first 19 characters are converted to epoch seconds. Each statement copies one
+# range of version 1 row IDs so the migration runs in bounded chunks
+MIGRATE_DEVICES_SQL = [
+"""
+INSERT OR IGNORE INTO DEVICES (DeviceType, Bus, Address)
+SELECT DISTINCT 'BME280', Bus, Address FROM BME280_READINGS;
+""",
+"""
+INSERT OR IGNORE INTO DEVICES (DeviceType, Bus, Address)
+SELECT DISTINCT 'VEML7700', Bus, Address FROM VEML7700_READINGS;
+""",
+"""
+INSERT OR IGNORE INTO DEVICES (DeviceType, Bus, Address)
+SELECT DISTINCT 'SGP40', Bus, Address FROM SGP40_READINGS;
+"""
+]
+
+MIGRATE_READINGS_SQL = {
+"BME280_READINGS": """
+INSERT OR REPLACE INTO BME280_READINGS_V2 (Timestamp, DeviceId, Temperature, Pressure, Humidity)
+SELECT      CAST(strftime('%s', substr(r.Timestamp, 1, 19)) AS INTEGER), d.Id, r.Temperature, r.Pressure, r.Humidity
+FROM        BME280_READINGS r
+INNER JOIN  DEVICES d ON d.DeviceType = 'BME280' AND d.Bus = r.Bus AND d.Address = r.Address
+WHERE       r.Id > ? AND r.Id <= ?
+ORDER BY    r.Id;
+""",
+"VEML7700_READINGS": """
+INSERT OR REPLACE INTO VEML7700_READINGS_V2 (Timestamp, DeviceId, ALS, White, Illuminance, IsSaturated, Gain, IntegrationTime)
+SELECT      CAST(strftime('%s', substr(r.Timestamp, 1, 19)) AS INTEGER), d.Id, r.ALS, r.White, r.Illuminance, r.IsSaturated, r.Gain, r.IntegrationTime
+FROM        VEML7700_READINGS r
+INNER JOIN  DEVICES d ON d.DeviceType = 'VEML7700' AND d.Bus = r.Bus AND d.Address = r.Address
+WHERE       r.Id > ? AND r.Id <= ?
+ORDER BY    r.Id;
+""",
+"SGP40_READINGS": """
+INSERT OR REPLACE INTO SGP40_READINGS_V2 (Timestamp, DeviceId, SRAW, VOCIndex, Label, Rating)
+SELECT      CAST(strftime('%s', substr(r.Timestamp, 1, 19)) AS INTEGER), d.Id, r.SRAW, r.VOCIndex, r.Label, r.Rating
+FROM        SGP40_READINGS r
+INNER JOIN  DEVICES d ON d.DeviceType = 'SGP40' AND d.Bus = r.Bus AND d.Address = r.Address
+WHERE       r.Id > ? AND r.Id <= ?
+ORDER BY    r.Id;
+"""
+}
+
+SELECT_ID_RANGE_SQL = {
+    "BME280_READINGS": "SELECT MIN(Id), MAX(Id) FROM BME280_READINGS;",
+    "VEML7700_READINGS": "SELECT MIN(Id), MAX(Id) FROM VEML7700_READINGS;",
+    "SGP40_READINGS": "SELECT MIN(Id), MAX(Id) FROM SGP40_READINGS;"
+}
+
+DROP_V1_SQL = [
+    "DROP TABLE IF EXISTS BME280_READINGS;",
+    "DROP TABLE IF EXISTS VEML7700_READINGS;",
+    "DROP TABLE IF EXISTS SGP40_READINGS;"
+]
@@ -0,0 +1,80 @@
+# Incrementally maintained row count and payload size estimates for the reading tables. These are
+# updated in the same transaction as the rows are written or purged, so a size snapshot can read
+# them rather than scanning every row of every table when the dbstat virtual table isn't available
+
+CREATE_SIZE_ESTIMATES_SQL = """
+CREATE TABLE IF NOT EXISTS TABLE_SIZE_ESTIMATES (
+    Object_Name         TEXT NOT NULL PRIMARY KEY,
+    Rows                INTEGER NOT NULL,
+    Bytes               INTEGER NOT NULL
+);
+"""
+
+SELECT_SIZE_ESTIMATES_TABLE_SQL = """
+SELECT 1 FROM sqlite_master WHERE type='table' AND name='TABLE_SIZE_ESTIMATES';
+"""
+
+SELECT_SIZE_ESTIMATES_SQL = """
+SELECT Object_Name, Bytes FROM TABLE_SIZE_ESTIMATES;
+"""
+
+ADD_SIZE_ESTIMATE_SQL = """
+INSERT INTO TABLE_SIZE_ESTIMATES (Object_Name, Rows, Bytes)
+VALUES (?, ?, ?)
+ON CONFLICT (Object_Name) DO UPDATE SET
+    Rows = Rows + excluded.Rows,
+    Bytes = Bytes + excluded.Bytes;
+"""
+
+# Rows removed by a purge are assumed to be of average size for the table
+REMOVE_SIZE_ESTIMATE_SQL = """
+UPDATE TABLE_SIZE_ESTIMATES SET
+    Bytes = MAX(0, Bytes - CASE WHEN Rows > 0 THEN (Bytes * ?) / Rows ELSE 0 END),
+    Rows = MAX(0, Rows - ?)
+WHERE Object_Name = ?;
+"""
+
+SET_SIZE_ESTIMATE_SQL = """
+INSERT OR REPLACE INTO TABLE_SIZE_ESTIMATES (Object_Name, Rows, Bytes)
+VALUES (?, ?, ?);
+"""
+
+DELETE_SIZE_ESTIMATES_SQL = """
+DELETE FROM TABLE_SIZE_ESTIMATES;
+"""
+
+# Reading tables for which estimates are maintained
+ESTIMATED_TABLES = [
+    "BME280_READINGS",
+    "VEML7700_READINGS",
+    "SGP40_READINGS",
+    "BME280_READINGS_V2",
+    "VEML7700_READINGS_V2",
+    "SGP40_READINGS_V2"
+]
+
+
+def estimate_record_bytes(values):
+    """
+    Estimate the size of a row in the SQLite record format: a header with one serial type byte per
+    column followed by the column values, integers using the smallest of 0, 1, 2, 3, 4, 6 or 8 bytes
+    """
+    size = 1 + len(values)
+    for value in values:
+        if value is None or isinstance(value, bool):
+            continue
+        elif isinstance(value, int):
+            if value in (0, 1):
+                continue
+            magnitude = value if value >= 0 else -value - 1
+            for length, limit in ((1, 0x7F), (2, 0x7FFF), (3, 0x7FFFFF), (4, 0x7FFFFFFF), (6, 0x7FFFFFFFFFFF)):
+                if magnitude <= limit:
+                    size += length
+                    break
+            else:
+                size += 8
+        elif isinstance(value, float):
+            size += 8
+        else:
+            size += len(str(value).encode("utf-8"))
+    return size
@@ -0,0 +1,23 @@
+# VOC index series recalculated offline from SRAW captures. Each series is labelled with the algorithm,
+# and its tuning, so several can be stored alongside the index calculated at the time and compared.
+# Timestamps are UTC epoch seconds
+
+CREATE_VOC_REPLAY_SQL = """
+CREATE TABLE IF NOT EXISTS SGP40_VOC_REPLAY (
+    Algorithm           TEXT NOT NULL,
+    Timestamp           INTEGER NOT NULL,
+    SRAW                INTEGER NOT NULL,
+    VOCIndex            INTEGER NOT NULL,
+    PRIMARY KEY (Algorithm, Timestamp)
+) WITHOUT ROWID;
+"""
+
+# Replaying a capture again replaces the previously recalculated values
+INSERT_VOC_REPLAY_SQL = """
+INSERT OR REPLACE INTO SGP40_VOC_REPLAY (Algorithm, Timestamp, SRAW, VOCIndex)
+VALUES (?, ?, ?, ?);
+"""
+
+SELECT_VOC_REPLAY_SQL = """
+SELECT Timestamp, VOCIndex FROM SGP40_VOC_REPLAY WHERE Algorithm = ? ORDER BY Timestamp;
+"""
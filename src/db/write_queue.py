@@ -0,0 +1,246 @@
+import logging
+import threading
+import time
+from collections import deque
+from .database import utc_timestamp, BME280_READING, VEML7700_READING, SGP40_READING
+from .overflow_policy import OverflowPolicy
+
+DEFAULT_MAX_BATCH_SIZE = 60
+DEFAULT_MAX_BATCH_AGE_SECONDS = 60.0
+DEFAULT_MAX_QUEUE_SIZE = 10000
+DEFAULT_BLOCK_TIMEOUT_SECONDS = 1.0
+DEFAULT_CLOSE_TIMEOUT_SECONDS = 10.0
+RETRY_DELAY_SECONDS = 1.0
+
+
+class WriteQueue(threading.Thread):
+    """
+    Write-behind queue for sensor readings. The insert_*_row methods have the same signatures as
+    those on the Database class, so the samplers can use either, but they only enqueue the reading.
+    A dedicated writer thread flushes the queue to the database in a single transaction per batch
+    once the batch size or batch age limit is reached
+    """
+
+    def __init__(self, database, max_batch_size=DEFAULT_MAX_BATCH_SIZE, max_batch_age=DEFAULT_MAX_BATCH_AGE_SECONDS,
+                 max_queue_size=DEFAULT_MAX_QUEUE_SIZE, overflow_policy=OverflowPolicy.DROP_OLDEST,
+                 block_timeout=DEFAULT_BLOCK_TIMEOUT_SECONDS):
+        super().__init__(daemon=True)
+        self.database = database
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_batch_age = float(max_batch_age)
+        self.max_queue_size = max(self.max_batch_size, int(max_queue_size))
+        self.overflow_policy = OverflowPolicy(overflow_policy)
+        self.block_timeout = block_timeout
+        self.queue = deque()
+        self.condition = threading.Condition()
+        self.stop = threading.Event()
+        self.flush_requested = False
+        self.writing = False
+        self.oldest_queued = None
+
+        # Metrics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.failed_batches = 0
+        self.max_queue_depth = 0
+        self.last_flush_latency = None
+        self.max_flush_latency = None
+        self.total_flush_latency = 0.0
+
+    # --------------------------------------------------
+    # Queue management
+    # --------------------------------------------------
+
+    def _has_space(self):
+        return len(self.queue) < self.max_queue_size
+
+    def _batch_due(self):
+        """
+        Return True if there's a batch ready to be written. Callers must hold the condition
+        """
+        if not self.queue:
+            return False
+
+        if self.flush_requested or self.stop.is_set() or len(self.queue) >= self.max_batch_size:
+            return True
+
+        return (time.monotonic() - self.oldest_queued) >= self.max_batch_age
+
+    def _enqueue(self, reading_type, values):
+        """
+        Queue a reading, applying the overflow policy if the queue is full, and return its timestamp
+        """
+        timestamp = utc_timestamp()
+        with self.condition:
+            if not self._has_space():
+                if self.overflow_policy == OverflowPolicy.DROP_OLDEST:
+                    self.queue.popleft()
+                    self.dropped += 1
+                elif self.overflow_policy == OverflowPolicy.BLOCK:
+                    # Wait for the writer to make space but don't stall the caller indefinitely
+                    self.condition.notify_all()
+                    if not self.condition.wait_for(self._has_space, timeout=self.block_timeout):
+                        self.dropped += 1
+                        logging.warning("Write queue full: dropped %s reading", reading_type)
+                        return timestamp
+                else:
+                    self.dropped += 1
+                    return timestamp
+
+            if not self.queue:
+                # Wake the writer so it starts timing the batch age from this reading
+                self.oldest_queued = time.monotonic()
+                self.condition.notify_all()
+
+            self.queue.append((reading_type, timestamp, values))
+            self.enqueued += 1
+            self.max_queue_depth = max(self.max_queue_depth, len(self.queue))
+
+            if len(self.queue) >= self.max_batch_size:
+                self.condition.notify_all()
+
+        return timestamp
+
+    def _take_batch(self):
+        """
+        Remove the next batch from the head of the queue. Callers must hold the condition
+        """
+        count = min(len(self.queue), self.max_batch_size)
+        batch = [self.queue.popleft() for _ in range(count)]
+        self.oldest_queued = time.monotonic() if self.queue else None
+        self.flush_requested = self.flush_requested and len(self.queue) > 0
+        self.writing = True
+        self.condition.notify_all()
+        return batch
+
+    def _write_batch(self, batch):
+        """
+        Write a batch to the database, recording the flush latency. Failed batches are returned to
+        the head of the queue to be retried on the next flush
+        """
+        start = time.perf_counter()
+        try:
+            self.database.write_readings(batch)
+            succeeded = True
+        except Exception as ex:
+            logging.warning("Write queue flush error: %s", ex)
+            succeeded = False
+        latency = time.perf_counter() - start
+
+        with self.condition:
+            if succeeded:
+                self.written += len(batch)
+                self.batches += 1
+                self.last_flush_latency = latency
+                self.max_flush_latency = latency if self.max_flush_latency is None else max(self.max_flush_latency, latency)
+                self.total_flush_latency += latency
+            else:
+                # Requeue, discarding the oldest readings if that would exceed the queue limit
+                self.failed_batches += 1
+                self.queue.extendleft(reversed(batch))
+                while len(self.queue) > self.max_queue_size:
+                    self.queue.popleft()
+                    self.dropped += 1
+                self.oldest_queued = time.monotonic()
+
+            self.writing = False
+            self.condition.notify_all()
+
+        return succeeded
+
+    def _wait_timeout(self):
+        """
+        Return the time until the oldest queued reading reaches the maximum batch age
+        """
+        if self.oldest_queued is None:
+            return None
+        return max(0.0, self.max_batch_age - (time.monotonic() - self.oldest_queued))
+
+    def run(self):
+        """
+        Writer thread event loop
+        """
+        logging.info(f"Write queue started: batch size={self.max_batch_size}, batch age={self.max_batch_age:.1f} s")
+
+        while True:
+            with self.condition:
+                while not self._batch_due() and not self.stop.is_set():
+                    self.condition.wait(self._wait_timeout())
+
+                # Once stopped, keep going until the queue's been drained
+                if not self.queue:
+                    break
+
+                batch = self._take_batch()
+
+            # Write outside the lock so the samplers can keep enqueueing. If the write fails, back off
+            # before retrying unless we're shutting down, in which case close() makes a final attempt
+            if not self._write_batch(batch):
+                if self.stop.is_set():
+                    break
+                self.stop.wait(RETRY_DELAY_SECONDS)
+
+        logging.info("Write queue stopped.")
+
+    # --------------------------------------------------
+    # Public API
+    # --------------------------------------------------
+
+    def insert_bme_row(self, temperature, pressure, humidity):
+        return self._enqueue(BME280_READING, (temperature, pressure, humidity))
+
+    def insert_veml_row(self, als, white, lux, is_saturated):
+        return self._enqueue(VEML7700_READING, (als, white, lux, is_saturated))
+
+    def insert_sgp_row(self, sraw, index, label, rating):
+        return self._enqueue(SGP40_READING, (sraw, index, label, rating))
+
+    def flush(self, timeout=None):
+        """
+        Ask the writer thread to write everything that's queued and wait for it to finish. Returns
+        True if the queue was emptied within the timeout
+        """
+        with self.condition:
+            if self.queue:
+                self.flush_requested = True
+                self.condition.notify_all()
+            return self.condition.wait_for(lambda: not self.queue and not self.writing, timeout=timeout)
+
+    def close(self, timeout=DEFAULT_CLOSE_TIMEOUT_SECONDS):
+        """
+        Stop the writer thread once everything that's queued has been written
+        """
+        with self.condition:
+            self.stop.set()
+            self.condition.notify_all()
+
+        if self.is_alive():
+            self.join(timeout)
+
+        # If the thread was never started, or exited with readings still queued, write them here
+        with self.condition:
+            remaining = list(self.queue)
+            self.queue.clear()
+
+        if remaining and not self._write_batch(remaining):
+            logging.warning("Write queue closed with %d unwritten readings", len(remaining))
+
+    @property
+    def metrics(self):
+        with self.condition:
+            return {
+                "queue_depth": len(self.queue),
+                "max_queue_depth": self.max_queue_depth,
+                "max_queue_size": self.max_queue_size,
+                "overflow_policy": self.overflow_policy.value,
+                "enqueued": self.enqueued,
+                "written": self.written,
+                "dropped": self.dropped,
+                "batches": self.batches,
+                "failed_batches": self.failed_batches,
+                "last_flush_latency_ms": None if self.last_flush_latency is None else round(self.last_flush_latency * 1000.0, 3),
+                "max_flush_latency_ms": None if self.max_flush_latency is None else round(self.max_flush_latency * 1000.0, 3),
+                "mean_flush_latency_ms": round(self.total_flush_latency * 1000.0 / self.batches, 3) if self.batches else None
+            }
@@ -0,0 +1,76 @@
+import math
+import numpy as np
+
+# The batch calculation is for tuning the calculator against long SRAW captures. NumPy is listed in
+# requirements.txt but is only imported by the tuning tools, not by the service. The EMA baseline is
+# a first-order recursive filter:
+#
+#   b[n] = (1 - alpha) * b[n-1] + alpha * x[n]
+#
+# which unrolls to b[n] = d^n * (b[0] + alpha * sum(x[k] / d^k, k = 1..n)), where d = 1 - alpha, so it
+# can be calculated with a cumulative sum rather than a loop. The d^-k weights grow without limit, so
+# the series is processed in blocks over which they grow by at most MAX_BLOCK_GAIN, carrying the
+# baseline from one block to the next. That keeps the result within a few ULPs of the sequential
+# calculation
+MAX_BLOCK_GAIN = 1e8
+
+
+def _block_size(baseline_alpha: float) -> int:
+    """
+    Return the number of samples per block for which the weights stay within MAX_BLOCK_GAIN
+    """
+    if baseline_alpha <= 0.0:
+        return 1 << 20
+    return max(1, int(math.log(MAX_BLOCK_GAIN) / -math.log1p(-baseline_alpha)))
+
+
+def ema_baseline(raw, baseline_alpha: float, baseline: float):
+    """
+    Return the array of EMA baselines for an array of raw values, starting from an initial baseline
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    decay = 1.0 - baseline_alpha
+    if decay <= 0.0:
+        return raw.copy()
+
+    baselines = np.empty_like(raw)
+    size = _block_size(baseline_alpha)
+    powers = decay ** np.arange(1, min(size, len(raw)) + 1, dtype=np.float64)
+
+    for start in range(0, len(raw), size):
+        block = raw[start:start + size]
+        block_powers = powers[:len(block)]
+        baselines[start:start + len(block)] = block_powers * (baseline + baseline_alpha * np.cumsum(block / block_powers))
+        baseline = baselines[start + len(block) - 1]
+
+    return baselines
+
+
+def voc_index_batch(raw, baseline_alpha: float, scale: float, baseline: float = None):
+    """
+    Return an array of VOC indices for an array of raw values, and the final baseline, matching
+    VOCIndexCalculator.update() called on each value in turn. Pass the baseline from a previous
+    batch, or a saved state, to carry on from where it left off
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    indices = np.empty(len(raw), dtype=np.int64)
+    if len(raw) == 0:
+        return indices, baseline
+
+    # As with the scalar calculator, the first reading initialises the baseline
+    first = 0
+    if baseline is None:
+        baseline = float(raw[0])
+        indices[0] = 100
+        first = 1
+
+    values = raw[first:]
+    if len(values) == 0:
+        return indices, baseline
+
+    baselines = ema_baseline(values, baseline_alpha, baseline)
+    positive = baselines > 0
+    rel = np.where(positive, (values - baselines) / np.where(positive, baselines, 1.0), 0.0)
+    index = 100 + 200 * np.tanh(rel * (scale / 100.0))
+    indices[first:] = np.clip(np.rint(index), 0, 500).astype(np.int64)
+    return indices, float(baselines[-1])
@@ -55,6 +55,36 @@ class VOCIndexCalculator:
         idx = max(0, min(500, int(round(idx))))
         return idx
 
+    def process(self, sraw: int) -> int:
+        """
+        Same as update(), with the name used by Sensirion's VocAlgorithm, so the
+        calculator can be used by the SGP40 wrapper and its state checkpointed.
+        """
+        return self.update(sraw)
+
+    def update_batch(self, raw_values):
+        """
+        Feed an array of raw VOC values and get back a NumPy array of VOC indices,
+        the same as calling update() on each in turn. The state is carried over, so
+        batches can follow each other or a restored state. This requires NumPy.
+        """
+        from .voc_index_batch import voc_index_batch
+        indices, self.state.baseline = voc_index_batch(raw_values, self.baseline_alpha, self.scale, self.state.baseline)
+        return indices
+
+    def get_states(self):
+        """
+        Get the current state, in the same form as Sensirion's VocAlgorithm.get_states(),
+        so it can be checkpointed and passed back to set_states() after a restart.
+        """
+        return (self.state.baseline,) if self.state.baseline is not None else ()
+
+    def set_states(self, baseline: float = None):
+        """
+        Restore a previously retrieved state.
+        """
+        self.state = VOCIndexState(baseline)
+
 def classify_voc_index(index: int) -> str:
     if index < 80:
         return "Excellent"
@@ -0,0 +1,60 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from .voc_index_batch import voc_index_batch
+
+# Upper bounds of the "Excellent", "Good", "Moderate" and "Unhealthy" bands, as in classify_voc_index()
+CLASS_BOUNDARIES = [80, 120, 160, 220]
+CLASS_LABELS = ["Excellent", "Good", "Moderate", "Unhealthy", "Very Unhealthy"]
+
+# Series shared by the worker processes, set once per worker rather than sent with every task
+_raw = None
+_reference = None
+
+
+def evaluate(raw, reference, baseline_alpha: float, scale: float) -> dict:
+    """
+    Calculate the VOC index for a series of raw values with one pair of parameters and summarise it.
+    If there's a reference index series, e.g. from Sensirion's algorithm, with NaN where there's no
+    reference value, the result is compared with it
+    """
+    indices, _ = voc_index_batch(raw, baseline_alpha, scale)
+    classes = np.bincount(np.digitize(indices, CLASS_BOUNDARIES), minlength=len(CLASS_LABELS)) / max(1, len(indices))
+    result = {
+        "alpha": baseline_alpha,
+        "scale": scale,
+        "mean": float(indices.mean()) if len(indices) else None,
+        "std": float(indices.std()) if len(indices) else None,
+        "classes": dict(zip(CLASS_LABELS, classes.tolist())),
+        "rmse": None,
+        "correlation": None
+    }
+
+    if reference is not None:
+        valid = ~np.isnan(reference)
+        if valid.sum() > 1:
+            difference = indices[valid] - reference[valid]
+            result["rmse"] = float(np.sqrt(np.mean(difference * difference)))
+            result["correlation"] = float(np.corrcoef(indices[valid], reference[valid])[0, 1])
+
+    return result
+
+
+def _initialise(raw, reference):
+    global _raw, _reference
+    _raw = raw
+    _reference = reference
+
+
+def _evaluate(parameters):
+    return evaluate(_raw, _reference, *parameters)
+
+
+def sweep(raw, reference, parameters, workers=None):
+    """
+    Evaluate a list of (alpha, scale) pairs in parallel, returning a list of results in the same order.
+    The series are passed to each worker process once, when it starts
+    """
+    raw = np.asarray(raw, dtype=np.float64)
+    reference = np.asarray(reference, dtype=np.float64) if reference is not None else None
+    with ProcessPoolExecutor(max_workers=workers, initializer=_initialise, initargs=(raw, reference)) as executor:
+        return list(executor.map(_evaluate, parameters))
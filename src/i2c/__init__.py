@@ -1,10 +1,16 @@
 from .i2c_device import I2CDevice
 from .i2c_lcd import I2CLCD
 from .i2c_detect import i2c_device_present
+from .i2c_mux import I2CMux, get_mux
+from .bus_arbiter import BusArbiter, bus_transaction
 
 
 __all__ = [
     "I2CDevice",
     "I2CLCD",
-    "i2c_device_present"
+    "i2c_device_present",
+    "I2CMux",
+    "get_mux",
+    "BusArbiter",
+    "bus_transaction"
 ]
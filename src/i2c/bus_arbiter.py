@@ -0,0 +1,87 @@
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from .i2c_mux import get_mux
+
+
+class BusArbiter:
+    """
+    Wrapper around an SMBus shared by the sampler threads. A transaction covers the mux channel select
+    and the register accesses that follow it, so another thread can't switch the mux part way through.
+    Waits for conversions or integration periods happen between transactions, so they don't hold up
+    the other devices on the bus
+    """
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.mux = get_mux(bus)
+        self.lock = threading.RLock()
+        self.depth = 0
+
+        # Metrics
+        self.transactions = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Hold the bus for a sequence of operations. Transactions may be nested by the same thread, in
+        which case only the outermost is counted
+        """
+        start = time.perf_counter()
+        with self.lock:
+            if not self.depth:
+                wait = time.perf_counter() - start
+                self.transactions += 1
+                self.total_wait += wait
+                self.max_wait = max(self.max_wait, wait)
+
+            self.depth += 1
+            try:
+                yield self.bus
+            finally:
+                self.depth -= 1
+
+    def __getattr__(self, name):
+        """
+        Expose the SMBus methods, each called as a transaction in its own right
+        """
+        if name in ("bus", "mux"):
+            raise AttributeError(name)
+
+        attribute = getattr(self.bus, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self.transaction():
+                return attribute(*args, **kwargs)
+
+        return call
+
+    @property
+    def metrics(self):
+        """
+        Return a snapshot of the bus metrics, with times in milliseconds
+        """
+        with self.lock:
+            return {
+                "transactions": self.transactions,
+                "mean_wait_ms": round(self.total_wait * 1000.0 / self.transactions, 3) if self.transactions else None,
+                "max_wait_ms": round(self.max_wait * 1000.0, 3)
+            }
+
+
+@contextmanager
+def bus_transaction(bus):
+    """
+    Hold a shared bus for a transaction. A bus that isn't shared between threads is used as is. If the
+    transaction fails, the mux channel selection can no longer be trusted
+    """
+    with bus.transaction() if isinstance(bus, BusArbiter) else nullcontext(bus) as held:
+        try:
+            yield held
+        except OSError:
+            get_mux(bus).invalidate()
+            raise
@@ -1,23 +1,28 @@
+from .bus_arbiter import bus_transaction
+from .i2c_mux import get_mux
+
+
 def i2c_device_present(bus, addr, mux_addr, channel, use_write_quick) -> bool:
     """
     Return True if a device at `addr` ACKs on the I2C bus, False otherwise
     """
-    # Select the channel
-    if mux_addr and channel:
-        bus.write_byte(mux_addr, 1 << channel)
+    # The channel select and the probe are a single transaction on a shared bus
+    with bus_transaction(bus):
+        # Select the channel
+        get_mux(bus).select(bus, mux_addr, channel)
 
-    try:
-        if use_write_quick:
-            # Perform a quick transaction to see if the device is there
-            bus.write_quick(addr)
-        else:
-            # Read and discard one byte
-            _ = bus.read_byte(addr)
-        return True
-    except OSError as e:
-        # Remote I/O error = no ACK from a device at that address
-        if e.errno == 121:
-            return False
+        try:
+            if use_write_quick:
+                # Perform a quick transaction to see if the device is there
+                bus.write_quick(addr)
+            else:
+                # Read and discard one byte
+                _ = bus.read_byte(addr)
+            return True
+        except OSError as e:
+            # Remote I/O error = no ACK from a device at that address
+            if e.errno == 121:
+                return False
 
-        # Unexpected error -> re-raise
-        raise
+            # Unexpected error -> re-raise
+            raise
@@ -1,4 +1,6 @@
 from time import sleep
+from .bus_arbiter import bus_transaction
+from .i2c_mux import get_mux
 
 LCD_CHR = 1  # RS bit = 1 for data
 LCD_CMD = 0  # RS bit = 0 for command
@@ -26,6 +28,7 @@ class I2CLCD:
         self.channel = channel
         self.backlight = backlight
         self.max_retries = max_retries
+        self.mux = get_mux(bus)
 
         self._init_display()
 
@@ -53,7 +56,9 @@ class I2CLCD:
         Force a write so the LCD output updates immediately
         """
         try:
-            self.bus.write_byte(self.addr, self._bl_bit())
+            with bus_transaction(self.bus):
+                self._select_channel()
+                self.bus.write_byte(self.addr, self._bl_bit())
         except OSError:
             pass
 
@@ -61,8 +66,7 @@ class I2CLCD:
     # Low level I2C helpers
     # -------------------------------
     def _select_channel(self):
-        if self.mux_addr and self.channel:
-            self.bus.write_byte(self.mux_addr, 1 << self.channel)
+        self.mux.select(self.bus, self.mux_addr, self.channel)
 
     def _lcd_strobe(self, data):
         """
@@ -85,6 +89,9 @@ class I2CLCD:
         Low nibble:     0b EFGH ----
 
         Mode simply indicates a command, LCD_CMD (0), or data, LCD_CHR (1)
+
+        Each byte is a separate transaction on a shared bus, so the sensors aren't held up while a whole
+        line is written
         """
         # Determine the backlight status
         bl = self._bl_bit()
@@ -93,13 +100,16 @@ class I2CLCD:
         high = mode | (bits & 0xF0) | bl
         low = mode | ((bits << 4) & 0xF0) | bl
 
-        # Write the high nibble
-        self.bus.write_byte(self.addr, high)
-        self._lcd_strobe(high)
+        with bus_transaction(self.bus):
+            self._select_channel()
+
+            # Write the high nibble
+            self.bus.write_byte(self.addr, high)
+            self._lcd_strobe(high)
 
-        # Write the low nibble
-        self.bus.write_byte(self.addr, low)
-        self._lcd_strobe(low)
+            # Write the low nibble
+            self.bus.write_byte(self.addr, low)
+            self._lcd_strobe(low)
 
     # -------------------------------
     # LCD initialisation & commands
@@ -109,8 +119,6 @@ class I2CLCD:
         """
         Initialise the LCD display
         """
-        self._select_channel()
-
         sleep(0.05)
         self._lcd_byte(0x33, LCD_CMD)
         self._lcd_byte(0x32, LCD_CMD)
@@ -124,7 +132,6 @@ class I2CLCD:
         """
         Clear the LCD display
         """
-        self._select_channel()
         self._lcd_byte(0x01, LCD_CMD)
         sleep(0.002)
 
@@ -133,7 +140,6 @@ class I2CLCD:
         Write text to the specified line of the display
         Return the number of attempts at writing and a success code
         """
-        self._select_channel()
         for i in range(self.max_retries):
             try:
                 if line == 1:
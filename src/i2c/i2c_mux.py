@@ -0,0 +1,75 @@
+import threading
+import weakref
+
+
+class I2CMux:
+    """
+    Channel selection for a TCA9548A multiplexer. The channel that's currently selected is remembered,
+    so the control byte is only written when a device on a different channel is accessed. If a bus
+    operation fails, the mux state is unknown and the next selection is always written
+    """
+
+    def __init__(self):
+        self.selected = None
+
+        # Metrics
+        self.writes = 0
+        self.writes_saved = 0
+        self.invalidations = 0
+
+    def select(self, bus, mux_addr, channel):
+        """
+        Select a channel, if the device is behind the mux and the channel isn't already selected
+        """
+        if not (mux_addr and channel):
+            return
+
+        selection = (mux_addr, 1 << channel)
+        if selection == self.selected:
+            self.writes_saved += 1
+            return
+
+        # Clear the selection first, so it's not trusted if the write fails
+        self.selected = None
+        bus.write_byte(mux_addr, 1 << channel)
+        self.selected = selection
+        self.writes += 1
+
+    def invalidate(self):
+        """
+        Forget the selected channel, following a bus error
+        """
+        if self.selected:
+            self.selected = None
+            self.invalidations += 1
+
+    @property
+    def metrics(self):
+        """
+        Return a snapshot of the mux metrics
+        """
+        return {
+            "writes": self.writes,
+            "writes_saved": self.writes_saved,
+            "invalidations": self.invalidations
+        }
+
+
+# There's one mux state per bus, shared by all the devices on it
+_muxes = weakref.WeakKeyDictionary()
+_muxes_lock = threading.Lock()
+
+
+def get_mux(bus) -> I2CMux:
+    """
+    Return the mux state for a bus. A shared bus has the state of the SMBus it wraps
+    """
+    mux = getattr(bus, "mux", None)
+    if isinstance(mux, I2CMux):
+        return mux
+
+    with _muxes_lock:
+        mux = _muxes.get(bus)
+        if mux is None:
+            mux = _muxes[bus] = I2CMux()
+        return mux
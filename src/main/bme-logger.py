@@ -64,6 +64,7 @@ def main():
     # If one-shot has been specified, sample the sensor, display the results and exit
     if args.once:
         sample_sensors(sensor, database)
+        database.close()
         return
 
     # Set up for readings at specified intervals
@@ -92,6 +93,7 @@ def main():
         pass
     finally:
         bus.close()
+        database.close()
 
 
 if __name__ == "__main__":
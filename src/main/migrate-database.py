@@ -0,0 +1,45 @@
+import argparse
+import os
+import time
+from registry import AppSettings, DeviceFactory
+from db.database import DEFAULT_MIGRATION_CHUNK_SIZE
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Migrate a Weather Station Database to Schema Version 2")
+    ap.add_argument("--db", default="weather.db", help="SQLite database path")
+    ap.add_argument("--chunk-size", type=int, default=DEFAULT_MIGRATION_CHUNK_SIZE, help="Rows copied per transaction")
+    ap.add_argument("--drop-v1", action="store_true", help="Drop the version 1 tables and vacuum once migrated")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    # Load the configuration settings and create the database access wrapper. The bus isn't needed
+    settings = AppSettings(AppSettings.default_settings_file())
+    factory = DeviceFactory(None, None, None, settings)
+    database = factory.create_database(args.db)
+
+    # Copy the data
+    start = time.perf_counter()
+    try:
+        copied = database.migrate_to_v2(args.chunk_size, args.drop_v1)
+    finally:
+        database.close()
+    elapsed = time.perf_counter() - start
+
+    for table, count in copied.items():
+        print(f"{table} : {count} rows")
+    print()
+    print(f"Migration completed in {elapsed:.2f} s")
+    print("Set \"schema_version\" to 2 in appsettings.json to use the migrated tables")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from registry import AppSettings, DeviceFactory
+from sensors import VOCReplayAlgorithm
+from sensors.sraw_capture import find_capture_files, group_capture_streams
+from sensors.voc_replay import replay_stream, algorithm_label, DEFAULT_CALCULATOR_ALPHA, DEFAULT_CALCULATOR_SCALE
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Recalculate the VOC Index from SRAW Captures")
+    ap.add_argument("captures", nargs="+", help="SRAW capture files and/or folders containing them")
+    ap.add_argument("--db", default="weather.db", help="SQLite database path")
+    ap.add_argument("--algorithm", default=VOCReplayAlgorithm.SENSIRION.value, choices=[a.value for a in VOCReplayAlgorithm], help="VOC algorithm")
+    ap.add_argument("--alpha", type=float, default=DEFAULT_CALCULATOR_ALPHA, help="Baseline alpha for the calculator algorithm")
+    ap.add_argument("--scale", type=float, default=DEFAULT_CALCULATOR_SCALE, help="Deviation scale for the calculator algorithm")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    files = find_capture_files(args.captures)
+    if not files:
+        print("No SRAW capture files found")
+        return
+
+    # Load the configuration settings and create the database access wrapper. The bus isn't needed
+    settings = AppSettings(AppSettings.default_settings_file())
+    factory = DeviceFactory(None, None, None, settings)
+    database = factory.create_database(args.db)
+    database.create_database()
+
+    # The VOC algorithm takes hours to learn its baseline, so the daily files from one sensor are replayed
+    # in order by the same worker, carrying the algorithm state from one day to the next. Independent
+    # streams, in different folders, are replayed in parallel. The results are written to the database
+    # by this process, as it's the only writer
+    streams = group_capture_streams(files)
+    label = algorithm_label(args.algorithm, args.alpha, args.scale)
+    samples = 0
+    processing = 0.0
+    start = time.perf_counter()
+    try:
+        with ProcessPoolExecutor(max_workers=args.workers) as executor:
+            futures = [executor.submit(replay_stream, s, args.algorithm, args.alpha, args.scale) for s in streams]
+            for future in as_completed(futures):
+                for path, rows, elapsed in future.result():
+                    database.write_voc_replay(label, rows)
+                    samples += len(rows)
+                    processing += elapsed
+                    rate = len(rows) / elapsed if elapsed > 0 else 0.0
+                    print(f"{os.path.basename(path)} : {len(rows)} samples, {rate:.0f} samples/s")
+    finally:
+        database.close()
+    elapsed = time.perf_counter() - start
+
+    print()
+    print(f"Recalculated {samples} samples from {len(files)} files in {len(streams)} streams as \"{label}\" in {elapsed:.2f} s")
+    print(f"Throughput : {samples / elapsed:.0f} samples/s overall, {samples / processing if processing else 0.0:.0f} samples/s per worker")
+
+
+if __name__ == "__main__":
+    main()
@@ -52,10 +52,11 @@ def main():
     # Install signal handlers for graceful stop
     signal.signal(signal.SIGTERM, _sig_handler)
 
-    # Load the configuration settings and extract the communication properties
+    # Load the configuration settings and extract the communication properties. The VOC algorithm state
+    # checkpoint is kept alongside the settings
     settings = AppSettings(AppSettings.default_settings_file())
     bus = SMBus(settings.settings["bus_number"])
-    factory = DeviceFactory(bus, i2c_msg, VocAlgorithm(), settings)
+    factory = DeviceFactory(bus, i2c_msg, VocAlgorithm(), settings, AppSettings.default_settings_file().parent)
     sensor = factory.create_device(DeviceType.SGP40)
     if not sensor:
         ts = dt.datetime.now(dt.timezone.utc).replace(microsecond=0).isoformat() + "Z"
@@ -70,6 +71,7 @@ def main():
     # If one-shot has been specified, sample the sensor, display the results and exit
     if args.once:
         sample_sensors(sensor, database, True)
+        database.close()
         return
 
     try:
@@ -97,8 +99,10 @@ def main():
     except KeyboardInterrupt:
         pass
     finally:
-        # Close the bus and purge old data
+        # Checkpoint the VOC algorithm, then close the bus and the database connection
+        sensor.save_voc_state()
         bus.close()
+        database.close()
 
 
 if __name__ == "__main__":
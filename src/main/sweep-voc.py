@@ -0,0 +1,88 @@
+import argparse
+import itertools
+import os
+import time
+import numpy as np
+from registry import AppSettings, DeviceFactory
+from sensors import VOCReplayAlgorithm
+from sensors.sraw_capture import find_capture_files, read_capture
+from experimental.voc_index_sweep import sweep, CLASS_LABELS
+
+
+def load_captures(files):
+    """
+    Return arrays of epoch seconds and SRAW values from a list of capture files, as one continuous series
+    """
+    samples = [sample for f in files for sample in read_capture(f)]
+    samples.sort(key=lambda sample: sample[0])
+    epochs = np.array([sample[0] for sample in samples], dtype=np.int64)
+    raw = np.array([sample[1] for sample in samples], dtype=np.float64)
+    return epochs, raw
+
+
+def load_reference(db_path, label, epochs):
+    """
+    Return an array of the reference VOC index at each capture timestamp, with NaN where there isn't one
+    """
+    settings = AppSettings(AppSettings.default_settings_file())
+    database = DeviceFactory(None, None, None, settings).create_database(db_path)
+    try:
+        database.create_database()
+        series = database.read_voc_replay(label)
+    finally:
+        database.close()
+    return np.array([series.get(epoch, np.nan) for epoch in epochs.tolist()], dtype=np.float64)
+
+
+def main():
+    ap = argparse.ArgumentParser(description="VOC Index Calculator Parameter Sweep")
+    ap.add_argument("captures", nargs="+", help="SRAW capture files and/or folders containing them")
+    ap.add_argument("--alpha", type=float, nargs="+", default=[0.0005, 0.001, 0.002, 0.005], help="Baseline alpha values")
+    ap.add_argument("--scale", type=float, nargs="+", default=[100.0, 200.0, 300.0, 400.0], help="Deviation scale values")
+    ap.add_argument("--db", default=None, help="Optional SQLite path containing a replayed reference series")
+    ap.add_argument("--reference", default=VOCReplayAlgorithm.SENSIRION.value, help="Label of the reference series")
+    ap.add_argument("--workers", type=int, default=os.cpu_count(), help="Number of worker processes")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    files = find_capture_files(args.captures)
+    if not files:
+        print("No SRAW capture files found")
+        return
+
+    # Load the captures and, if there's a database, the reference series to compare against
+    epochs, raw = load_captures(files)
+    reference = load_reference(args.db, args.reference, epochs) if args.db else None
+
+    # Evaluate every combination of the parameters
+    parameters = list(itertools.product(args.alpha, args.scale))
+    start = time.perf_counter()
+    results = sweep(raw, reference, parameters, args.workers)
+    elapsed = time.perf_counter() - start
+
+    # Report the results, best first if there's a reference
+    if reference is not None:
+        results.sort(key=lambda result: result["rmse"] if result["rmse"] is not None else float("inf"))
+
+    print(f"{'Alpha':>8} {'Scale':>8} {'Mean':>8} {'Std':>8} " + " ".join(f"{label[:9]:>9}" for label in CLASS_LABELS) + f" {'RMSE':>8} {'Corr':>8}")
+    for result in results:
+        classes = " ".join(f"{100 * result['classes'][label]:8.1f}%" for label in CLASS_LABELS)
+        rmse = f"{result['rmse']:8.2f}" if result["rmse"] is not None else f"{'-':>8}"
+        correlation = f"{result['correlation']:8.3f}" if result["correlation"] is not None else f"{'-':>8}"
+        print(f"{result['alpha']:8g} {result['scale']:8g} {result['mean']:8.1f} {result['std']:8.1f} {classes} {rmse} {correlation}")
+
+    print()
+    samples = len(raw) * len(parameters)
+    print(f"Evaluated {len(parameters)} parameter pairs over {len(raw)} samples in {elapsed:.2f} s ({samples / elapsed:.0f} samples/s)")
+
+
+if __name__ == "__main__":
+    main()
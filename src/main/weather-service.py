@@ -2,20 +2,24 @@ import argparse
 import signal
 import threading
 import os
-from http.server import ThreadingHTTPServer
+from i2c import BusArbiter
 from registry import AppSettings, DeviceFactory, DeviceType
-from service import RequestHandler, Sampler
+from service import RequestHandler, Sampler, PooledHTTPServer, SchedulePolicy
+from service.pooled_http_server import DEFAULT_WORKERS, DEFAULT_QUEUE_SIZE
+from service.scheduler import DEFAULT_MAX_CATCH_UP
 from smbus2 import SMBus, i2c_msg
 from sensirion_gas_index_algorithm.voc_algorithm import VocAlgorithm
 
 
-stop = None
+stop = threading.Event()
+
+# Poll interval for the request handling loop, so a stop request is noticed promptly
+SERVER_POLL_INTERVAL_SECONDS = 1.0
 
 def _sig_handler(signum, frame):
     """
     Signal handler to signal stop to the handler and HTTP server
     """
-    global stop
     stop.set()
 
 
@@ -36,32 +40,57 @@ def main():
     # Install signal handlers for graceful stop
     signal.signal(signal.SIGTERM, _sig_handler)
 
-    # Load the configuration settings, create the bus and the factory and construct the device wrappers
+    # Load the configuration settings, create the bus and the factory and construct the device wrappers.
+    # The devices are sampled on separate threads, so they share the bus through an arbiter
     settings = AppSettings(AppSettings.default_settings_file())
-    bus = SMBus(settings.settings["bus_number"])
-    factory = DeviceFactory(bus, i2c_msg, VocAlgorithm(), settings)
+    bus = BusArbiter(SMBus(settings.settings["bus_number"]))
+    factory = DeviceFactory(bus, i2c_msg, VocAlgorithm(), settings, AppSettings.default_settings_file().parent)
     devices = factory.create_all_devices()
 
     # Create the database access wrapper
     database = factory.create_database(args.db)
     database.create_database()
 
+    # Start the background database maintenance tasks
+    maintenance = factory.create_maintenance(database)
+    maintenance.start()
+
+    # Create and start the write-behind queue, if configured
+    write_queue = factory.create_write_queue(database)
+    if write_queue:
+        write_queue.start()
+
+    # Create the SRAW capture, if configured, so the VOC index can be recalculated offline
+    capture = factory.create_sraw_capture()
+
     # Create and start the sampler
     sample_interval = settings.settings["sample_interval"]
     display_interval = settings.settings["display_interval"]
-    sampler = Sampler(devices, database, sample_interval, display_interval)
+    schedule = settings.settings.get("schedule", {})
+    sampler = Sampler(devices, database, sample_interval, display_interval, write_queue,
+                      schedule.get("intervals"),
+                      schedule.get("policy", SchedulePolicy.SKIP),
+                      schedule.get("max_catch_up", DEFAULT_MAX_CATCH_UP),
+                      bus,
+                      capture,
+                      settings.settings.get("recent_windows"))
     sampler.start()
 
-    # Set up the request handler
+    # Set up the request handler. Persistent connections are closed once they've been idle for the
+    # configured timeout and the number of live event streams is limited, as each occupies a worker
+    http_settings = settings.settings.get("http", {})
     RequestHandler.sampler = sampler
+    RequestHandler.timeout = http_settings.get("idle_timeout", RequestHandler.timeout)
+    sampler.broadcaster.max_clients = http_settings.get("max_event_clients", sampler.broadcaster.max_clients)
 
-    # Create the server
+    # Create the server, with a fixed pool of workers to serve the connections
     hostname = settings.settings["hostname"]
     port = settings.settings["port"]
-    print(f"Starting the server on http://{hostname}:{port}")
-    server = ThreadingHTTPServer((hostname, port), RequestHandler)
-    global stop
-    stop = threading.Event()
+    workers = http_settings.get("workers", DEFAULT_WORKERS)
+    queue_size = http_settings.get("queue_size", DEFAULT_QUEUE_SIZE)
+    print(f"Starting the server on http://{hostname}:{port} with {workers} workers")
+    server = PooledHTTPServer((hostname, port), RequestHandler, workers, queue_size)
+    server.timeout = SERVER_POLL_INTERVAL_SECONDS
 
     # Enter the request handling loop
     try:
@@ -70,7 +99,18 @@ def main():
     except KeyboardInterrupt:
         stop.set()
     finally:
+        # Stop sampling and end any live event streams, then flush any queued readings before closing
+        # the database
+        sampler.stop.set()
+        sampler.broadcaster.close()
+        maintenance.stop.set()
+        sampler.join(SERVER_POLL_INTERVAL_SECONDS * 5)
+        maintenance.join(SERVER_POLL_INTERVAL_SECONDS * 5)
+        if write_queue:
+            write_queue.close()
+        server.server_close()
         bus.close()
+        database.close()
 
 
 if __name__ == "__main__":
@@ -1,15 +1,21 @@
 from i2c import i2c_device_present, I2CDevice, I2CLCD
-from sensors import BME280, VEML7700, SGP40
-from db import Database
+from pathlib import Path
+from sensors import BME280, BME280CalibrationCache, VEML7700, SGP40, VOCStateCheckpoint, SRAWCapture
+from sensors.bme280 import DEFAULT_MODE, DEFAULT_IIR_FILTER
+from sensors.sgp40 import DEFAULT_CHECKPOINT_INTERVAL
+from sensors.voc_state_checkpoint import DEFAULT_MAX_CHECKPOINT_AGE
+from sensors.sraw_capture import DEFAULT_FLUSH_INTERVAL
+from db import Database, DatabaseMaintenance, WriteQueue, DEFAULT_JOURNAL_MODE, DEFAULT_SYNCHRONOUS, DEFAULT_SCHEMA_VERSION
 from .device_type import DeviceType
 
 
 class DeviceFactory:
-    def __init__(self, bus, msg_module, voc_algorithm, app_settings):
+    def __init__(self, bus, msg_module, voc_algorithm, app_settings, cache_folder=None):
         self.bus = bus
         self.msg_module = msg_module
         self.voc_algorithm = voc_algorithm
         self.app_settings = app_settings
+        self.cache_folder = cache_folder
 
     def _get_device_address(self, properties):
         return int(properties["address"], 16) if properties["address"].strip() else None
@@ -18,16 +24,31 @@ class DeviceFactory:
         mux_settings = self.app_settings.devices["MUX"]
         return self._get_device_address(mux_settings)
 
-    def _create_bme280(self, mux_address, address, channel, _):
-        return BME280(self.bus, address, mux_address, channel)
+    def _create_bme280(self, mux_address, address, channel, properties):
+        # The calibration data is cached if there's a cache folder and a cache file's configured
+        cache_file = properties.get("calibration_cache")
+        calibration_cache = None
+        if self.cache_folder and cache_file:
+            calibration_cache = BME280CalibrationCache(Path(self.cache_folder) / cache_file, self.app_settings.settings["bus_number"])
+        return BME280(self.bus, address, mux_address, channel, calibration_cache,
+                      properties.get("mode", DEFAULT_MODE),
+                      properties.get("oversampling"),
+                      properties.get("iir_filter", DEFAULT_IIR_FILTER))
 
     def _create_veml7700(self, mux_address, address, channel, properties):
         i2c_device = I2CDevice(self.bus, address, mux_address, channel, self.msg_module)
-        return VEML7700(i2c_device, properties["gain"], properties["integration_time"])
-
-    def _create_sgp40(self, mux_address, address, channel, _):
+        return VEML7700(i2c_device, properties["gain"], properties["integration_time"], not properties.get("non_blocking", False))
+
+    def _create_sgp40(self, mux_address, address, channel, properties):
+        # The VOC algorithm states are checkpointed if there's a cache folder and a checkpoint file's configured
+        checkpoint_file = properties.get("voc_checkpoint")
+        checkpoint = None
+        if self.cache_folder and checkpoint_file:
+            checkpoint = VOCStateCheckpoint(Path(self.cache_folder) / checkpoint_file,
+                                            properties.get("voc_checkpoint_max_age", DEFAULT_MAX_CHECKPOINT_AGE))
         i2c_device = I2CDevice(self.bus, address, mux_address, channel, self.msg_module)
-        return SGP40(i2c_device, self.voc_algorithm)
+        return SGP40(i2c_device, self.voc_algorithm, checkpoint=checkpoint,
+                     checkpoint_interval=properties.get("voc_checkpoint_interval", DEFAULT_CHECKPOINT_INTERVAL))
 
     def _create_lcd(self, mux_address, address, channel, _):
         return I2CLCD(self.bus, address, mux_address, channel)
@@ -79,8 +100,41 @@ class DeviceFactory:
         veml_gain = self.app_settings.devices[DeviceType.VEML7700]["gain"]
         veml_it = self.app_settings.devices[DeviceType.VEML7700]["integration_time"]
         sgp_address = self.app_settings.devices[DeviceType.VEML7700]["address"]
+        journal_mode = self.app_settings.settings.get("journal_mode", DEFAULT_JOURNAL_MODE)
+        synchronous = self.app_settings.settings.get("synchronous", DEFAULT_SYNCHRONOUS)
+        schema_version = self.app_settings.settings.get("schema_version", DEFAULT_SCHEMA_VERSION)
 
         # Create the database wrapper
-        database = Database(database_path, retention, bus_number, bme_address, veml_address, veml_gain, veml_it, sgp_address)
+        database = Database(database_path, retention, bus_number, bme_address, veml_address, veml_gain, veml_it, sgp_address,
+                            journal_mode, synchronous, schema_version)
         return database
 
+    def create_write_queue(self, database):
+        # Return None if write-behind isn't configured, in which case readings are written directly
+        properties = self.app_settings.settings.get("write_queue")
+        if not properties or not properties["enabled"]:
+            return None
+
+        # Create the write queue
+        return WriteQueue(
+            database,
+            properties["max_batch_size"],
+            properties["max_batch_age"],
+            properties["max_queue_size"],
+            properties["overflow_policy"])
+
+    def create_sraw_capture(self):
+        # Return None if SRAW capture isn't configured. The capture folder is relative to the cache folder
+        properties = self.app_settings.settings.get("sraw_capture")
+        if not properties or not properties["enabled"] or not self.cache_folder:
+            return None
+
+        return SRAWCapture(Path(self.cache_folder) / properties["folder"],
+                           properties.get("flush_interval", DEFAULT_FLUSH_INTERVAL))
+
+    def create_maintenance(self, database):
+        # Create the background maintenance task. The setting names match the constructor arguments
+        # and the defaults are used for any that aren't specified
+        properties = self.app_settings.settings.get("maintenance", {})
+        return DatabaseMaintenance(database, **properties)
+
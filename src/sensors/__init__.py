@@ -1,14 +1,24 @@
 from .bme280 import BME280
+from .bme280_mode import BME280Mode
 from .bme280_compensation import BME280Compensation
 from .bme280_trimming_parameters import BME280TrimmingParameters
+from .bme280_calibration_cache import BME280CalibrationCache
 from .veml7700 import VEML7700
 from .sgp40 import SGP40
+from .voc_state_checkpoint import VOCStateCheckpoint
+from .sraw_capture import SRAWCapture
+from .voc_replay_algorithm import VOCReplayAlgorithm
 
 
 __all__ = [
     "BME280",
+    "BME280Mode",
     "BME280Compensation",
     "BME280TrimmingParameters",
+    "BME280CalibrationCache",
     "VEML7700",
-    "SGP40"
+    "SGP40",
+    "VOCStateCheckpoint",
+    "SRAWCapture",
+    "VOCReplayAlgorithm"
 ]
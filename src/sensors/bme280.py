@@ -1,20 +1,122 @@
 import time
+from i2c import bus_transaction
 from .bme280_compensation import BME280Compensation
+from .bme280_mode import BME280Mode
+
+# Control, status and data registers
+REG_CTRL_HUM = 0xF2
+REG_STATUS = 0xF3
+REG_CTRL_MEAS = 0xF4
+REG_CONFIG = 0xF5
+REG_DATA = 0xF7
+
+# Status register bit that's set while a conversion is running
+STATUS_MEASURING = 0x08
+
+# Register field values for the oversampling ratios (0 = skipped), IIR filter coefficients (0 = off)
+# and modes
+OVERSAMPLING_CODES = {0: 0b000, 1: 0b001, 2: 0b010, 4: 0b011, 8: 0b100, 16: 0b101}
+IIR_FILTER_CODES = {0: 0b000, 2: 0b001, 4: 0b010, 8: 0b011, 16: 0b100}
+MODE_CODES = {BME280Mode.FORCED: 0b01, BME280Mode.NORMAL: 0b11}
+
+# Normal mode with x1 oversampling and the filter off is how the sensor was always configured, so
+# forced mode has to be opted into in the settings
+DEFAULT_MODE = BME280Mode.NORMAL
+DEFAULT_OVERSAMPLING = {"temperature": 1, "pressure": 1, "humidity": 1}
+DEFAULT_IIR_FILTER = 0
+
+# Typical supply current (uA) while each quantity is being converted and while idle between measurements,
+# from the datasheet. The current can't be measured in software, so these are only used for an estimate.
+# In normal mode, the standby time between measurements is 0.5 ms
+CONVERSION_CURRENT_UA = {"temperature": 350.0, "pressure": 714.0, "humidity": 340.0}
+SLEEP_CURRENT_UA = 0.1
+STANDBY_CURRENT_UA = 0.2
+NORMAL_MODE_STANDBY_MS = 0.5
+
+# The status register is polled at this interval once the typical measurement time has elapsed, up
+# to a multiple of the maximum measurement time
+STATUS_POLL_INTERVAL_SECONDS = 0.001
+MEASUREMENT_TIMEOUT_FACTOR = 2.0
 
 
 class BME280(BME280Compensation):
-    def __init__(self, bus, address, mux_address, channel):
-        super().__init__(bus, address, mux_address, channel)
+    def __init__(self, bus, address, mux_address, channel, calibration_cache=None, mode=DEFAULT_MODE,
+                 oversampling=None, iir_filter=DEFAULT_IIR_FILTER):
+        super().__init__(bus, address, mux_address, channel, calibration_cache)
+        self.mode = BME280Mode(mode)
+        self.oversampling = dict(DEFAULT_OVERSAMPLING)
+        self.oversampling.update(oversampling or {})
+        self.iir_filter = iir_filter
+
+        for name, ratio in self.oversampling.items():
+            if ratio not in OVERSAMPLING_CODES:
+                raise ValueError(f"Invalid BME280 {name} oversampling: {ratio}")
+        if iir_filter not in IIR_FILTER_CODES:
+            raise ValueError(f"Invalid BME280 IIR filter coefficient: {iir_filter}")
+
+        # Measurement timing from the datasheet, in ms. Each quantity that's measured adds a conversion
+        # time proportional to its oversampling ratio
+        self.typical_measurement_ms = 1.0
+        self.max_measurement_ms = 1.25
+        self.measurement_charge = 0.0
+        for name, ratio in self.oversampling.items():
+            if ratio:
+                settling = 0.0 if name == "temperature" else 0.5
+                self.typical_measurement_ms += 2.0 * ratio + settling
+                self.max_measurement_ms += 2.3 * ratio + settling * 1.15
+                self.measurement_charge += CONVERSION_CURRENT_UA[name] * (2.0 * ratio + settling)
 
-        # Configure: humidity x1; temp/press x1; normal mode
-        self._select_channel()
-        self._write_u8(0xF2, 0x01)
-        self._write_u8(0xF4, 0x27)
-        time.sleep(0.1)
+        # Measured latency from triggering a measurement to the data being ready
+        self.measurements = 0
+        self.last_latency = None
+        self.max_latency = None
+
+        # Put the sensor to sleep so the configuration register can be written, then configure it.
+        # The humidity oversampling only takes effect when the measurement control register is written
+        self.ctrl_meas = (OVERSAMPLING_CODES[self.oversampling["temperature"]] << 5) | (OVERSAMPLING_CODES[self.oversampling["pressure"]] << 2)
+        with bus_transaction(self.sm_bus):
+            self._select_channel()
+            self._write_u8(REG_CTRL_MEAS, 0x00)
+            self._write_u8(REG_CONFIG, IIR_FILTER_CODES[iir_filter] << 2)
+            self._write_u8(REG_CTRL_HUM, OVERSAMPLING_CODES[self.oversampling["humidity"]])
+            self._write_u8(REG_CTRL_MEAS, self.ctrl_meas)
+
+        # In normal mode, the sensor measures continuously, so start it and wait for the first measurement.
+        # With the minimum standby time it's measuring almost all the time, so polling the status register
+        # could easily miss the idle gap. Instead, wait for a whole measurement period
+        if self.mode == BME280Mode.NORMAL:
+            self._write_u8(REG_CTRL_MEAS, self.ctrl_meas | MODE_CODES[BME280Mode.NORMAL])
+            time.sleep((self.max_measurement_ms + NORMAL_MODE_STANDBY_MS) / 1000.0)
+
+    def _wait_for_measurement(self):
+        """
+        Wait for the typical measurement time then poll the status register until the measurement is
+        complete, returning the elapsed time. The bus isn't held while waiting
+        """
+        start = time.perf_counter()
+        deadline = start + self.max_measurement_ms * MEASUREMENT_TIMEOUT_FACTOR / 1000.0
+        time.sleep(self.typical_measurement_ms / 1000.0)
+        while self._read_u8(REG_STATUS) & STATUS_MEASURING:
+            if time.perf_counter() > deadline:
+                raise TimeoutError(f"BME280 measurement not complete after {self.max_measurement_ms * MEASUREMENT_TIMEOUT_FACTOR:.1f} ms")
+            time.sleep(STATUS_POLL_INTERVAL_SECONDS)
+        return time.perf_counter() - start
+
+    def _record_latency(self, latency):
+        self.measurements += 1
+        self.last_latency = latency
+        self.max_latency = latency if self.max_latency is None else max(self.max_latency, latency)
 
     def read(self):
-        self._select_channel()
-        data = self.sm_bus.read_i2c_block_data(self.address, 0xF7, 8)
+        # In forced mode, trigger a single measurement and wait for it. The sensor returns to sleep
+        # once it's complete
+        if self.mode == BME280Mode.FORCED:
+            self._write_u8(REG_CTRL_MEAS, self.ctrl_meas | MODE_CODES[BME280Mode.FORCED])
+            self._record_latency(self._wait_for_measurement())
+
+        with bus_transaction(self.sm_bus):
+            self._select_channel()
+            data = self.sm_bus.read_i2c_block_data(self.address, REG_DATA, 8)
         adc_p = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
         adc_t = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
         adc_h = (data[6] << 8) | data[7]
@@ -25,3 +127,32 @@ class BME280(BME280Compensation):
         humidity = self.compensate_humidity(t_fine, adc_h)
 
         return temp_c, pressure_hpa, humidity
+
+    def measurement_status(self, interval):
+        """
+        Return the measurement configuration, the measured latency and an estimate of the average
+        supply current, calculated from the datasheet figures rather than measured, when sampled at
+        the given interval (s). In normal mode, the sensor measures continuously whatever the sample
+        interval
+        """
+        def ms(value):
+            return round(value * 1000.0, 3) if value is not None else None
+
+        if self.mode == BME280Mode.FORCED:
+            period_ms = interval * 1000.0
+            idle_current = SLEEP_CURRENT_UA
+        else:
+            period_ms = self.typical_measurement_ms + NORMAL_MODE_STANDBY_MS
+            idle_current = STANDBY_CURRENT_UA
+
+        return {
+            "mode": self.mode.value,
+            "oversampling": dict(self.oversampling),
+            "iir_filter": self.iir_filter,
+            "typical_measurement_ms": round(self.typical_measurement_ms, 3),
+            "max_measurement_ms": round(self.max_measurement_ms, 3),
+            "measurements": self.measurements,
+            "last_latency_ms": ms(self.last_latency),
+            "max_latency_ms": ms(self.max_latency),
+            "estimated_current_ua": round(self.measurement_charge / period_ms + idle_current, 3)
+        }
@@ -0,0 +1,108 @@
+import numpy as np
+
+# The batch compensation is for offline replay of raw ADC captures, so NumPy is only needed by the
+# reporting tools and isn't imported by the service. It uses the same integer formulae as the scalar
+# path in BME280Compensation, in 64-bit arithmetic, and gives bit-identical results for ADC values in
+# the sensor's 20-bit (temperature, pressure) and 16-bit (humidity) ranges.
+#
+# The scalar path uses Python integers, which can't overflow. The pressure intermediates fit in 64 bits
+# for typical calibrations, but can exceed them for ADC values at the ends of the range (e.g. a pressure
+# of 0, or 0x80000 when the measurement was skipped) combined with extreme trimming parameters, such as
+# a small dig_P1. Their magnitudes are bounded in floating point first and any reading that could
+# overflow is compensated again with Python integers, as an object array. The limit allows for rounding
+# in the floating point bound
+OVERFLOW_LIMIT = 2.0 ** 63 * (1 - 1e-6)
+
+
+def compensate_temperature_batch(coefficients, adc_t):
+    """
+    Return arrays of t_fine and temperature (C) for an array of raw temperature readings
+    """
+    c = coefficients
+    adc_t = np.asarray(adc_t, dtype=np.int64)
+    var1 = (((adc_t >> 3) - c.t1_x2) * c.t2) >> 11
+    delta = (adc_t >> 4) - c.t1
+    var2 = (((delta * delta) >> 12) * c.t3) >> 14
+    t_fine = var1 + var2
+    temp_c = ((t_fine * 5 + 128) >> 8) / 100.0
+    return t_fine, temp_c
+
+
+def _pressure(c, t_fine, adc_p):
+    """
+    Return pressures (hPa) using the integer formula, in the arithmetic of the array types
+    """
+    var1 = t_fine - 128000
+    var1_squared = var1 * var1
+    var2 = var1_squared * c.p6 + ((var1 * c.p5) << 17) + c.p4_shifted
+    var1 = ((var1_squared * c.p3) >> 8) + ((var1 * c.p2) << 12)
+    var1 = (((1 << 47) + var1) * c.p1) >> 33
+
+    # Avoid dividing by zero, then report zero pressure for those readings, as the scalar path does
+    valid = var1 != 0
+    p = 1048576 - adc_p
+    p = (((p << 31) - var2) * 3125) // np.where(valid, var1, 1)
+    p_shifted = p >> 13
+    var1 = (c.p9 * p_shifted * p_shifted) >> 25
+    var2 = (c.p8 * p) >> 19
+    pressure = ((p + var1 + var2) >> 8) + c.p7_shifted
+    return np.where(valid, pressure / 25600.0, 0.0)
+
+
+def _pressure_bound(c, t_fine, adc_p):
+    """
+    Return an upper bound on the magnitude of the intermediates in the pressure formula
+    """
+    var1 = t_fine - 128000
+    var1_squared = var1 * var1
+    var2 = var1_squared * abs(c.p6) + np.abs(var1) * abs(c.p5) * 2.0 ** 17 + abs(c.p4_shifted)
+    var1 = var1_squared * c.p3 / 2.0 ** 8 + var1 * c.p2 * 2.0 ** 12
+    product = ((1 << 47) + var1) * c.p1
+    dividend = (np.abs(1048576 - adc_p) * 2.0 ** 31 + var2) * 3125
+
+    # The divisor is product >> 33, an integer that's within one of its floating point estimate
+    divisor = np.maximum(np.abs(product) / 2.0 ** 33 - 2, 1)
+    p = dividend / divisor + 1
+    p_shifted = p / 2.0 ** 13
+    p9_term = abs(c.p9) * p_shifted * p_shifted
+    p8_term = abs(c.p8) * p
+    terms = [var1_squared * max(abs(c.p6), abs(c.p3)), var2, np.abs(var1), np.abs(product), dividend,
+             p9_term, p8_term, p + p9_term / 2.0 ** 25 + p8_term / 2.0 ** 19]
+    return np.maximum.reduce(terms)
+
+
+def compensate_pressure_batch(coefficients, t_fine, adc_p):
+    """
+    Return an array of pressures (hPa) for arrays of t_fine and raw pressure readings
+    """
+    t_fine = np.asarray(t_fine, dtype=np.int64)
+    adc_p = np.asarray(adc_p, dtype=np.int64)
+    pressure_hpa = np.asarray(_pressure(coefficients, t_fine, adc_p), dtype=np.float64)
+    unsafe = _pressure_bound(coefficients, t_fine.astype(np.float64), adc_p.astype(np.float64)) >= OVERFLOW_LIMIT
+    if unsafe.any():
+        pressure_hpa[unsafe] = _pressure(coefficients, t_fine[unsafe].astype(object), adc_p[unsafe].astype(object))
+    return pressure_hpa
+
+
+def compensate_humidity_batch(coefficients, t_fine, adc_h):
+    """
+    Return an array of relative humidities (%) for arrays of t_fine and raw humidity readings
+    """
+    c = coefficients
+    adc_h = np.asarray(adc_h, dtype=np.int64)
+    h = t_fine - 76800
+    h = (((((adc_h << 14) - c.h4_shifted - (c.h5 * h)) + 16384) >> 15)
+         * (((((((h * c.h6) >> 10) * (((h * c.h3) >> 11) + 32768)) >> 10) + 2097152) * c.h2 + 8192) >> 14))
+    h = h - (((((h >> 15) * (h >> 15)) >> 7) * c.h1) >> 4)
+    h = np.clip(h, 0, 419430400)
+    return (h >> 12) / 1024.0
+
+
+def compensate_batch(coefficients, adc_t, adc_p, adc_h):
+    """
+    Return arrays of temperature (C), pressure (hPa) and humidity (%) for arrays of raw readings
+    """
+    t_fine, temp_c = compensate_temperature_batch(coefficients, adc_t)
+    pressure_hpa = compensate_pressure_batch(coefficients, t_fine, adc_p)
+    humidity = compensate_humidity_batch(coefficients, t_fine, adc_h)
+    return temp_c, pressure_hpa, humidity
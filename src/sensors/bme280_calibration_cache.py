@@ -0,0 +1,74 @@
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+
+class BME280CalibrationCache:
+    """
+    On-disk cache of decoded BME280 trimming parameters, so they don't have to be read from the sensor
+    each time the service starts. Entries are keyed by bus, mux channel, address and chip ID, so a
+    different sensor, or the same sensor moved to another address, isn't given the wrong parameters
+    """
+
+    def __init__(self, cache_file, bus_number):
+        self.cache_file = Path(cache_file)
+        self.bus_number = bus_number
+        self.lock = threading.Lock()
+
+    def _key(self, address, channel, chip_id):
+        return f"{self.bus_number}:{channel}:0x{address:02X}:0x{chip_id:02X}"
+
+    def _read_entries(self):
+        """
+        Read all the cached entries, returning an empty set if the cache doesn't exist or is unreadable
+        """
+        try:
+            with open(self.cache_file, "r") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as ex:
+            logging.warning("Unable to read the BME280 calibration cache %s: %s", self.cache_file, ex)
+            return {}
+
+    def load(self, address, channel, chip_id, registers):
+        """
+        Return the cached trimming parameters for a sensor, or None if there's no valid entry. An entry
+        is only valid if it has an integer value for every one of the registers
+        """
+        with self.lock:
+            entry = self._read_entries().get(self._key(address, channel, chip_id))
+
+        if not isinstance(entry, dict):
+            return None
+
+        try:
+            parameters = {int(register, 16): value for register, value in entry.items()}
+        except ValueError:
+            return None
+
+        if set(parameters) != set(registers) or not all(isinstance(v, int) for v in parameters.values()):
+            logging.warning("Ignoring invalid BME280 calibration cache entry for 0x%02X", address)
+            return None
+
+        return parameters
+
+    def save(self, address, channel, chip_id, parameters):
+        """
+        Store the trimming parameters for a sensor. The file is replaced atomically so a crash part way
+        through can't leave a truncated cache
+        """
+        entry = {f"0x{register:02X}": value for register, value in parameters.items()}
+        with self.lock:
+            entries = self._read_entries()
+            entries[self._key(address, channel, chip_id)] = entry
+            temporary_file = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            try:
+                with open(temporary_file, "w") as f:
+                    json.dump(entries, f, indent=4)
+                os.replace(temporary_file, self.cache_file)
+            except OSError as ex:
+                logging.warning("Unable to write the BME280 calibration cache %s: %s", self.cache_file, ex)
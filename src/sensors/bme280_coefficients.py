@@ -0,0 +1,42 @@
+from .bme280_trimming_parameters import DIG_T1, DIG_T2, DIG_T3
+from .bme280_trimming_parameters import DIG_P1, DIG_P2, DIG_P3, DIG_P4, DIG_P5, DIG_P6, DIG_P7, DIG_P8, DIG_P9
+from .bme280_trimming_parameters import DIG_H1, DIG_H2, DIG_H3, DIG_H4, DIG_H5, DIG_H6
+
+
+class BME280Coefficients:
+    """
+    Per-device constants for the compensation formulae, derived once from the trimming parameters.
+    Terms that the datasheet shifts by a constant on every reading are stored pre-shifted
+    """
+
+    __slots__ = (
+        "t1", "t1_x2", "t2", "t3",
+        "p1", "p2", "p3", "p4", "p4_shifted", "p5", "p6", "p7", "p7_shifted", "p8", "p9",
+        "h1", "h2", "h3", "h4", "h4_shifted", "h5", "h6"
+    )
+
+    def __init__(self, trimming_parameters):
+        self.t1 = trimming_parameters[DIG_T1]
+        self.t1_x2 = self.t1 << 1
+        self.t2 = trimming_parameters[DIG_T2]
+        self.t3 = trimming_parameters[DIG_T3]
+
+        self.p1 = trimming_parameters[DIG_P1]
+        self.p2 = trimming_parameters[DIG_P2]
+        self.p3 = trimming_parameters[DIG_P3]
+        self.p4 = trimming_parameters[DIG_P4]
+        self.p4_shifted = self.p4 << 35
+        self.p5 = trimming_parameters[DIG_P5]
+        self.p6 = trimming_parameters[DIG_P6]
+        self.p7 = trimming_parameters[DIG_P7]
+        self.p7_shifted = self.p7 << 4
+        self.p8 = trimming_parameters[DIG_P8]
+        self.p9 = trimming_parameters[DIG_P9]
+
+        self.h1 = trimming_parameters[DIG_H1]
+        self.h2 = trimming_parameters[DIG_H2]
+        self.h3 = trimming_parameters[DIG_H3]
+        self.h4 = trimming_parameters[DIG_H4]
+        self.h4_shifted = self.h4 << 20
+        self.h5 = trimming_parameters[DIG_H5]
+        self.h6 = trimming_parameters[DIG_H6]
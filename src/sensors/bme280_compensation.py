@@ -1,45 +1,93 @@
 from .bme280_trimming_parameters import BME280TrimmingParameters
-from .bme280_trimming_parameters import DIG_T1, DIG_T2, DIG_T3
-from .bme280_trimming_parameters import DIG_P1, DIG_P2, DIG_P3, DIG_P4, DIG_P5, DIG_P6, DIG_P7, DIG_P8, DIG_P9
-from .bme280_trimming_parameters import DIG_H1, DIG_H2, DIG_H3, DIG_H4, DIG_H5, DIG_H6
+from .bme280_coefficients import BME280Coefficients
 
 
 class BME280Compensation(BME280TrimmingParameters):
-    def __init__(self, sm_bus, address, mux_address, channel):
-        super().__init__(sm_bus, address, mux_address, channel)
+    def __init__(self, sm_bus, address, mux_address, channel, calibration_cache=None):
+        super().__init__(sm_bus, address, mux_address, channel, calibration_cache)
+        self.coefficients = BME280Coefficients(self.trimming_parameters)
+
+    # ---- Integer compensation, from the datasheet's 32/64-bit fixed point formulae
 
     def compensate_temperature(self, adc_t):
-        var1 = (((adc_t >> 3) - (self.get_trimming_parameter(DIG_T1) << 1)) * self.get_trimming_parameter(DIG_T2)) >> 11
-        var2 = (((((adc_t >> 4) - self.get_trimming_parameter(DIG_T1)) * ((adc_t >> 4) - self.get_trimming_parameter(DIG_T1))) >> 12) * self.get_trimming_parameter(DIG_T3)) >> 14
+        c = self.coefficients
+        var1 = (((adc_t >> 3) - c.t1_x2) * c.t2) >> 11
+        delta = (adc_t >> 4) - c.t1
+        var2 = (((delta * delta) >> 12) * c.t3) >> 14
         t_fine = var1 + var2
         temp_c = ((t_fine * 5 + 128) >> 8) / 100.0
         return t_fine, temp_c
 
     def compensate_pressure(self, t_fine, adc_p):
+        c = self.coefficients
         var1 = t_fine - 128000
-        var2 = var1 * var1 * self.get_trimming_parameter(DIG_P6)
-        var2 = var2 + ((var1 * self.get_trimming_parameter(DIG_P5)) << 17)
-        var2 = var2 + (self.get_trimming_parameter(DIG_P4) << 35)
-        var1 = ((var1 * var1 * self.get_trimming_parameter(DIG_P3)) >> 8) + ((var1 * self.get_trimming_parameter(DIG_P2)) << 12)
-        var1 = (((1 << 47) + var1) * self.get_trimming_parameter(DIG_P1)) >> 33
+        var1_squared = var1 * var1
+        var2 = var1_squared * c.p6 + ((var1 * c.p5) << 17) + c.p4_shifted
+        var1 = ((var1_squared * c.p3) >> 8) + ((var1 * c.p2) << 12)
+        var1 = (((1 << 47) + var1) * c.p1) >> 33
         if var1 == 0:
             pressure_hpa = 0.0
         else:
             p = 1048576 - adc_p
             p = (((p << 31) - var2) * 3125) // var1
-            var1 = (self.get_trimming_parameter(DIG_P9) * (p >> 13) * (p >> 13)) >> 25
-            var2 = (self.get_trimming_parameter(DIG_P8) * p) >> 19
-            pressure = ((p + var1 + var2) >> 8) + (self.get_trimming_parameter(DIG_P7) << 4)
+            p_shifted = p >> 13
+            var1 = (c.p9 * p_shifted * p_shifted) >> 25
+            var2 = (c.p8 * p) >> 19
+            pressure = ((p + var1 + var2) >> 8) + c.p7_shifted
             pressure_hpa = pressure / 25600.0
 
         return pressure_hpa
 
     def compensate_humidity(self, t_fine, adc_h):
+        c = self.coefficients
         h = t_fine - 76800
-        h = (((((adc_h << 14) - (self.get_trimming_parameter(DIG_H4) << 20) - (self.get_trimming_parameter(DIG_H5) * h)) + 16384) >> 15)
-             * (((((((h * self.get_trimming_parameter(DIG_H6)) >> 10) * (((h * self.get_trimming_parameter(DIG_H3)) >> 11) + 32768)) >> 10) + 2097152)
-             * self.get_trimming_parameter(DIG_H2) + 8192) >> 14))
-        h = h - (((((h >> 15) * (h >> 15)) >> 7) * self.get_trimming_parameter(DIG_H1)) >> 4)
+        h = (((((adc_h << 14) - c.h4_shifted - (c.h5 * h)) + 16384) >> 15)
+             * (((((((h * c.h6) >> 10) * (((h * c.h3) >> 11) + 32768)) >> 10) + 2097152) * c.h2 + 8192) >> 14))
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * c.h1) >> 4)
         h = max(min(h, 419430400), 0)
         humidity = (h >> 12) / 1024.0
         return humidity
+
+    def compensate_batch(self, adc_t, adc_p, adc_h):
+        """
+        Compensate arrays of raw readings, e.g. when replaying a capture, returning arrays of
+        temperature, pressure and humidity. This requires NumPy
+        """
+        from .bme280_batch import compensate_batch
+        return compensate_batch(self.coefficients, adc_t, adc_p, adc_h)
+
+    # ---- Floating point compensation, from the datasheet's double precision formulae. These aren't used
+    # ---- for sampling but give a reference to compare the integer results against
+
+    def compensate_temperature_float(self, adc_t):
+        c = self.coefficients
+        var1 = (adc_t / 16384.0 - c.t1 / 1024.0) * c.t2
+        var2 = ((adc_t / 131072.0 - c.t1 / 8192.0) ** 2) * c.t3
+        t_fine = var1 + var2
+        return t_fine, t_fine / 5120.0
+
+    def compensate_pressure_float(self, t_fine, adc_p):
+        c = self.coefficients
+        var1 = t_fine / 2.0 - 64000.0
+        var2 = var1 * var1 * c.p6 / 32768.0
+        var2 = var2 + var1 * c.p5 * 2.0
+        var2 = var2 / 4.0 + c.p4 * 65536.0
+        var1 = (c.p3 * var1 * var1 / 524288.0 + c.p2 * var1) / 524288.0
+        var1 = (1.0 + var1 / 32768.0) * c.p1
+        if var1 == 0:
+            return 0.0
+
+        p = 1048576.0 - adc_p
+        p = (p - var2 / 4096.0) * 6250.0 / var1
+        var1 = c.p9 * p * p / 2147483648.0
+        var2 = p * c.p8 / 32768.0
+        p = p + (var1 + var2 + c.p7) / 16.0
+        return p / 100.0
+
+    def compensate_humidity_float(self, t_fine, adc_h):
+        c = self.coefficients
+        h = t_fine - 76800.0
+        h = ((adc_h - (c.h4 * 64.0 + c.h5 / 16384.0 * h))
+             * (c.h2 / 65536.0 * (1.0 + c.h6 / 67108864.0 * h * (1.0 + c.h3 / 67108864.0 * h))))
+        h = h * (1.0 - c.h1 * h / 524288.0)
+        return max(min(h, 100.0), 0.0)
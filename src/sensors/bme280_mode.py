@@ -0,0 +1,5 @@
+from enum import Enum
+
+class BME280Mode(str, Enum):
+    FORCED = "forced"
+    NORMAL = "normal"
@@ -1,3 +1,6 @@
+import struct
+from i2c import bus_transaction, get_mux
+
 # Temperature
 DIG_T1 = 0x88
 DIG_T2 = 0x8A
@@ -23,73 +26,97 @@ DIG_H5 = 0xE5
 DIG_H6 = 0xE7
 REG_E6 = 0xE6
 
+# Chip ID register
+REG_CHIP_ID = 0xD0
+
+# The trimming parameters are stored in two blocks of registers, 0x88-0xA1 and 0xE1-0xE7, which are
+# read in bulk and decoded by position. Words are little-endian and the gaps are padding
+CALIBRATION_BLOCK_1 = 0x88
+CALIBRATION_BLOCK_1_FORMAT = "<HhhHhhhhhhhhxB"
+CALIBRATION_BLOCK_2 = 0xE1
+CALIBRATION_BLOCK_2_FORMAT = "<hBbBbb"
+
+TRIMMING_PARAMETER_REGISTERS = [
+    DIG_T1, DIG_T2, DIG_T3,
+    DIG_P1, DIG_P2, DIG_P3, DIG_P4, DIG_P5, DIG_P6, DIG_P7, DIG_P8, DIG_P9,
+    DIG_H1, DIG_H2, DIG_H3, DIG_H4, DIG_H5, REG_E6, DIG_H6
+]
+
+
+def decode_trimming_parameters(block_1, block_2):
+    """
+    Decode the two calibration blocks into the trimming parameters, keyed by register
+    """
+    t1, t2, t3, p1, p2, p3, p4, p5, p6, p7, p8, p9, h1 = struct.unpack(CALIBRATION_BLOCK_1_FORMAT, bytes(block_1))
+    h2, h3, e4, e5, e6, h6 = struct.unpack(CALIBRATION_BLOCK_2_FORMAT, bytes(block_2))
+
+    return {
+        DIG_T1: t1,
+        DIG_T2: t2,
+        DIG_T3: t3,
+
+        DIG_P1: p1,
+        DIG_P2: p2,
+        DIG_P3: p3,
+        DIG_P4: p4,
+        DIG_P5: p5,
+        DIG_P6: p6,
+        DIG_P7: p7,
+        DIG_P8: p8,
+        DIG_P9: p9,
+
+        DIG_H1: h1,
+        DIG_H2: h2,
+        DIG_H3: h3,
+        DIG_H4: (e4 << 4) | (e5 & 0x0F),
+        DIG_H5: (e6 << 4) | (e5 >> 4),
+        REG_E6: e6 & 0xFF,
+        DIG_H6: h6
+    }
+
 
 class BME280TrimmingParameters:
-    def __init__(self, sm_bus, address, mux_address, channel):
+    def __init__(self, sm_bus, address, mux_address, channel, calibration_cache=None):
         self.sm_bus = sm_bus
         self.address = address
         self.mux_address = mux_address
         self.channel = channel
+        self.mux = get_mux(sm_bus)
+
+        # Use the cached parameters, if there are any for this sensor, rather than reading them again
+        self.chip_id = self._read_u8(REG_CHIP_ID)
+        if calibration_cache:
+            self.trimming_parameters = calibration_cache.load(address, channel, self.chip_id, TRIMMING_PARAMETER_REGISTERS)
+            if self.trimming_parameters:
+                return
+
+        self.trimming_parameters = self._read_trimming_parameters()
+        if calibration_cache:
+            calibration_cache.save(address, channel, self.chip_id, self.trimming_parameters)
 
-        self._select_channel()
-        e4 = self._read_s8(DIG_H4)
-        e5 = self._read_u8(DIG_H5)
-        e6 = self._read_s8(REG_E6)
-
-        self.trimming_parameters = {
-            DIG_T1: self._read_u16(0x88),
-            DIG_T2: self._read_s16(0x8A),
-            DIG_T3: self._read_s16(0x8C),
-
-            DIG_P1: self._read_u16(0x8E),
-            DIG_P2: self._read_s16(0x90),
-            DIG_P3: self._read_s16(0x92),
-            DIG_P4: self._read_s16(0x94),
-            DIG_P5: self._read_s16(0x96),
-            DIG_P6: self._read_s16(0x98),
-            DIG_P7: self._read_s16(0x9A),
-            DIG_P8: self._read_s16(0x9C),
-            DIG_P9: self._read_s16(0x9E),
-
-            DIG_H1: self._read_u8(0xA1),
-            DIG_H2: self._read_s16(0xE1),
-            DIG_H3: self._read_u8(0xE3),
-            DIG_H4: (e4 << 4) | (e5 & 0x0F),
-            DIG_H5: (e6 << 4) | (e5 >> 4),
-            REG_E6: self._read_u8(0xE6),
-            DIG_H6: self._read_s8(0xE7)
-        }
+    def _read_trimming_parameters(self):
+        """
+        Read the calibration blocks in one transaction on a shared bus and decode them
+        """
+        with bus_transaction(self.sm_bus):
+            self._select_channel()
+            block_1 = self.sm_bus.read_i2c_block_data(self.address, CALIBRATION_BLOCK_1, struct.calcsize(CALIBRATION_BLOCK_1_FORMAT))
+            block_2 = self.sm_bus.read_i2c_block_data(self.address, CALIBRATION_BLOCK_2, struct.calcsize(CALIBRATION_BLOCK_2_FORMAT))
+        return decode_trimming_parameters(block_1, block_2)
 
     # ---- I2C helpers
     def _select_channel(self):
-        if self.mux_address and self.channel:
-            self.sm_bus.write_byte(self.mux_address, 1 << self.channel)
+        self.mux.select(self.sm_bus, self.mux_address, self.channel)
 
     def _read_u8(self, reg):
-        self._select_channel()
-        return self.sm_bus.read_byte_data(self.address, reg)
-
-    def _read_s8(self, reg):
-        self._select_channel()
-        v = self._read_u8(reg)
-        return v - 256 if v > 127 else v
-
-    def _read_u16(self, reg):
-        self._select_channel()
-        lo = self._read_u8(reg)
-        hi = self._read_u8(reg + 1)
-        return (hi << 8) | lo
-
-    def _read_s16(self, reg):
-        self._select_channel()
-        lo = self._read_u8(reg)
-        hi = self._read_u8(reg + 1)
-        val = (hi << 8) | lo
-        return val - 65536 if val > 32767 else val
+        with bus_transaction(self.sm_bus):
+            self._select_channel()
+            return self.sm_bus.read_byte_data(self.address, reg)
 
     def _write_u8(self, reg, val):
-        self._select_channel()
-        self.sm_bus.write_byte_data(self.address, reg, val)
+        with bus_transaction(self.sm_bus):
+            self._select_channel()
+            self.sm_bus.write_byte_data(self.address, reg, val)
 
     def get_trimming_parameter(self, reg):
         return self.trimming_parameters[reg]
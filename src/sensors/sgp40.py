@@ -1,15 +1,77 @@
 import time
+from functools import lru_cache
+
+
+def _crc8_table_entry(byte: int) -> int:
+    """
+    CRC-8 (polynomial 0x31) of a single byte, used to build the lookup table
+    """
+    crc = byte
+    for _ in range(8):
+        if crc & 0x80:
+            crc = ((crc << 1) ^ 0x31) & 0xFF
+        else:
+            crc = (crc << 1) & 0xFF
+    return crc
+
+
+# CRC-8 lookup table, so the CRC is calculated a byte at a time rather than a bit at a time
+CRC8_TABLE = bytes(_crc8_table_entry(b) for b in range(256))
+
+# Sensirion's gas index algorithm states are only meaningful after this many seconds of continuous operation.
+# Until then, or until they've been restored from a checkpoint, the algorithm is cold and isn't checkpointed
+VOC_LEARNING_PERIOD = 3 * 60 * 60
+
+# Default interval, in seconds, between VOC algorithm state checkpoints. This must be well inside the
+# checkpoint's maximum age, or a restart would always find it stale
+DEFAULT_CHECKPOINT_INTERVAL = 60
+
+# Number of measure-raw frames to keep. The compensation values only change when there's a new BME280
+# reading, so in practice only the most recent is reused
+MEASURE_FRAME_CACHE_SIZE = 16
+
+
+def crc8_sgp40(two_bytes: bytes) -> int:
+    """
+    CRC-8 for SGP40 (polynomial 0x31, init 0xFF).
+    """
+    crc = 0xFF
+    for b in two_bytes:
+        crc = CRC8_TABLE[crc ^ b]
+    return crc
+
+
+@lru_cache(maxsize=MEASURE_FRAME_CACHE_SIZE)
+def _measure_frame(rh_ticks: int, t_ticks: int) -> bytes:
+    """
+    Build the 8-byte 'measure raw' command frame for a pair of compensation ticks
+    """
+    rh = bytes([(rh_ticks >> 8) & 0xFF, rh_ticks & 0xFF])
+    t = bytes([(t_ticks >> 8) & 0xFF, t_ticks & 0xFF])
+
+    # Command 0x26 0x0F = "measure raw signal"
+    return bytes([0x26, 0x0F]) + rh + bytes([crc8_sgp40(rh)]) + t + bytes([crc8_sgp40(t)])
+
 
 class SGP40:
     """
     Wrapper for the Sensirion SGP40 VOC sensor
     """
 
-    def __init__(self, i2c_device, voc_algorithm, measurement_delay = 0.03):
+    def __init__(self, i2c_device, voc_algorithm, measurement_delay = 0.03, checkpoint = None,
+                 checkpoint_interval = DEFAULT_CHECKPOINT_INTERVAL):
         self.i2c_device = i2c_device
         self.delay = measurement_delay
         self._voc = voc_algorithm
 
+        # The VOC algorithm states are checkpointed periodically and restored, if the checkpoint's recent
+        # enough, so a restart doesn't mean starting the learning period again
+        self.checkpoint = checkpoint if voc_algorithm is not None else None
+        self.checkpoint_interval = checkpoint_interval
+        self.cold_start = time.monotonic()
+        self.next_checkpoint = self.cold_start + checkpoint_interval
+        self.restored = self._restore_voc_state()
+
     # ---------- low-level command construction ----------
 
     def _crc8_sgp40(self, two_bytes: bytes) -> int:
@@ -17,15 +79,7 @@ class SGP40:
         CRC-8 for SGP40 (polynomial 0x31, init 0xFF).
         'two_bytes' must be length 2.
         """
-        crc = 0xFF
-        for b in two_bytes:
-            crc ^= b
-            for _ in range(8):
-                if crc & 0x80:
-                    crc = ((crc << 1) ^ 0x31) & 0xFF
-                else:
-                    crc = (crc << 1) & 0xFF
-        return crc
+        return crc8_sgp40(two_bytes)
 
 
     def _humidity_to_ticks(self, h: float) -> int:
@@ -50,32 +104,10 @@ class SGP40:
     def _build_command(self, humidity, temperature) -> bytes:
         """
         Build the 8-byte 'measure raw' command frame with humidity &
-        temperature compensation
-        """
-        rh_ticks = self._humidity_to_ticks(humidity)
-        t_ticks = self._temperature_to_ticks(temperature)
-
-        rh_msb = (rh_ticks >> 8) & 0xFF
-        rh_lsb = rh_ticks & 0xFF
-        t_msb = (t_ticks >> 8) & 0xFF
-        t_lsb = t_ticks & 0xFF
-
-        rh_crc = self._crc8_sgp40(bytes([rh_msb, rh_lsb]))
-        t_crc = self._crc8_sgp40(bytes([t_msb, t_lsb]))
-
-        # Command 0x26 0x0F = "measure raw signal"
-        return bytes(
-            [
-                0x26,
-                0x0F,
-                rh_msb,
-                rh_lsb,
-                rh_crc,
-                t_msb,
-                t_lsb,
-                t_crc,
-            ]
-        )
+        temperature compensation. Frames are cached by tick values, so the
+        CRCs aren't recalculated every second
+        """
+        return _measure_frame(self._humidity_to_ticks(humidity), self._temperature_to_ticks(temperature))
 
     # ---------- core measurement ----------
 
@@ -117,6 +149,54 @@ class SGP40:
         else:
             return ("Very Unhealthy", "*")
 
+    # ---------- VOC algorithm state ----------
+
+    def _restore_voc_state(self) -> bool:
+        """
+        Restore the VOC algorithm states from the checkpoint, returning True if they were restored
+        """
+        if self.checkpoint is None:
+            return False
+
+        states = self.checkpoint.load(type(self._voc).__name__)
+        if states is None:
+            return False
+
+        self._voc.set_states(*states)
+        return True
+
+    @property
+    def is_warm(self) -> bool:
+        """
+        True if the VOC algorithm has finished its learning period or was restored from a checkpoint
+        """
+        return self.restored or time.monotonic() - self.cold_start >= VOC_LEARNING_PERIOD
+
+    def save_voc_state(self):
+        """
+        Checkpoint the VOC algorithm states, provided the algorithm is warm. Cold states would cut short
+        the learning period on the next restart
+        """
+        if self.checkpoint is not None and self.is_warm:
+            self.checkpoint.save(type(self._voc).__name__, self._voc.get_states())
+            self.next_checkpoint = time.monotonic() + self.checkpoint_interval
+
+    def voc_state_status(self):
+        """
+        Return the warm/cold state of the VOC algorithm and the age of its checkpoint
+        """
+        if self._voc is None:
+            return None
+
+        warm = self.is_warm
+        age = self.checkpoint.age if self.checkpoint is not None else None
+        return {
+            "state": "warm" if warm else "cold",
+            "restored": self.restored,
+            "learning_remaining": 0 if warm else round(VOC_LEARNING_PERIOD - (time.monotonic() - self.cold_start)),
+            "checkpoint_age": round(age, 1) if age is not None else None
+        }
+
     # ---------- public API ----------
 
     def read(self, humidity = 50.0, temperature = 25.0):
@@ -138,5 +218,7 @@ class SGP40:
         if self._voc is not None:
             voc_index = int(self._voc.process(sraw))
             voc_label, voc_rating = self._classify_voc_index(voc_index)
+            if self.checkpoint is not None and time.monotonic() >= self.next_checkpoint:
+                self.save_voc_state()
 
         return sraw, voc_index, voc_label, voc_rating
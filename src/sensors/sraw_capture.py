@@ -0,0 +1,128 @@
+import datetime as dt
+import logging
+import struct
+import threading
+from pathlib import Path
+
+# Capture files start with a header giving the format version and record size, followed by fixed size
+# little-endian records: UTC epoch seconds, SRAW, and the compensation temperature (hundredths of a C)
+# and humidity (hundredths of a %). At 1 Hz, that's a little under 850 KB a day
+CAPTURE_MAGIC = b"SRAW"
+CAPTURE_VERSION = 1
+CAPTURE_HEADER = struct.Struct("<4sHH")
+CAPTURE_RECORD = struct.Struct("<IHhH")
+CAPTURE_FILE_PATTERN = "sraw-*.bin"
+
+# Default number of records buffered in memory before they're appended to the capture file
+DEFAULT_FLUSH_INTERVAL = 60
+
+
+def capture_file_name(epoch):
+    """
+    Return the name of the daily capture file holding a sample taken at the specified epoch seconds
+    """
+    return dt.datetime.fromtimestamp(epoch, dt.timezone.utc).strftime("sraw-%Y%m%d.bin")
+
+
+def find_capture_files(paths):
+    """
+    Return a sorted list of the capture files in a list of files and folders
+    """
+    files = []
+    for path in [Path(p) for p in paths]:
+        files.extend(sorted(path.glob(CAPTURE_FILE_PATTERN)) if path.is_dir() else [path])
+    return files
+
+
+def group_capture_streams(files):
+    """
+    Group capture files into streams, one per folder, each in date order. The files in a stream are from
+    the same sensor, so are replayed one after the other
+    """
+    streams = {}
+    for path in [Path(f) for f in files]:
+        streams.setdefault(path.parent.resolve(), []).append(path)
+    return [sorted(stream, key=lambda f: f.name) for stream in streams.values()]
+
+
+def read_capture(path):
+    """
+    Return a list of (epoch, sraw, temperature, humidity) tuples read from a capture file. A partial
+    record at the end of the file, left by a crash part way through a write, is ignored
+    """
+    data = Path(path).read_bytes()
+    if len(data) < CAPTURE_HEADER.size:
+        raise ValueError(f"{path} is not an SRAW capture file")
+
+    magic, version, record_size = CAPTURE_HEADER.unpack_from(data)
+    if magic != CAPTURE_MAGIC or version != CAPTURE_VERSION or record_size != CAPTURE_RECORD.size:
+        raise ValueError(f"{path} is not a version {CAPTURE_VERSION} SRAW capture file")
+
+    body = memoryview(data)[CAPTURE_HEADER.size:]
+    body = body[:len(body) - len(body) % CAPTURE_RECORD.size]
+    return [(epoch, sraw, temperature / 100.0, humidity / 100.0)
+            for epoch, sraw, temperature, humidity in CAPTURE_RECORD.iter_unpack(body)]
+
+
+class SRAWCapture:
+    """
+    Compact binary capture of every SGP40 SRAW reading and the compensation values it was measured
+    with, so the VOC index can be recalculated later. Records are appended to a file per UTC day and
+    are buffered, so the SD card is written to once every flush interval rather than every second
+    """
+
+    def __init__(self, folder, flush_interval=DEFAULT_FLUSH_INTERVAL):
+        if flush_interval < 1:
+            raise ValueError(f"Invalid SRAW capture flush interval: {flush_interval}")
+
+        self.folder = Path(folder)
+        self.flush_interval = flush_interval
+        self.buffer = bytearray()
+        self.file_name = None
+        self.samples = 0
+        self.lock = threading.Lock()
+
+    def _flush(self):
+        """
+        Append the buffered records to the current capture file. Callers must hold the lock
+        """
+        if not self.buffer:
+            return
+
+        path = self.folder / self.file_name
+        try:
+            self.folder.mkdir(parents=True, exist_ok=True)
+            with open(path, "ab") as f:
+                if f.tell() == 0:
+                    f.write(CAPTURE_HEADER.pack(CAPTURE_MAGIC, CAPTURE_VERSION, CAPTURE_RECORD.size))
+                f.write(self.buffer)
+        except OSError as ex:
+            logging.warning("Unable to write the SRAW capture %s: %s", path, ex)
+
+        self.buffer.clear()
+
+    def append(self, epoch, sraw, temperature, humidity):
+        """
+        Capture one reading
+        """
+        epoch = int(epoch)
+        file_name = capture_file_name(epoch)
+        with self.lock:
+            if file_name != self.file_name:
+                self._flush()
+                self.file_name = file_name
+
+            self.buffer += CAPTURE_RECORD.pack(epoch, sraw, round(temperature * 100), round(humidity * 100))
+            self.samples += 1
+            if len(self.buffer) >= self.flush_interval * CAPTURE_RECORD.size:
+                self._flush()
+
+    def flush(self):
+        """
+        Append any buffered records to the capture file
+        """
+        with self.lock:
+            self._flush()
+
+    def close(self):
+        self.flush()
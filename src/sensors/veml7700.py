@@ -1,4 +1,5 @@
 import time
+from collections import deque
 
 
 class VEML7700:
@@ -50,6 +51,18 @@ class VEML7700:
     _BASE_IT   = 100
     _BASE_RES  = 0.2304  # lux per count at BASE_GAIN/BASE_IT
 
+    # Auto-ranging thresholds. The configuration is only changed when the count leaves the range
+    # [_RANGE_LOW_COUNT, _RANGE_HIGH_COUNT], and the new configuration aims for a count no higher than
+    # _TARGET_COUNT. The gap between the target and the thresholds stops it flapping between settings
+    # when the light level hovers near a boundary
+    _SATURATED_COUNT = 65500
+    _RANGE_LOW_COUNT = 100
+    _RANGE_HIGH_COUNT = 60000
+    _TARGET_COUNT = 10000
+
+    # Window for the reconfiguration rate
+    _RECONFIGURATION_WINDOW_SECONDS = 3600
+
     # Optional specific precomputed values (used if present)
     _RESOLUTION_LUX_PER_CT = {
         (_BASE_GAIN, _BASE_IT): _BASE_RES,
@@ -57,9 +70,15 @@ class VEML7700:
         (0.125, 25): 1.8432,
     }
 
-    def __init__(self, i2c_device, gain, integration_time_ms):
+    def __init__(self, i2c_device, gain, integration_time_ms, blocking=True):
         self.i2c_device = i2c_device
 
+        # In blocking mode, changing the settings waits for an integration period. Otherwise, the
+        # time the first integration period will be complete is recorded and reads until then
+        # return None
+        self.blocking = blocking
+        self.ready_at = None
+
         # Normalise / coerce types
         gain = float(gain)
         it   = int(integration_time_ms)
@@ -68,6 +87,10 @@ class VEML7700:
         self.gain = min(self._ALLOWED_GAINS, key=lambda g: abs(g - gain))
         self.integration_time_ms = min(self._ALLOWED_IT, key=lambda t: abs(t - it))
 
+        # Auto-ranging metrics
+        self.reconfigurations = 0
+        self._reconfiguration_times = deque()
+
         # Configure sensor & compute resolution
         self._apply_settings(initial=True)
 
@@ -110,9 +133,11 @@ class VEML7700:
         # ALS_SD bit 0 -> 0 (power on)
         return word & 0xFFFF
 
-    def _apply_settings(self, initial: bool = False):
+    def _apply_settings(self, initial: bool = False) -> float:
         """
-        Write current gain/IT into the sensor and wait one integration period.
+        Write current gain/IT into the sensor and, in blocking mode, wait one
+        integration period. Returns the monotonic time at which a reading
+        using the new settings will be available.
         """
         conf = self._build_conf_word(self.gain, self.integration_time_ms)
         self.i2c_device.write_u16(self.REG_ALS_CONF, conf)
@@ -123,12 +148,21 @@ class VEML7700:
             self.i2c_device.write_u16(self.REG_ALS_WL, 0x0000)
             self.i2c_device.write_u16(self.REG_PSM,    0x0000)
 
-        # Wait at least one integration period for new config to take effect
-        time.sleep(self.integration_time_ms / 1000.0)
-
         # Update lux resolution
         self._update_resolution()
 
+        # Wait at least one integration period for new config to take effect
+        self.ready_at = time.monotonic() + self.integration_time_ms / 1000.0
+        if self.blocking:
+            time.sleep(self.integration_time_ms / 1000.0)
+
+        return self.ready_at
+
+    @property
+    def is_ready(self) -> bool:
+        """Return True if an integration period has completed since the settings were changed."""
+        return self.blocking or time.monotonic() >= self.ready_at
+
     # ------------------------------------------------------------------
     # Low-level sensor reads
     # ------------------------------------------------------------------
@@ -151,56 +185,68 @@ class VEML7700:
 
     def is_saturated(self, als_raw: int) -> bool:
         """Return True if the ALS reading is (likely) saturated."""
-        return als_raw >= 65500
+        return als_raw >= self._SATURATED_COUNT
 
     # ------------------------------------------------------------------
     # Auto-ranging helpers
     # ------------------------------------------------------------------
 
-    def _increase_sensitivity(self) -> bool:
+    def _target_range(self, als_raw: int):
         """
-        Increase sensor sensitivity (for low light) by:
-          1. Increasing gain, then
-          2. Increasing integration time.
-        Returns True if a change was made.
+        Return the gain and integration time that bring the count into range, predicted from the
+        current count on the basis that the count is proportional to gain * IT. Returns the current
+        settings if the count's already in range.
         """
-        # Try gain first
-        gi = self._ALLOWED_GAINS.index(self.gain)
-        if gi < len(self._ALLOWED_GAINS) - 1:
-            self.gain = self._ALLOWED_GAINS[gi + 1]
-            return True
-
-        # Then integration time
-        iti = self._ALLOWED_IT.index(self.integration_time_ms)
-        if iti < len(self._ALLOWED_IT) - 1:
-            self.integration_time_ms = self._ALLOWED_IT[iti + 1]
-            return True
-
-        # Already at maximum sensitivity
-        return False
-
-    def _decrease_sensitivity(self) -> bool:
+        if self._RANGE_LOW_COUNT <= als_raw <= self._RANGE_HIGH_COUNT:
+            return self.gain, self.integration_time_ms
+
+        # When saturated, the actual count is unknown so use the least sensitive settings, and with no
+        # count at all use the most sensitive
+        if als_raw >= self._SATURATED_COUNT:
+            return self._ALLOWED_GAINS[0], self._ALLOWED_IT[0]
+        if als_raw == 0:
+            return self._ALLOWED_GAINS[-1], self._ALLOWED_IT[-1]
+
+        # Choose the settings giving the highest predicted count that doesn't exceed the target. Of
+        # equally sensitive settings, prefer the shorter integration time
+        sensitivity = self.gain * self.integration_time_ms
+        candidates = [
+            (als_raw * gain * it / sensitivity, -it, gain, it)
+            for gain in self._ALLOWED_GAINS
+            for it in self._ALLOWED_IT
+        ]
+        in_range = [c for c in candidates if c[0] <= self._TARGET_COUNT]
+        if not in_range:
+            return self._ALLOWED_GAINS[0], self._ALLOWED_IT[0]
+
+        _, _, gain, it = max(in_range)
+        return gain, it
+
+    def _record_reconfiguration(self):
         """
-        Decrease sensor sensitivity (for bright light / saturation) by:
-          1. Decreasing integration time, then
-          2. Decreasing gain.
-        Returns True if a change was made.
+        Count a change of settings, keeping the times of those in the last hour
         """
-        # Reduce integration time first
-        iti = self._ALLOWED_IT.index(self.integration_time_ms)
-        if iti > 0:
-            self.integration_time_ms = self._ALLOWED_IT[iti - 1]
-            return True
-
-        # Then reduce gain
-        gi = self._ALLOWED_GAINS.index(self.gain)
-        if gi > 0:
-            self.gain = self._ALLOWED_GAINS[gi - 1]
-            return True
-
-        # Already at minimum sensitivity
-        return False
-    
+        now = time.monotonic()
+        self.reconfigurations += 1
+        self._reconfiguration_times.append(now)
+        while self._reconfiguration_times[0] <= now - self._RECONFIGURATION_WINDOW_SECONDS:
+            self._reconfiguration_times.popleft()
+
+    @property
+    def reconfigurations_per_hour(self) -> int:
+        """Return the number of auto-ranging reconfigurations in the last hour."""
+        cutoff = time.monotonic() - self._RECONFIGURATION_WINDOW_SECONDS
+        return sum(1 for t in self._reconfiguration_times if t > cutoff)
+
+    def ranging_status(self) -> dict:
+        """Return the current settings and auto-ranging metrics."""
+        return {
+            "gain": self.gain,
+            "integration_time_ms": self.integration_time_ms,
+            "reconfigurations": self.reconfigurations,
+            "reconfigurations_per_hour": self.reconfigurations_per_hour
+        }
+
     # ------------------------------------------------------------------
     # High-level API
     # ------------------------------------------------------------------
@@ -218,25 +264,33 @@ class VEML7700:
         Return a tuple: (als_raw, white_raw, lux_estimate).
 
         If autorange=True (default), this may adjust gain and/or integration
-        time to avoid saturation and improve low-light performance.
+        time in a single step to avoid saturation and improve low-light
+        performance.
+
+        In non-blocking mode, returns None rather than waiting if there's no
+        valid reading for the current settings yet, including straight after
+        auto-ranging has changed them. `ready_at` gives the time there will be.
         """
+        if not self.is_ready:
+            return None
+
         als = self.read_als_raw()
         white = self.read_white_raw()
 
         if autorange:
-            # Saturation / very bright - decrease sensitivity
-            if als >= 65500:
-                if self._decrease_sensitivity():
-                    self._apply_settings()
-                    als = self.read_als_raw()
-                    white = self.read_white_raw()
-
-            # Very low readings - increase sensitivity
-            elif als < 50:
-                if self._increase_sensitivity():
-                    self._apply_settings()
-                    als = self.read_als_raw()
-                    white = self.read_white_raw()
+            # If the count's out of range, move directly to the settings predicted to bring it back into
+            # range and read again
+            gain, it = self._target_range(als)
+            if (gain, it) != (self.gain, self.integration_time_ms):
+                self.gain = gain
+                self.integration_time_ms = it
+                self._apply_settings()
+                self._record_reconfiguration()
+                if not self.blocking:
+                    return None
+
+                als = self.read_als_raw()
+                white = self.read_white_raw()
 
         lux = als * self._resolution
         return als, white, lux
\ No newline at end of file
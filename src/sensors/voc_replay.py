@@ -0,0 +1,50 @@
+import time
+from .sraw_capture import read_capture
+from .voc_replay_algorithm import VOCReplayAlgorithm
+
+# Defaults for the experimental VOC index calculator, matching its constructor
+DEFAULT_CALCULATOR_ALPHA = 0.001
+DEFAULT_CALCULATOR_SCALE = 300.0
+
+
+def algorithm_label(algorithm, alpha=DEFAULT_CALCULATOR_ALPHA, scale=DEFAULT_CALCULATOR_SCALE):
+    """
+    Return the label the recalculated VOC index series is stored under, which includes the tuning
+    parameters for the experimental calculator so different tunings can be compared
+    """
+    algorithm = VOCReplayAlgorithm(algorithm)
+    if algorithm == VOCReplayAlgorithm.CALCULATOR:
+        return f"{algorithm.value}:alpha={alpha:g}:scale={scale:g}"
+    return algorithm.value
+
+
+def create_voc_process(algorithm, alpha=DEFAULT_CALCULATOR_ALPHA, scale=DEFAULT_CALCULATOR_SCALE):
+    """
+    Return a function that feeds an SRAW reading into a new, cold, instance of a VOC algorithm and
+    returns the VOC index. The instance keeps its state between calls. The algorithms are imported here, so only the one that's used is needed
+    """
+    algorithm = VOCReplayAlgorithm(algorithm)
+    if algorithm == VOCReplayAlgorithm.SENSIRION:
+        from sensirion_gas_index_algorithm.voc_algorithm import VocAlgorithm
+        return VocAlgorithm().process
+
+    from experimental.voc_index_calculator import VOCIndexCalculator
+    return VOCIndexCalculator(alpha, scale).update
+
+
+def replay_stream(paths, algorithm, alpha=DEFAULT_CALCULATOR_ALPHA, scale=DEFAULT_CALCULATOR_SCALE):
+    """
+    Replay a stream of SRAW capture files, in order, through one instance of a VOC algorithm, so its
+    state carries over from one file to the next as it did when the readings were taken. Returns a list
+    of (path, rows, elapsed) tuples, one per file, where the rows are (epoch, sraw, VOC index) tuples and
+    elapsed is the time taken, in seconds, to calculate them. This is run in a worker process, so
+    everything it's given and returns can be pickled
+    """
+    process = create_voc_process(algorithm, alpha, scale)
+    results = []
+    for path in paths:
+        samples = read_capture(path)
+        start = time.perf_counter()
+        rows = [(epoch, sraw, int(process(sraw))) for epoch, sraw, _, _ in samples]
+        results.append((str(path), rows, time.perf_counter() - start))
+    return results
@@ -0,0 +1,5 @@
+from enum import Enum
+
+class VOCReplayAlgorithm(str, Enum):
+    SENSIRION = "sensirion"
+    CALCULATOR = "calculator"
@@ -0,0 +1,76 @@
+import json
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+
+# Sensirion only support restoring the gas index algorithm states after an interruption of up to 10 minutes.
+# Older checkpoints are ignored and the algorithm starts its learning period from scratch
+DEFAULT_MAX_CHECKPOINT_AGE = 600
+
+
+class VOCStateCheckpoint:
+    """
+    On-disk checkpoint of the VOC algorithm states, so the VOC index doesn't start cold each time the
+    service restarts. The states are saved with the name of the algorithm they came from, so they can't
+    be restored into a different algorithm
+    """
+
+    def __init__(self, checkpoint_file, max_age=DEFAULT_MAX_CHECKPOINT_AGE):
+        self.checkpoint_file = Path(checkpoint_file)
+        self.max_age = max_age
+        self.saved_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def age(self):
+        """
+        Return the number of seconds since the checkpoint was written, or None if there isn't one
+        """
+        return max(0.0, time.time() - self.saved_at) if self.saved_at is not None else None
+
+    def load(self, algorithm):
+        """
+        Return the saved states for an algorithm, or None if there's no checkpoint or it's too old to use
+        """
+        with self.lock:
+            try:
+                with open(self.checkpoint_file, "r") as f:
+                    checkpoint = json.load(f)
+                saved_at = float(checkpoint["saved_at"])
+                name = checkpoint["algorithm"]
+                states = [float(state) for state in checkpoint["states"]]
+            except FileNotFoundError:
+                return None
+            except (OSError, ValueError, TypeError, KeyError) as ex:
+                logging.warning("Unable to read the VOC state checkpoint %s: %s", self.checkpoint_file, ex)
+                return None
+
+            if name != algorithm:
+                logging.warning("Ignoring VOC state checkpoint for %s: expected %s", name, algorithm)
+                return None
+
+            self.saved_at = saved_at
+            if self.age > self.max_age:
+                logging.info("Ignoring VOC state checkpoint: %.0f s old, limit %.0f s", self.age, self.max_age)
+                return None
+
+            return states
+
+    def save(self, algorithm, states):
+        """
+        Store the states for an algorithm. The file is replaced atomically so a crash part way through
+        can't leave a truncated checkpoint
+        """
+        saved_at = time.time()
+        checkpoint = {"saved_at": saved_at, "algorithm": algorithm, "states": [float(state) for state in states]}
+        with self.lock:
+            temporary_file = self.checkpoint_file.with_name(self.checkpoint_file.name + ".tmp")
+            try:
+                with open(temporary_file, "w") as f:
+                    json.dump(checkpoint, f, indent=4)
+                os.replace(temporary_file, self.checkpoint_file)
+                self.saved_at = saved_at
+            except OSError as ex:
+                logging.warning("Unable to write the VOC state checkpoint %s: %s", self.checkpoint_file, ex)
@@ -1,15 +1,24 @@
 from .request_handler import RequestHandler
+from .pooled_http_server import PooledHTTPServer
 from .sampler import Sampler
 from .bme280_sampler import BME280Sampler
 from .veml7700_sampler import VEML7700Sampler
 from .sgp40_sampler import SGP40Sampler
 from .lcd_display import LCDDisplay
+from .event_broadcaster import EventBroadcaster
+from .scheduler import Scheduler, FollowUp
+from .schedule_policy import SchedulePolicy
 
 __all__ = [
     "RequestHandler",
+    "PooledHTTPServer",
     "Sampler",
     "BME280Sampler",
     "VEML7700Sampler",
     "SGP40Sampler",
-    "LCDDisplay"
+    "LCDDisplay",
+    "EventBroadcaster",
+    "Scheduler",
+    "FollowUp",
+    "SchedulePolicy"
 ]
@@ -1,14 +1,26 @@
 import logging
 import threading
+from db.database import epoch_seconds
+from .reading_buffer import ReadingBuffer
+from .readings import BME280Reading
 
 
 class BME280Sampler:
-    def __init__(self, bme280, enabled, database):
+    # Fields held in the recent readings buffer
+    RECENT_FIELDS = [
+        ("temperature_c", "d", float),
+        ("pressure_hpa", "d", float),
+        ("humidity_pct", "d", float)
+    ]
+
+    def __init__(self, bme280, enabled, database, broadcaster=None, recent_capacity=0):
         self.database = database
+        self.broadcaster = broadcaster
         self.sensor = bme280
         self.enabled = bme280 is not None and enabled
         self.latest = None
         self.lock = threading.Lock()
+        self.recent = ReadingBuffer(recent_capacity, self.RECENT_FIELDS) if recent_capacity else None
 
     # --------------------------------------------------
     # BME280 reading capture and storage
@@ -25,18 +37,24 @@ class BME280Sampler:
 
     def _store(self, timestamp, temperature, pressure, humidity, clear):
         """
-        Store the latest readings
+        Store the latest readings. The new reading replaces the reference to the previous one, so readers
+        don't need the lock
         """
         with self.lock:
             if clear:
                 self.latest = None
             elif self.enabled:
-                self.latest = {
-                    "time_utc": timestamp,
-                    "temperature_c": round(temperature, 2),
-                    "pressure_hpa": round(pressure, 2),
-                    "humidity_pct": round(humidity, 2),
-                }
+                reading = BME280Reading(timestamp, round(temperature, 2), round(pressure, 2), round(humidity, 2))
+                if self.recent is not None:
+                    self.recent.append(epoch_seconds(timestamp), reading[1:])
+                self.latest = reading
+
+    def _publish(self):
+        """
+        Push the latest readings to any live event stream clients
+        """
+        if self.broadcaster:
+            self.broadcaster.publish("bme", self.latest)
 
     # --------------------------------------------------
     # Public API
@@ -46,18 +64,32 @@ class BME280Sampler:
         if self.sensor and self.enabled:
             timestamp, temperature, pressure, humidity = self._sample()
             self._store(timestamp, temperature, pressure, humidity, False)
+            self._publish()
 
     @property
     def latest_reading(self):
         return self.latest
 
+    def recent_readings(self, since=None):
+        """
+        Return the recent readings held in memory, oldest first, optionally only those since an epoch time
+        """
+        return self.recent.snapshot(since) if self.recent is not None else []
+
     def disable(self):
         self.enabled = False
         self._store(None, None, None, None, True)
+        self._publish()
 
     def enable(self):
         self.enabled = self.sensor is not None
 
+    def measurement_status(self, interval):
+        """
+        Return the sensor's measurement configuration, latency and estimated current, if it's available
+        """
+        return self.sensor.measurement_status(interval) if self.sensor else None
+
     @property
     def is_enabled(self):
         return self.enabled
@@ -0,0 +1,154 @@
+import logging
+import threading
+from collections import deque
+from .readings import to_json_bytes
+
+DEFAULT_CLIENT_BUFFER_SIZE = 32
+DEFAULT_MAX_CLIENTS = 4
+DEFAULT_HEARTBEAT_SECONDS = 15.0
+
+# Comment line sent as a keepalive when there have been no events for a while
+HEARTBEAT = b": keepalive\n\n"
+
+
+def format_event(event, body):
+    """
+    Frame an event, whose data has already been serialised as JSON, in the Server-Sent Events wire format
+    """
+    return b"event: " + event.encode("utf-8") + b"\ndata: " + body + b"\n\n"
+
+
+class EventSubscription:
+    """
+    A single client's view of the event stream. Events are held in a bounded buffer until the
+    client's request handler thread writes them out
+    """
+
+    def __init__(self, buffer_size):
+        self.buffer = deque()
+        self.buffer_size = buffer_size
+        self.condition = threading.Condition()
+        self.closed = False
+
+    def put(self, event):
+        """
+        Buffer an event, returning False if the buffer is full or the subscription has been closed
+        """
+        with self.condition:
+            if self.closed or len(self.buffer) >= self.buffer_size:
+                return False
+            self.buffer.append(event)
+            self.condition.notify()
+            return True
+
+    def close(self):
+        """
+        Close the subscription, waking the client's thread so it can end the response
+        """
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+
+    def get(self, timeout):
+        """
+        Wait for the next serialised event. Returns None if nothing arrives within the timeout, so the
+        caller can send a heartbeat, or once a closed subscription's buffer is empty
+        """
+        with self.condition:
+            self.condition.wait_for(lambda: self.buffer or self.closed, timeout)
+            return self.buffer.popleft() if self.buffer else None
+
+
+class EventBroadcaster:
+    """
+    Fan-out of live readings to Server-Sent Events clients. Each event is serialised once, however
+    many clients there are, and publishing never blocks: a client whose buffer is full is too slow to
+    keep up and is dropped, leaving the browser's EventSource to reconnect
+    """
+
+    def __init__(self, buffer_size=DEFAULT_CLIENT_BUFFER_SIZE, max_clients=DEFAULT_MAX_CLIENTS):
+        self.buffer_size = max(1, int(buffer_size))
+        self.max_clients = max_clients
+        self.subscriptions = []
+        self.listeners = []
+        self.lock = threading.Lock()
+        self.closed = False
+
+        # Metrics
+        self.published = 0
+        self.dropped_clients = 0
+
+    def subscribe(self):
+        """
+        Return a new subscription, or None if the maximum number of clients are already subscribed. If
+        the broadcaster has been closed, it's returned already closed
+        """
+        subscription = EventSubscription(self.buffer_size)
+        with self.lock:
+            if self.closed:
+                subscription.close()
+            elif self.max_clients and len(self.subscriptions) >= self.max_clients:
+                return None
+            else:
+                self.subscriptions.append(subscription)
+        return subscription
+
+    def add_listener(self, listener):
+        """
+        Register a function to be called with the event name, the data and the data serialised as JSON
+        each time an event is published, so listeners can reuse the serialised data
+        """
+        self.listeners.append(listener)
+
+    def unsubscribe(self, subscription):
+        """
+        Remove a subscription when its client disconnects
+        """
+        with self.lock:
+            if subscription in self.subscriptions:
+                self.subscriptions.remove(subscription)
+        subscription.close()
+
+    def publish(self, event, data):
+        """
+        Serialise an event and buffer it for every subscriber, dropping any that can't keep up
+        """
+        body = to_json_bytes(data)
+        message = format_event(event, body)
+        with self.lock:
+            self.published += 1
+            slow = [s for s in self.subscriptions if not s.put(message)]
+            for subscription in slow:
+                self.subscriptions.remove(subscription)
+                self.dropped_clients += 1
+
+        for subscription in slow:
+            logging.info("Dropped a slow event stream client")
+            subscription.close()
+
+        for listener in self.listeners:
+            listener(event, data, body)
+
+    def close(self):
+        """
+        Close all subscriptions, ending their responses
+        """
+        with self.lock:
+            self.closed = True
+            subscriptions = self.subscriptions
+            self.subscriptions = []
+
+        for subscription in subscriptions:
+            subscription.close()
+
+    @property
+    def metrics(self):
+        """
+        Return a snapshot of the broadcaster metrics
+        """
+        with self.lock:
+            return {
+                "clients": len(self.subscriptions),
+                "published": self.published,
+                "dropped_clients": self.dropped_clients
+            }
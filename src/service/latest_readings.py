@@ -0,0 +1,31 @@
+import hashlib
+import threading
+
+
+class LatestReadings:
+    """
+    Pre-serialised response body for the combined latest readings endpoint. The body and its ETag are
+    built once each time the readings change and the same bytes are then served to every request
+    until the next change
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.response = None
+
+    def update_serialised(self, parts):
+        """
+        Replace the cached body and ETag with an object built from a dictionary of already serialised
+        JSON values, so values that haven't changed aren't serialised again
+        """
+        body = b"{" + b",".join(b'"' + key.encode("utf-8") + b'":' + value for key, value in parts.items()) + b"}"
+        etag = f'"{hashlib.blake2b(body, digest_size=8).hexdigest()}"'
+        with self.lock:
+            self.response = (body, etag)
+
+    def get(self):
+        """
+        Return the cached body and ETag as a tuple
+        """
+        with self.lock:
+            return self.response
@@ -34,7 +34,7 @@ class LCDDisplay:
         have_reading = values is not None
         if have_reading:
             # Extract the timestamp and reading
-            text = f"{label} = {values[member]}{units}" if values else f"No {label} reading"
+            text = f"{label} = {getattr(values, member)}{units}" if values else f"No {label} reading"
 
             # Display the timestamp and reading
             with self.lock:
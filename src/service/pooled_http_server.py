@@ -0,0 +1,114 @@
+import logging
+import queue
+import threading
+from http.server import HTTPServer
+
+DEFAULT_WORKERS = 8
+DEFAULT_QUEUE_SIZE = 32
+DEFAULT_IDLE_TIMEOUT_SECONDS = 5.0
+WORKER_POLL_INTERVAL_SECONDS = 0.5
+
+# Response sent, without involving a worker, when every worker is busy and the queue is full
+SERVICE_UNAVAILABLE = b"HTTP/1.1 503 Service Unavailable\r\nContent-Length: 0\r\nRetry-After: 1\r\nConnection: close\r\n\r\n"
+
+
+class PooledHTTPServer(HTTPServer):
+    """
+    HTTP server that hands accepted connections to a fixed pool of worker threads rather than starting
+    a thread per connection. Each worker serves all the requests on a persistent connection until the
+    client closes it or it's been idle for the handler's timeout. Connections that can't be queued for
+    a worker are refused with a 503, so a burst of clients can't exhaust the Pi's memory
+    """
+
+    def __init__(self, server_address, handler_class, workers=DEFAULT_WORKERS, queue_size=DEFAULT_QUEUE_SIZE):
+        super().__init__(server_address, handler_class)
+        self.connections = queue.Queue(max(1, int(queue_size)))
+        self.stopping = threading.Event()
+        self.lock = threading.Lock()
+
+        # Metrics
+        self.accepted = 0
+        self.rejected = 0
+        self.active = 0
+
+        self.workers = [threading.Thread(target=self._worker, daemon=True) for _ in range(max(1, int(workers)))]
+        for worker in self.workers:
+            worker.start()
+
+    def _worker(self):
+        """
+        Serve queued connections until the server is closed
+        """
+        while not self.stopping.is_set():
+            try:
+                item = self.connections.get(timeout=WORKER_POLL_INTERVAL_SECONDS)
+            except queue.Empty:
+                continue
+            if item is None:
+                break
+
+            request, client_address = item
+            with self.lock:
+                self.active += 1
+            try:
+                self.finish_request(request, client_address)
+            except Exception:
+                self.handle_error(request, client_address)
+            finally:
+                self.shutdown_request(request)
+                with self.lock:
+                    self.active -= 1
+
+    def process_request(self, request, client_address):
+        """
+        Queue an accepted connection for the next free worker
+        """
+        try:
+            self.connections.put_nowait((request, client_address))
+            with self.lock:
+                self.accepted += 1
+        except queue.Full:
+            with self.lock:
+                self.rejected += 1
+            logging.warning("HTTP worker pool is busy, refusing connection from %s", client_address[0])
+            try:
+                request.sendall(SERVICE_UNAVAILABLE)
+            except OSError:
+                pass
+            self.shutdown_request(request)
+
+    def server_close(self):
+        """
+        Stop the workers, close any connections still waiting for one and close the listening socket
+        """
+        super().server_close()
+        self.stopping.set()
+        while True:
+            try:
+                request, _ = self.connections.get_nowait()
+            except queue.Empty:
+                break
+            self.shutdown_request(request)
+
+        # Wake the idle workers so they see the stop request, then wait for them
+        for _ in self.workers:
+            try:
+                self.connections.put_nowait(None)
+            except queue.Full:
+                break
+        for worker in self.workers:
+            worker.join(WORKER_POLL_INTERVAL_SECONDS * 2)
+
+    @property
+    def metrics(self):
+        """
+        Return a snapshot of the connection handling metrics
+        """
+        with self.lock:
+            return {
+                "workers": len(self.workers),
+                "active_connections": self.active,
+                "queued_connections": self.connections.qsize(),
+                "accepted": self.accepted,
+                "rejected": self.rejected
+            }
@@ -0,0 +1,99 @@
+import bisect
+import time
+from array import array
+from db.database import iso_timestamp
+
+
+class ReadingBuffer:
+    """
+    Fixed-size ring buffer of recent readings, so short-range history can be served from memory. Each
+    field is held in its own typed array, alongside an array of epoch seconds, so the buffer doesn't
+    allocate per reading once it's created.
+
+    There's a single writer, the sampler thread for the sensor. Readers don't take a lock: a sequence
+    number is incremented before and after each write and a reader copies the arrays, retrying if a
+    write started or finished while it was copying.
+
+    Missing values are tracked in a separate validity array per field, rather than as NaN, because
+    integer and boolean arrays can't hold NaN
+    """
+
+    def __init__(self, capacity, fields):
+        """
+        :param capacity: Number of readings held
+        :param fields: List of (name, typecode, converter) tuples. The typecode is the array type used to
+                       store the field and the converter turns a stored value back into its reported type
+        """
+        if capacity < 1:
+            raise ValueError(f"Invalid reading buffer capacity: {capacity}")
+
+        self.capacity = capacity
+        self.fields = fields
+        self.times = array("q", [0]) * capacity
+        self.columns = [array(typecode, [0]) * capacity for _, typecode, _ in fields]
+        self.valid = [array("b", [0]) * capacity for _ in fields]
+        self.count = 0
+        self.sequence = 0
+
+    def append(self, epoch, values):
+        """
+        Add a reading, overwriting the oldest if the buffer's full. Values of None are stored as zero and
+        marked as missing in the validity array for the field
+        """
+        index = self.count % self.capacity
+        self.sequence += 1
+        self.times[index] = int(epoch)
+        for column, valid, value in zip(self.columns, self.valid, values):
+            if value is None:
+                column[index] = 0
+                valid[index] = 0
+            else:
+                column[index] = value
+                valid[index] = 1
+        self.count += 1
+        self.sequence += 1
+
+    def _copy(self):
+        """
+        Return a consistent copy of the count, times, columns and validity arrays
+        """
+        while True:
+            sequence = self.sequence
+            if sequence & 1:
+                # A write's in progress, so give the writer a chance to finish it
+                time.sleep(0)
+                continue
+
+            count = self.count
+            times = self.times[:]
+            columns = [column[:] for column in self.columns]
+            valid = [flags[:] for flags in self.valid]
+            if self.sequence == sequence:
+                return count, times, columns, valid
+
+    def snapshot(self, since=None):
+        """
+        Return a list of reading dictionaries, oldest first, optionally only those taken at or after an
+        epoch time
+        """
+        count, times, columns, valid = self._copy()
+
+        # Put the readings in order, oldest first
+        size = min(count, self.capacity)
+        start = count % self.capacity if count > self.capacity else 0
+        order = list(range(start, size)) + list(range(0, start))
+        times = [times[i] for i in order]
+
+        first = bisect.bisect_left(times, since) if since is not None else 0
+        readings = []
+        for position in range(first, size):
+            index = order[position]
+            reading = {"time_utc": iso_timestamp(times[position])}
+            for (name, _, converter), column, flags in zip(self.fields, columns, valid):
+                reading[name] = converter(column[index]) if flags[index] else None
+            readings.append(reading)
+
+        return readings
+
+    def __len__(self):
+        return min(self.count, self.capacity)
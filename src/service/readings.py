@@ -0,0 +1,47 @@
+import json
+from typing import NamedTuple
+
+# Immutable reading records, shared by the samplers, the LCD and the HTTP handlers. A sampler publishes a new
+# reading by replacing its reference to the latest one, so readers can use it without a lock or a copy
+
+
+class BME280Reading(NamedTuple):
+    time_utc: str
+    temperature_c: float
+    pressure_hpa: float
+    humidity_pct: float
+
+
+class VEML7700Reading(NamedTuple):
+    time_utc: str
+    gain: float
+    integration_time_ms: int
+    als: int
+    white: int
+    illuminance_lux: float
+    saturated: bool
+
+
+class SGP40Reading(NamedTuple):
+    time_utc: str
+    sraw: int
+    voc_index: int
+    voc_label: str
+    voc_rating: str
+    temperature_c: float
+    humidity_pc: float
+
+
+def as_dict(reading):
+    """
+    Return a reading as a dictionary, for serialisation. Anything that isn't a reading, including None,
+    is returned unchanged
+    """
+    return reading._asdict() if isinstance(reading, tuple) and hasattr(reading, "_asdict") else reading
+
+
+def to_json_bytes(reading):
+    """
+    Serialise a reading, or None, as compact JSON
+    """
+    return json.dumps(as_dict(reading), separators=(",", ":")).encode("utf-8")
@@ -1,21 +1,51 @@
 from .sampler import Sampler
 from .http_method import HttpMethod
+from .event_broadcaster import DEFAULT_HEARTBEAT_SECONDS, HEARTBEAT, format_event
+from .pooled_http_server import DEFAULT_IDLE_TIMEOUT_SECONDS
 from registry import DeviceType
 from http.server import BaseHTTPRequestHandler
+from urllib.parse import urlsplit, parse_qs
+import logging
 import json
 import datetime as dt
 
+# Range of history returned if the "from" parameter isn't specified
+DEFAULT_HISTORY_SECONDS = 86400
+
+# Units accepted as a suffix to the "step" parameter e.g. 15m, 1h, 1d
+STEP_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
 
 class RequestHandler(BaseHTTPRequestHandler):
     sampler: Sampler = None
+    heartbeat_interval: float = DEFAULT_HEARTBEAT_SECONDS
+
+    # HTTP/1.1 allows clients to make several requests on one connection and is needed for chunked
+    # transfer encoding of streamed responses. A persistent connection that's idle for longer than the
+    # timeout is closed, freeing its worker
+    protocol_version = "HTTP/1.1"
+    timeout: float = DEFAULT_IDLE_TIMEOUT_SECONDS
+
+    # The headers and body are written separately so, on a persistent connection, Nagle's algorithm would
+    # hold the body back until the client's delayed ACK for the headers
+    disable_nagle_algorithm = True
 
     ROUTES = {
         HttpMethod.GET: {
             "/api/health": "_health",
             "/api/status": "_status",
+            "/api/metrics": "_metrics",
+            "/api/events": "_events",
+            "/api/latest": "_latest",
             "/api/bme/latest": "_latest_bme_readings",
             "/api/veml/latest": "_latest_veml_readings",
             "/api/sgp/latest": "_latest_sgp_readings",
+            "/api/bme/history": "_bme_history",
+            "/api/veml/history": "_veml_history",
+            "/api/sgp/history": "_sgp_history",
+            "/api/bme/recent": "_bme_recent",
+            "/api/veml/recent": "_veml_recent",
+            "/api/sgp/recent": "_sgp_recent",
         },
         HttpMethod.PUT: {
             "/api/bme/on": "_bme_on",
@@ -41,18 +71,153 @@ class RequestHandler(BaseHTTPRequestHandler):
         # Fall through to "no handler"
         return None
 
+    def _parse_path(self):
+        """
+        Split the request path into the route and the query parameters, keeping the last value given
+        for each parameter
+        """
+        url = urlsplit(self.path)
+        self.query = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return url.path.casefold()
+
     def _json(self, status: int, payload: dict):
         """
         Convert the payload to JSON and send it as the response
         """
         body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        return self._send_json_bytes(status, body)
+
+    def _send_json_bytes(self, status: int, body: bytes, etag: str = None):
+        """
+        Send an already serialised JSON body as the response
+        """
         self.send_response(status)
         self.send_header("Content-Type", "application/json")
         self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            self.send_header("Cache-Control", "no-cache")
         self.send_header("Access-Control-Allow-Origin", "*")
         self.end_headers()
         self.wfile.write(body)
 
+    def _not_modified(self, etag: str):
+        """
+        Send a 304 response, telling the client its cached copy is current
+        """
+        self.send_response(304)
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        """
+        Write part of a streamed response body, using chunked encoding if the client supports it
+        """
+        if self.chunked:
+            self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        elif data:
+            self.wfile.write(data)
+
+    def _stream_json_array(self, chunks):
+        """
+        Stream a JSON array from a generator of lists of items, writing each list as it's generated so
+        the whole response is never held in memory
+        """
+        # Read the first chunk before sending the headers, so a failed query can still be reported
+        try:
+            chunk = next(chunks, None)
+        except Exception as ex:
+            logging.warning("History query failed: %s", ex)
+            return self._json(500, {"error": "History query failed"})
+
+        self.chunked = self.request_version != "HTTP/1.0"
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        if self.chunked:
+            self.send_header("Transfer-Encoding", "chunked")
+        else:
+            # Without chunking, the end of the response is marked by closing the connection
+            self.send_header("Connection", "close")
+        self.send_header("Access-Control-Allow-Origin", "*")
+        self.end_headers()
+
+        try:
+            separator = b"["
+            while chunk:
+                body = b",".join(json.dumps(item, separators=(",", ":")).encode("utf-8") for item in chunk)
+                self._write_chunk(separator + body)
+                separator = b","
+                chunk = next(chunks, None)
+
+            # Complete the array and, if chunked, send the zero-length terminating chunk
+            self._write_chunk(b"[]" if separator == b"[" else b"]")
+            self._write_chunk(b"")
+        except (BrokenPipeError, ConnectionResetError):
+            logging.info("History client disconnected")
+            self.close_connection = True
+        except Exception as ex:
+            # The status has already been sent, so the best that can be done is to truncate the response
+            logging.warning("History query failed: %s", ex)
+            self.close_connection = True
+        finally:
+            chunks.close()
+
+    def _parse_time(self, value: str, default: int):
+        """
+        Parse a time given as epoch seconds or an ISO-8601 timestamp, assumed to be UTC if no offset is
+        given, and return epoch seconds
+        """
+        if value is None:
+            return default
+        if value.isdigit():
+            return int(value)
+        parsed = dt.datetime.fromisoformat(value.removesuffix("Z"))
+        if parsed.tzinfo is None:
+            parsed = parsed.replace(tzinfo=dt.timezone.utc)
+        return int(parsed.timestamp())
+
+    def _parse_step(self, value: str):
+        """
+        Parse a step given in seconds, optionally with an s, m, h or d suffix. No step means raw readings
+        """
+        if not value:
+            return None
+        multiplier = STEP_UNITS.get(value[-1], None)
+        step = int(value[:-1]) * multiplier if multiplier else int(value)
+        if step <= 0:
+            raise ValueError(f"Invalid step: {value}")
+        return step
+
+    def _history(self, device: DeviceType):
+        """
+        Handle a request for the historical readings for a device
+        """
+        try:
+            now = int(dt.datetime.now(dt.timezone.utc).timestamp())
+            end = self._parse_time(self.query.get("to"), now)
+            start = self._parse_time(self.query.get("from"), end - DEFAULT_HISTORY_SECONDS)
+            step = self._parse_step(self.query.get("step"))
+        except ValueError as ex:
+            return self._json(400, {"error": str(ex)})
+
+        if start >= end:
+            return self._json(400, {"error": "The start of the range must be before the end"})
+
+        return self._stream_json_array(self.sampler.get_history(device, start, end, step))
+
+    def _recent(self, device: DeviceType):
+        """
+        Handle a request for the recent readings for a device, which are held in memory by the sampler
+        """
+        try:
+            since = self._parse_time(self.query.get("from"), None)
+        except ValueError as ex:
+            return self._json(400, {"error": str(ex)})
+
+        return self._json(200, self.sampler.get_recent(device, since))
+
     def _health(self):
         """
         Construct a health check response
@@ -67,12 +232,82 @@ class RequestHandler(BaseHTTPRequestHandler):
         status = self.sampler.get_device_status()
         return self._json(200, status)
 
+    def _metrics(self):
+        """
+        Handle a request for the sampler performance metrics
+        """
+        metrics = self.sampler.get_metrics()
+        metrics["http"] = getattr(self.server, "metrics", None)
+        return self._json(200, metrics)
+
+    def _events(self):
+        """
+        Stream live readings to the client as Server-Sent Events, starting with the latest reading from
+        each sensor. The response continues until the client disconnects, falls too far behind or the
+        service stops
+        """
+        # Each stream occupies a worker for as long as it's open, so the number of streams is limited
+        subscription = self.sampler.subscribe()
+        if not subscription:
+            return self._json(503, {"error": "Too many event stream clients"})
+
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Connection", "close")
+            self.end_headers()
+
+            self.wfile.write(format_event("bme", self.sampler.get_latest_body("bme")))
+            self.wfile.write(format_event("veml", self.sampler.get_latest_body("veml")))
+            self.wfile.write(format_event("sgp", self.sampler.get_latest_body("sgp")))
+            self.wfile.flush()
+
+            # Write each event as it's published, with a heartbeat if there's been nothing for a while so
+            # idle proxies don't close the connection and a disconnected client is noticed
+            while True:
+                event = subscription.get(self.heartbeat_interval)
+                if event:
+                    self.wfile.write(event)
+                elif subscription.closed:
+                    break
+                else:
+                    self.wfile.write(HEARTBEAT)
+                self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            logging.info("Event stream client disconnected")
+        finally:
+            self.sampler.unsubscribe(subscription)
+
+    def _latest(self):
+        """
+        Handle a request for the latest readings from all sensors and the device status. The body is
+        serialised when the readings change, not per request, and a client that already has the current
+        version, identified by its ETag, gets a 304 with no body
+        """
+        body, etag = self.sampler.get_latest()
+        if etag in [tag.strip() for tag in self.headers.get("If-None-Match", "").split(",")]:
+            return self._not_modified(etag)
+        return self._send_json_bytes(200, body, etag)
+
     def _latest_bme_readings(self):
         """
         Handle a request for the latest BME280 readings captured by the sampler
         """
-        readings = self.sampler.get_latest_bme()
-        return self._json(200, readings)
+        return self._send_json_bytes(200, self.sampler.get_latest_body("bme"))
+
+    def _bme_history(self):
+        """
+        Handle a request for historical BME280 readings
+        """
+        return self._history(DeviceType.BME280)
+
+    def _bme_recent(self):
+        """
+        Handle a request for recent BME280 readings
+        """
+        return self._recent(DeviceType.BME280)
 
     def _bme_on(self):
         """
@@ -92,8 +327,19 @@ class RequestHandler(BaseHTTPRequestHandler):
         """
         Handle a request for the latest VEML7700 readings captured by the sampler
         """
-        readings = self.sampler.get_latest_veml()
-        return self._json(200, readings)
+        return self._send_json_bytes(200, self.sampler.get_latest_body("veml"))
+
+    def _veml_history(self):
+        """
+        Handle a request for historical VEML7700 readings
+        """
+        return self._history(DeviceType.VEML7700)
+
+    def _veml_recent(self):
+        """
+        Handle a request for recent VEML7700 readings
+        """
+        return self._recent(DeviceType.VEML7700)
 
     def _veml_on(self):
         """
@@ -113,8 +359,19 @@ class RequestHandler(BaseHTTPRequestHandler):
         """
         Handle a request for the latest SGP40 readings captured by the sampler
         """
-        readings = self.sampler.get_latest_sgp()
-        return self._json(200, readings)
+        return self._send_json_bytes(200, self.sampler.get_latest_body("sgp"))
+
+    def _sgp_history(self):
+        """
+        Handle a request for historical SGP40 readings
+        """
+        return self._history(DeviceType.SGP40)
+
+    def _sgp_recent(self):
+        """
+        Handle a request for recent SGP40 readings
+        """
+        return self._recent(DeviceType.SGP40)
 
     def _sgp_on(self):
         """
@@ -149,7 +406,7 @@ class RequestHandler(BaseHTTPRequestHandler):
         Handle a GET request
         """
         # Get the handler
-        route = self.path.casefold()
+        route = self._parse_path()
         handler = self._get_handler(HttpMethod.GET, route)
 
         # If there's a handler defined, call it and return the value it returns
@@ -159,12 +416,30 @@ class RequestHandler(BaseHTTPRequestHandler):
         # Any other route generates a 404 error 
         return self._json(404, {"error": f"GET {route} not found"})
 
+    def _discard_body(self):
+        """
+        Read and discard any request body, which none of the routes use. On a persistent connection, an
+        unread body would otherwise be parsed as the next request. If the body's length isn't known, the
+        connection is closed after the response instead
+        """
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+
+        if length < 0 or "Transfer-Encoding" in self.headers:
+            self.close_connection = True
+        elif length:
+            self.rfile.read(length)
+
     def do_PUT(self):
         """
         Handle a PUT request
         """
+        self._discard_body()
+
         # Get the handler
-        route = self.path.casefold()
+        route = self._parse_path()
         handler = self._get_handler(HttpMethod.PUT, route)
 
         # If there's a handler defined, call it and return the value it returns
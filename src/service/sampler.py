@@ -1,5 +1,6 @@
 
 import logging
+import math
 import threading
 import time
 import datetime as dt
@@ -8,118 +9,280 @@ from sensors import VEML7700
 from sensors import SGP40
 from registry import DeviceType
 from db import Database
+from i2c import BusArbiter, get_mux
 from .bme280_sampler import BME280Sampler
 from .veml7700_sampler import VEML7700Sampler
 from .sgp40_sampler import SGP40Sampler
 from .lcd_display import LCDDisplay
+from .event_broadcaster import EventBroadcaster
+from .latest_readings import LatestReadings
+from .readings import to_json_bytes
+from .scheduler import Scheduler, FollowUp, DEFAULT_MAX_CATCH_UP
+from .schedule_policy import SchedulePolicy
+
+DEFAULT_SGP40_INTERVAL = 1
+
+# Default number of seconds of readings held in memory for each sensor: a day at the capture cadence for the
+# BME280 and VEML7700 and an hour for the SGP40, which is sampled every second
+DEFAULT_RECENT_WINDOWS = {
+    DeviceType.BME280: 86400,
+    DeviceType.VEML7700: 86400,
+    DeviceType.SGP40: 3600
+}
 
 
 class Sampler(threading.Thread):
     sample_interval: int = None
     display_interval: int = None
 
-    def __init__(self, devices, database, sample_interval, display_interval):
+    def __init__(self, devices, database, sample_interval, display_interval, write_queue=None, intervals=None,
+                 policy=SchedulePolicy.SKIP, max_catch_up=DEFAULT_MAX_CATCH_UP, bus=None, capture=None, recent_windows=None):
         super().__init__(daemon=True)
         self.stop = threading.Event()
-        self.bme280_sampler = BME280Sampler(devices[DeviceType.BME280]["device"], devices[DeviceType.BME280]["enabled"], database)
-        self.veml7700_sampler = VEML7700Sampler(devices[DeviceType.VEML7700]["device"], devices[DeviceType.VEML7700]["enabled"], database)
-        self.sgp40_sampler = SGP40Sampler(devices[DeviceType.SGP40]["device"], devices[DeviceType.SGP40]["enabled"], self.bme280_sampler, database)
+
+        # Each device has its own cadence. By default, the BME280 and VEML7700 are sampled at the sample
+        # interval and the SGP40 every second
+        self.intervals = {
+            DeviceType.BME280: sample_interval,
+            DeviceType.VEML7700: sample_interval,
+            DeviceType.SGP40: DEFAULT_SGP40_INTERVAL,
+            DeviceType.LCD: display_interval
+        }
+        self.intervals.update({DeviceType(name): interval for name, interval in (intervals or {}).items()})
+
+        # Each sensor's recent readings are held in memory, sized to cover its window at its cadence
+        windows = dict(DEFAULT_RECENT_WINDOWS)
+        windows.update({DeviceType(name): window for name, window in (recent_windows or {}).items()})
+        capacities = {device_type: math.ceil(window / self.intervals[device_type]) for device_type, window in windows.items()}
+
+        # If there's a write-behind queue, the individual samplers enqueue their readings rather than
+        # writing them to the database directly
+        writer = write_queue if write_queue else database
+
+        # New readings are pushed to live event stream clients as they're stored
+        self.broadcaster = EventBroadcaster()
+        self.bme280_sampler = BME280Sampler(devices[DeviceType.BME280]["device"], devices[DeviceType.BME280]["enabled"], writer, self.broadcaster,
+                                            capacities[DeviceType.BME280])
+        self.veml7700_sampler = VEML7700Sampler(devices[DeviceType.VEML7700]["device"], devices[DeviceType.VEML7700]["enabled"], writer, self.broadcaster,
+                                                capacities[DeviceType.VEML7700])
+        self.sgp40_sampler = SGP40Sampler(devices[DeviceType.SGP40]["device"], devices[DeviceType.SGP40]["enabled"], self.bme280_sampler, writer, self.broadcaster,
+                                          capture, capacities[DeviceType.SGP40])
         self.lcd_display = LCDDisplay(devices[DeviceType.LCD]["device"], devices[DeviceType.LCD]["enabled"])
         self.database = database
+        self.write_queue = write_queue
+        self.bus = bus
         self.sample_interval = sample_interval
         self.display_interval = display_interval
 
+        # Each device is sampled on its own worker thread, with its own scheduler, so a device that blocks
+        # waiting for a measurement doesn't delay the others. Access to the bus itself is serialised by
+        # the bus arbiter
+        self.schedulers = {device_type: Scheduler(policy, max_catch_up) for device_type in self.intervals}
+        self.workers = []
+        self.next_sgp_capture = None
+
+        # Each sensor's latest reading is serialised once, when it's published, and the same bytes are sent
+        # to event stream clients, served by its latest readings endpoint and used to build the combined
+        # latest readings response. The samplers publish from their own threads, so the rebuild is serialised.
+        # The combined response only includes the device states, which change when a device is enabled or
+        # disabled, not the metrics in the full status, so its ETag only changes when something it holds does
+        self.latest_getters = {
+            "bme": self.get_latest_bme,
+            "veml": self.get_latest_veml,
+            "sgp": self.get_latest_sgp
+        }
+        self.latest_bodies = {}
+        self.states_body = None
+        self.latest_readings = LatestReadings()
+        self.latest_lock = threading.Lock()
+        self._update_latest_readings()
+        self.broadcaster.add_listener(self._update_latest_readings)
+
+    def _sample_veml7700(self):
+        """
+        Sample the VEML7700. If a non-blocking sensor's just been reconfigured and doesn't have a valid
+        reading yet, ask the scheduler to sample it again once it will have
+        """
+        ready_at = self.veml7700_sampler.sample_and_store()
+        return FollowUp(ready_at) if ready_at is not None else None
+
+    def _sample_sgp40(self):
+        """
+        Sample the SGP40 at its own cadence, which should be ~1s to match the requirements of the Sensirion
+        VOC algorithm, but only write the readings to the database at the sample interval
+        """
+        now = time.monotonic()
+        capture_readings = now >= self.next_sgp_capture
+        if capture_readings:
+            self.next_sgp_capture += self.sample_interval
+            if self.next_sgp_capture <= now:
+                self.next_sgp_capture = now + self.sample_interval
+        self.sgp40_sampler.sample_and_store(capture_readings)
+
+    def _display_next(self):
+        self.lcd_display.display_next(self)
+
     def run(self):
         """
         Run the sampler event loop
         """
-        logging.info(f"Sampler started: interval={self.sample_interval:.3f} s")
+        policy = self.schedulers[DeviceType.BME280].policy
+        logging.info(f"Sampler started: interval={self.sample_interval:.3f} s, policy={policy.value}")
 
-        # Start the timer and loop until we're interrupted. The loop needs to report at the specified interval
-        # but sample the SGP40 at ~1s intervals to match the requirements of the Sensiron VOC algorithm
-        capture_counter = self.sample_interval - 1
-        display_counter = self.display_interval - 1
-        while not self.stop.is_set():
-            try:
-                # Increment the sampling counter
-                capture_counter += 1
-                capture_readings = capture_counter == self.sample_interval
+        # Each task is scheduled against a monotonic deadline, so the time taken to sample the sensors and
+        # update the display doesn't cause drift. The SGP40 compensation uses the most recent temperature
+        # and humidity from the BME280 worker. Purging old data and size snapshots are handled by the
+        # database maintenance thread
+        self.next_sgp_capture = time.monotonic()
+        tasks = {
+            DeviceType.BME280: self.bme280_sampler.sample_and_store,
+            DeviceType.VEML7700: self._sample_veml7700,
+            DeviceType.SGP40: self._sample_sgp40,
+            DeviceType.LCD: self._display_next
+        }
+        for device_type, callback in tasks.items():
+            scheduler = self.schedulers[device_type]
+            scheduler.add(device_type.value, self.intervals[device_type], callback)
+            worker = threading.Thread(target=scheduler.run, args=(self.stop,), name=f"sampler-{device_type.value}", daemon=True)
+            worker.start()
+            self.workers.append(worker)
 
-                # Increment the display counter
-                display_counter += 1
-                display_next_reading = display_counter == self.display_interval
+        # Wait for the stop request, then for the workers to finish what they're doing
+        self.stop.wait()
+        for worker in self.workers:
+            worker.join()
 
-                # If we've reached the capture interval, capture sensors other than the SGP40
-                if capture_readings:
-                    # Reset the reporting counter
-                    capture_counter = 0
+        # Checkpoint the VOC algorithm, so it can pick up where it left off when the service restarts, and
+        # write out any captured SRAW readings
+        self.sgp40_sampler.save_voc_state()
+        if self.sgp40_sampler.capture:
+            self.sgp40_sampler.capture.close()
 
-                    # Purge old data and snapshot sizes
-                    self.database.purge()
-                    self.database.snapshot_sizes()
+        logging.info("Sampler stopped.")
 
-                    # Take the next set of BME280 and VEML770 readings
-                    self.bme280_sampler.sample_and_store()
-                    self.veml7700_sampler.sample_and_store()
 
-                # Take the next set of SGP40 readings
-                self.sgp40_sampler.sample_and_store(capture_readings)
+    def get_latest_bme(self):
+        """
+        Return the most recent BME280 reading captured by the sampler. Readings are immutable, so it isn't copied
+        """
+        return self.bme280_sampler.latest_reading
 
-                # If we've reached the display interval, display the next reading
-                if display_next_reading:
-                    display_counter = 0
-                    self.lcd_display.display_next(self)
+    def get_latest_veml(self):
+        """
+        Return the most recent VEML7700 reading captured by the sampler. Readings are immutable, so it isn't copied
+        """
+        return self.veml7700_sampler.latest_reading
 
-            except Exception as ex:
-                logging.warning("Sampler error: %s", ex)
+    def get_latest_sgp(self):
+        """
+        Return the most recent SGP40 reading captured by the sampler. Readings are immutable, so it isn't copied
+        """
+        return self.sgp40_sampler.latest_reading
 
-            # Wait for 1s
-            time.sleep(1)
+    def get_latest_body(self, event):
+        """
+        Return the serialised latest reading for a sensor, identified by its event name
+        """
+        return self.latest_bodies[event]
 
-        logging.info("Sampler stopped.")
+    def get_recent(self, device, since=None):
+        """
+        Return the recent readings for a device held in memory, oldest first, optionally only those taken
+        at or after an epoch time. No database access is needed
+        """
+        if device == DeviceType.BME280:
+            return self.bme280_sampler.recent_readings(since)
+        elif device == DeviceType.VEML7700:
+            return self.veml7700_sampler.recent_readings(since)
+        elif device == DeviceType.SGP40:
+            return self.sgp40_sampler.recent_readings(since)
+        raise ValueError(f"No recent readings for {device}")
 
+    def _update_latest_readings(self, event=None, data=None, body=None):
+        """
+        Rebuild the combined latest readings response. When a sensor's reading is published, the reading
+        serialised for the event is reused, as long as it's still the latest. Otherwise, e.g. when a device
+        is enabled or disabled, all the readings and the device states are serialised again. The serialised
+        readings are replaced with a new dictionary, rather than updated in place, so they can be read
+        without the lock
+        """
+        with self.latest_lock:
+            bodies = dict(self.latest_bodies)
+            if event in bodies:
+                # The sensor may have been disabled since the event was published
+                latest = self.latest_getters[event]()
+                bodies[event] = body if body is not None and latest is data else to_json_bytes(latest)
+            else:
+                bodies.update({name: to_json_bytes(getter()) for name, getter in self.latest_getters.items()})
+                self.states_body = to_json_bytes(self.get_device_states())
+            self.latest_bodies = bodies
+            self.latest_readings.update_serialised({**bodies, "status": self.states_body})
 
-    def get_latest_bme(self):
+    def get_latest(self):
         """
-        Return the most recent BME280 readings captured by the sampler
+        Return the pre-serialised latest readings and device states, and its ETag, as a tuple
         """
-        latest_reading = self.bme280_sampler.latest_reading
-        return dict(latest_reading) if latest_reading else None
+        return self.latest_readings.get()
 
-    def get_latest_veml(self):
+    def get_history(self, device, start, end, step):
         """
-        Return the most recent VEML7700 readings captured by the sampler
+        Return a generator of chunks of historical readings for a device, read from the database
         """
-        latest_reading = self.veml7700_sampler.latest_reading
-        return dict(latest_reading) if latest_reading else None
+        return self.database.iter_history(device.value, start, end, step)
 
-    def get_latest_sgp(self):
+    def subscribe(self):
         """
-        Return the most recent SGP40 readings captured by the sampler
+        Return a subscription to the live readings event stream
         """
-        latest_reading = self.sgp40_sampler.latest_reading
-        return dict(latest_reading) if latest_reading else None
+        return self.broadcaster.subscribe()
 
-    def get_device_status(self):
+    def unsubscribe(self, subscription):
+        """
+        Cancel a subscription to the live readings event stream
+        """
+        self.broadcaster.unsubscribe(subscription)
+
+    def get_metrics(self):
+        """
+        Return performance metrics for the sampler and its supporting services
+        """
+        policy = self.schedulers[DeviceType.BME280].policy
+        tasks = {}
+        for scheduler in self.schedulers.values():
+            tasks.update(scheduler.metrics["tasks"])
+
+        return {
+            "write_queue": self.write_queue.metrics if self.write_queue else None,
+            "event_stream": self.broadcaster.metrics,
+            "scheduler": {"policy": policy.value, "tasks": tasks},
+            "i2c_bus": self.bus.metrics if isinstance(self.bus, BusArbiter) else None
+        }
+
+    def get_device_states(self):
+        """
+        Return whether each device is enabled and available. Unlike the full status, these only change
+        when a device is enabled or disabled
+        """
         return {
-            DeviceType.BME280: {
-                "enabled": self.bme280_sampler.is_enabled,
-                "available": self.bme280_sampler.is_available
-            },
-            DeviceType.VEML7700: {
-                "enabled": self.veml7700_sampler.is_enabled,
-                "available": self.veml7700_sampler.is_available
-            },
-            DeviceType.SGP40: {
-                "enabled": self.sgp40_sampler.is_enabled,
-                "available": self.sgp40_sampler.is_available
-            },
-            DeviceType.LCD: {
-                "enabled": self.lcd_display.is_enabled,
-                "available": self.lcd_display.is_available
-            }
+            DeviceType.BME280: {"enabled": self.bme280_sampler.is_enabled, "available": self.bme280_sampler.is_available},
+            DeviceType.VEML7700: {"enabled": self.veml7700_sampler.is_enabled, "available": self.veml7700_sampler.is_available},
+            DeviceType.SGP40: {"enabled": self.sgp40_sampler.is_enabled, "available": self.sgp40_sampler.is_available},
+            DeviceType.LCD: {"enabled": self.lcd_display.is_enabled, "available": self.lcd_display.is_available}
         }
 
+    def get_device_status(self):
+        status = self.get_device_states()
+        status[DeviceType.BME280]["measurement"] = self.bme280_sampler.measurement_status(self.intervals[DeviceType.BME280])
+        status[DeviceType.VEML7700]["ranging"] = self.veml7700_sampler.ranging_status()
+        status[DeviceType.SGP40]["voc_algorithm"] = self.sgp40_sampler.voc_state_status()
+
+        # Include the number of mux channel selections that have been skipped because the channel was
+        # already selected
+        if self.bus:
+            status[DeviceType.MUX] = get_mux(self.bus).metrics
+
+        return status
+
     def enable_device(self, device):
         if device == DeviceType.BME280:
             self.bme280_sampler.enable()
@@ -129,6 +292,7 @@ class Sampler(threading.Thread):
             self.sgp40_sampler.enable()
         elif device == DeviceType.LCD:
             self.lcd_display.enable()
+        self._update_latest_readings()
 
     def disable_device(self, device):
         if device == DeviceType.BME280:
@@ -139,3 +303,4 @@ class Sampler(threading.Thread):
             self.sgp40_sampler.disable()
         elif device ==  DeviceType.LCD:
             self.lcd_display.disable()
+        self._update_latest_readings()
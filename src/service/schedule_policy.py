@@ -0,0 +1,5 @@
+from enum import Enum
+
+class SchedulePolicy(str, Enum):
+    SKIP = "skip"
+    CATCH_UP = "catch_up"
@@ -0,0 +1,166 @@
+import logging
+import math
+import time
+from .schedule_policy import SchedulePolicy
+
+DEFAULT_MAX_CATCH_UP = 5
+
+
+class FollowUp:
+    """
+    Returned by a task callback to ask for it to be called again at a monotonic deadline, e.g. because
+    it's waiting for a sensor, without changing its regular schedule. Any other return value is ignored
+    """
+
+    def __init__(self, deadline):
+        self.deadline = float(deadline)
+
+
+class ScheduledTask:
+    """
+    A callback run at a fixed interval. The deadline for each run is a multiple of the interval from
+    the first, so time spent doing the work doesn't accumulate as drift
+    """
+
+    def __init__(self, name, interval, callback, due):
+        self.name = name
+        self.interval = float(interval)
+        self.callback = callback
+        self.due = due
+        self.follow_up = None
+
+        # Metrics
+        self.runs = 0
+        self.follow_ups = 0
+        self.skipped = 0
+        self.overruns = 0
+        self.last_lateness = None
+        self.max_lateness = None
+        self.total_lateness = 0.0
+        self.last_duration = None
+        self.max_duration = None
+
+    @property
+    def next_run(self):
+        """
+        Return the deadline for the next run, which is the follow-up if one's been requested
+        """
+        return min(self.due, self.follow_up) if self.follow_up is not None else self.due
+
+    def record(self, lateness, duration):
+        """
+        Record the lateness and duration of a run
+        """
+        self.runs += 1
+        self.last_lateness = lateness
+        self.max_lateness = lateness if self.max_lateness is None else max(self.max_lateness, lateness)
+        self.total_lateness += lateness
+        self.last_duration = duration
+        self.max_duration = duration if self.max_duration is None else max(self.max_duration, duration)
+        if duration > self.interval:
+            self.overruns += 1
+
+    @property
+    def metrics(self):
+        """
+        Return a snapshot of the task metrics, with times in milliseconds
+        """
+        def ms(value):
+            return round(value * 1000.0, 3) if value is not None else None
+
+        return {
+            "interval": self.interval,
+            "runs": self.runs,
+            "skipped": self.skipped,
+            "follow_ups": self.follow_ups,
+            "overruns": self.overruns,
+            "last_lateness_ms": ms(self.last_lateness),
+            "max_lateness_ms": ms(self.max_lateness),
+            "mean_lateness_ms": ms(self.total_lateness / self.runs) if self.runs else None,
+            "last_duration_ms": ms(self.last_duration),
+            "max_duration_ms": ms(self.max_duration)
+        }
+
+
+class Scheduler:
+    """
+    Deadline-based scheduler for tasks with different cadences, using the monotonic clock so it's
+    unaffected by changes to the wall clock. When a task falls behind by one or more whole intervals,
+    the policy determines whether the missed runs are skipped or run back-to-back to catch up, up to
+    a limit
+    """
+
+    def __init__(self, policy=SchedulePolicy.SKIP, max_catch_up=DEFAULT_MAX_CATCH_UP, clock=time.monotonic):
+        self.policy = SchedulePolicy(policy)
+        self.max_catch_up = max(0, int(max_catch_up))
+        self.clock = clock
+        self.tasks = []
+
+    def add(self, name, interval, callback):
+        """
+        Add a task, with its first run due immediately. Tasks due at the same time run in the order they
+        were added. If the callback returns a FollowUp, it's called again at the follow-up's deadline,
+        without changing its regular schedule. Any other return value is ignored
+        """
+        if interval <= 0:
+            raise ValueError(f"Invalid interval for {name}: {interval}")
+        self.tasks.append(ScheduledTask(name, interval, callback, self.clock()))
+
+    def _advance(self, task, now):
+        """
+        Move a task's deadline on by one interval, applying the policy if it's already passed
+        """
+        task.due += task.interval
+        if task.due <= now:
+            missed = math.floor((now - task.due) / task.interval) + 1
+            allowed = self.max_catch_up if self.policy == SchedulePolicy.CATCH_UP else 0
+            if missed > allowed:
+                task.skipped += missed - allowed
+                task.due += (missed - allowed) * task.interval
+
+    def run_pending(self):
+        """
+        Run every task that's due, earliest deadline first, and return the time until the next deadline
+        """
+        while self.tasks:
+            task = min(self.tasks, key=lambda t: t.next_run)
+            start = self.clock()
+            if task.next_run > start:
+                return task.next_run - start
+
+            # A follow-up that's due before the next regular run is run on its own
+            is_follow_up = task.follow_up is not None and task.follow_up < task.due
+            task.follow_up = None
+            try:
+                result = task.callback()
+                if isinstance(result, FollowUp):
+                    task.follow_up = result.deadline
+            except Exception as ex:
+                logging.warning("Scheduled task %s error: %s", task.name, ex)
+
+            if is_follow_up:
+                task.follow_ups += 1
+            else:
+                finish = self.clock()
+                task.record(start - task.due, finish - start)
+                self._advance(task, finish)
+
+        return None
+
+    def run(self, stop):
+        """
+        Run the tasks until the stop event is set
+        """
+        while not stop.is_set():
+            delay = self.run_pending()
+            stop.wait(delay)
+
+    @property
+    def metrics(self):
+        """
+        Return a snapshot of the metrics for each task
+        """
+        return {
+            "policy": self.policy.value,
+            "tasks": {task.name: task.metrics for task in self.tasks}
+        }
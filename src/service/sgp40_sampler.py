@@ -1,16 +1,32 @@
 import logging
 import threading
+import time
 import datetime as dt
+from db.database import epoch_seconds
+from .reading_buffer import ReadingBuffer
+from .readings import SGP40Reading
 
 
 class SGP40Sampler:
-    def __init__(self, sgp40, enabled, bme280_sampler, database):
+    # Fields held in the recent readings buffer. The label and rating are derived from the index, so
+    # they aren't held
+    RECENT_FIELDS = [
+        ("sraw", "l", int),
+        ("voc_index", "d", int),
+        ("temperature_c", "d", float),
+        ("humidity_pc", "d", float)
+    ]
+
+    def __init__(self, sgp40, enabled, bme280_sampler, database, broadcaster=None, capture=None, recent_capacity=0):
         self.database = database
+        self.capture = capture
+        self.broadcaster = broadcaster
         self.sensor = sgp40
         self.bme280_sampler = bme280_sampler
         self.enabled = sgp40 is not None and enabled
         self.latest = None
         self.lock = threading.Lock()
+        self.recent = ReadingBuffer(recent_capacity, self.RECENT_FIELDS) if recent_capacity else None
 
     # --------------------------------------------------
     # SGP40 reading capture and storage
@@ -23,11 +39,16 @@ class SGP40Sampler:
         # Get the latest BME280 reading and extract the humidity and temperature for SGP40
         # VOC index compensation
         latest_bme = self.bme280_sampler.latest
-        temperature = latest_bme["temperature_c"] if latest_bme else 25.0
-        humidity = latest_bme["humidity_pct"] if latest_bme else 50.0
+        temperature = latest_bme.temperature_c if latest_bme else 25.0
+        humidity = latest_bme.humidity_pct if latest_bme else 50.0
 
         # Sample the sensors
         sraw, voc_index, voc_label, voc_rating = self.sensor.read(humidity, temperature)
+
+        # Every reading is captured, if configured, so the VOC index can be recalculated later
+        if self.capture:
+            self.capture.append(time.time(), sraw, temperature, humidity)
+
         if capture_readings:
             timestamp = self.database.insert_sgp_row(sraw, voc_index, voc_label, voc_rating)
             logging.info(f"{timestamp}  SRAW={sraw}  VOC Index={voc_index}  VOC Label={voc_label}  Rating={voc_rating}")
@@ -38,21 +59,24 @@ class SGP40Sampler:
 
     def _store(self, timestamp, sraw, voc_index, voc_label, voc_rating, temperature, humidity, clear):
         """
-        Store the latest SGP40 readings
+        Store the latest SGP40 readings. The new reading replaces the reference to the previous one, so
+        readers don't need the lock
         """
         with self.lock:
             if clear:
                 self.latest = None
             elif self.enabled:
-                self.latest = {
-                    "time_utc": timestamp,
-                    "sraw": sraw,
-                    "voc_index": voc_index,
-                    "voc_label": voc_label,
-                    "voc_rating": voc_rating,
-                    "temperature_c": temperature,
-                    "humidity_pc": humidity
-                }
+                reading = SGP40Reading(timestamp, sraw, voc_index, voc_label, voc_rating, temperature, humidity)
+                if self.recent is not None:
+                    self.recent.append(epoch_seconds(timestamp), (sraw, voc_index, temperature, humidity))
+                self.latest = reading
+
+    def _publish(self):
+        """
+        Push the latest readings to any live event stream clients
+        """
+        if self.broadcaster:
+            self.broadcaster.publish("sgp", self.latest)
 
     # --------------------------------------------------
     # Public API
@@ -62,14 +86,35 @@ class SGP40Sampler:
         if self.sensor and self.enabled:
             timestamp, sraw, voc_index, voc_label, voc_rating, temperature, humidity = self._sample(capture_readings)
             self._store(timestamp, sraw, voc_index, voc_label, voc_rating, temperature, humidity, False)
+            self._publish()
+
+    def voc_state_status(self):
+        """
+        Return the warm/cold state of the VOC algorithm and the age of its checkpoint
+        """
+        return self.sensor.voc_state_status() if self.sensor else None
+
+    def save_voc_state(self):
+        """
+        Checkpoint the VOC algorithm states, e.g. on shutdown
+        """
+        if self.sensor:
+            self.sensor.save_voc_state()
 
     @property
     def latest_reading(self):
         return self.latest
 
+    def recent_readings(self, since=None):
+        """
+        Return the recent readings held in memory, oldest first, optionally only those since an epoch time
+        """
+        return self.recent.snapshot(since) if self.recent is not None else []
+
     def disable(self):
         self.enabled = False
         self._store(None, None, None, None, None, None, None, True)
+        self._publish()
 
     def enable(self):
         self.enabled = self.sensor is not None
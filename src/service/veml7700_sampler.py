@@ -1,14 +1,29 @@
 import logging
 import threading
+from db.database import epoch_seconds
+from .reading_buffer import ReadingBuffer
+from .readings import VEML7700Reading
 
 
 class VEML7700Sampler:
-    def __init__(self, veml7700, enabled, database):
+    # Fields held in the recent readings buffer
+    RECENT_FIELDS = [
+        ("gain", "d", float),
+        ("integration_time_ms", "l", int),
+        ("als", "l", int),
+        ("white", "l", int),
+        ("illuminance_lux", "d", float),
+        ("saturated", "b", bool)
+    ]
+
+    def __init__(self, veml7700, enabled, database, broadcaster=None, recent_capacity=0):
         self.database = database
+        self.broadcaster = broadcaster
         self.sensor = veml7700
         self.enabled = veml7700 is not None and enabled
         self.latest = None
         self.lock = threading.Lock()
+        self.recent = ReadingBuffer(recent_capacity, self.RECENT_FIELDS) if recent_capacity else None
 
     # --------------------------------------------------
     # VEML7700 reading capture and storage
@@ -16,9 +31,14 @@ class VEML7700Sampler:
 
     def _sample(self):
         """
-        Sample the sensors, write the results to the database and log them
+        Sample the sensors, write the results to the database and log them. Returns None if the sensor
+        doesn't have a valid reading yet
         """
-        als, white, lux = self.sensor.read()
+        reading = self.sensor.read()
+        if reading is None:
+            return None
+
+        als, white, lux = reading
         is_saturated = self.sensor.is_saturated(als)
         timestamp = self.database.insert_veml_row(als, white, lux, is_saturated)
         logging.info(f"{timestamp}  Gain={self.sensor.gain}  Integration Time={self.sensor.integration_time_ms} ms  ALS={als}  White={white}  Illuminance={lux:.2f} lux  IsSaturated={is_saturated}")
@@ -26,42 +46,70 @@ class VEML7700Sampler:
 
     def _store(self, timestamp, als, white, lux, is_saturated, clear):
         """
-        Store the latest readings
+        Store the latest readings. The new reading replaces the reference to the previous one, so readers
+        don't need the lock
         """
         with self.lock:
             if clear:
                 self.latest = None
             elif self.enabled:
-                self.latest = {
-                    "time_utc": timestamp,
-                    "gain": self.sensor.gain,
-                    "integration_time_ms": self.sensor.integration_time_ms,
-                    "als": als,
-                    "white": white,
-                    "illuminance_lux": round(lux, 2),
-                    "saturated": is_saturated
-                }
+                reading = VEML7700Reading(timestamp, self.sensor.gain, self.sensor.integration_time_ms, als, white, round(lux, 2), is_saturated)
+                if self.recent is not None:
+                    self.recent.append(epoch_seconds(timestamp), reading[1:])
+                self.latest = reading
+
+    def _publish(self):
+        """
+        Push the latest readings to any live event stream clients
+        """
+        if self.broadcaster:
+            self.broadcaster.publish("veml", self.latest)
 
     # --------------------------------------------------
     # Public API
     # --------------------------------------------------
 
     def sample_and_store(self):
+        """
+        Sample the sensor and store and publish the readings. If a non-blocking sensor's settings have
+        just changed, nothing is stored and the time a valid reading will be available is returned, so
+        the caller can sample again then
+        """
         if self.sensor and self.enabled:
-            timestamp, als, white, lux, is_saturated = self._sample()
+            reading = self._sample()
+            if reading is None:
+                return self.sensor.ready_at
+
+            timestamp, als, white, lux, is_saturated = reading
             self._store(timestamp, als, white, lux, is_saturated, False)
+            self._publish()
+
+        return None
 
     @property
     def latest_reading(self):
         return self.latest
 
+    def recent_readings(self, since=None):
+        """
+        Return the recent readings held in memory, oldest first, optionally only those since an epoch time
+        """
+        return self.recent.snapshot(since) if self.recent is not None else []
+
     def disable(self):
         self.enabled = False
         self._store(None, None, None, None, None, True)
+        self._publish()
 
     def enable(self):
         self.enabled = self.sensor is not None
 
+    def ranging_status(self):
+        """
+        Return the sensor's current settings and auto-ranging metrics, if it's available
+        """
+        return self.sensor.ranging_status() if self.sensor else None
+
     @property
     def is_enabled(self):
         return self.enabled
@@ -1,18 +1,33 @@
+from db.database import utc_timestamp
+
+
 class MockDatabase:
+    def __init__(self, fail_writes=False):
+        self.batches = []
+        self.fail_writes = fail_writes
+
     def create_database(self):
         pass
 
+    def close(self):
+        pass
+
     def purge(self):
         pass
 
     def snapshot_sizes(self):
         pass
 
+    def write_readings(self, readings):
+        if self.fail_writes:
+            raise OSError("Mock write failure")
+        self.batches.append(list(readings))
+
     def insert_bme_row(self, temperature, pressure, humidity):
-        pass
+        return utc_timestamp()
 
     def insert_veml_row(self, als, white, lux, is_saturated):
-        pass
+        return utc_timestamp()
 
     def insert_sgp_row(self, sraw, index, label, rating):
-        pass
+        return utc_timestamp()
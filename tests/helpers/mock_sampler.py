@@ -1,5 +1,14 @@
+from service.event_broadcaster import EventBroadcaster
+from service.latest_readings import LatestReadings
+from service.readings import to_json_bytes
+
+
 class MockSampler:
-    def __init__(self, bme_values, veml_values, sgp_values):
+    def __init__(self, bme_values, veml_values, sgp_values, history_chunks=None):
+        self.broadcaster = EventBroadcaster()
+        self.latest_readings = LatestReadings()
+        self.latest_readings.update_serialised({"bme": to_json_bytes(bme_values[0] if bme_values else None)})
+
         self.bme_values = bme_values
         self.bme_index = 0
 
@@ -9,6 +18,10 @@ class MockSampler:
         self.sgp_values = sgp_values
         self.sgp_index = 0
 
+        self.history_chunks = history_chunks or []
+        self.history_request = None
+        self.recent_request = None
+
     def _get_next_value(self, values, index):
         if values:
             value = values[index]
@@ -30,6 +43,30 @@ class MockSampler:
         value, self.sgp_index = self._get_next_value(self.sgp_values, self.sgp_index)
         return value
 
+    def get_latest_body(self, event):
+        getter = {"bme": self.get_latest_bme, "veml": self.get_latest_veml, "sgp": self.get_latest_sgp}[event]
+        return to_json_bytes(getter())
+
+    def get_latest(self):
+        return self.latest_readings.get()
+
+    def get_history(self, device, start, end, step):
+        self.history_request = (device, start, end, step)
+        return (chunk for chunk in self.history_chunks)
+
+    def get_recent(self, device, since=None):
+        self.recent_request = (device, since)
+        return [chunk for chunks in self.history_chunks for chunk in chunks]
+
+    def subscribe(self):
+        return self.broadcaster.subscribe()
+
+    def unsubscribe(self, subscription):
+        self.broadcaster.unsubscribe(subscription)
+
+    def get_metrics(self):
+        return {}
+
     def get_device_status(self):
         return None
 
@@ -1,3 +1,6 @@
+from sensors.bme280_trimming_parameters import CALIBRATION_BLOCK_1, CALIBRATION_BLOCK_2
+
+
 class MockSMBus:
     BME280_ADDRESS = 0x76
     VEML7700_ADDRESS = 0x10
@@ -42,6 +45,9 @@ class MockSMBus:
         Read block data
         """
         match addr:
+            case self.BME280_ADDRESS if reg in (CALIBRATION_BLOCK_1, CALIBRATION_BLOCK_2):
+                # Calibration block - read consecutive trimming parameter registers
+                return [self.trimming_parameters.get(reg + i, 0x00) for i in range(length)]
             case self.BME280_ADDRESS:
                 # Flat sequence of bytes - just "read" the specified number of bytes
                 return self.block_data[:length]
@@ -1,8 +1,15 @@
 class MockVOCAlgorithm:
-    def __init__(self, value):
+    def __init__(self, value, states=(0.0, 0.0)):
         self.value = value
         self.last_sraw = None
+        self.states = tuple(states)
 
     def process(self, sraw):
         self.last_sraw = sraw
         return self.value
+
+    def get_states(self):
+        return self.states
+
+    def set_states(self, state0, state1):
+        self.states = (state0, state1)
@@ -0,0 +1,140 @@
+import argparse
+import os
+import random
+import time
+from sensors import BME280
+from sensors.bme280_trimming_parameters import DIG_T1, DIG_T2, DIG_T3
+from sensors.bme280_trimming_parameters import DIG_P1, DIG_P2, DIG_P3, DIG_P4, DIG_P5, DIG_P6, DIG_P7, DIG_P8, DIG_P9
+from sensors.bme280_trimming_parameters import DIG_H1, DIG_H2, DIG_H3, DIG_H4, DIG_H5, DIG_H6
+from helpers import MockSMBus, BME280_TRIMMING_PARAMETERS
+
+
+class LegacyCompensation:
+    """
+    Original compensation strategy: look up each trimming parameter through a method call and shift
+    the constants on every reading
+    """
+
+    def __init__(self, sensor):
+        self.sensor = sensor
+
+    def get_trimming_parameter(self, reg):
+        return self.sensor.trimming_parameters[reg]
+
+    def compensate_temperature(self, adc_t):
+        var1 = (((adc_t >> 3) - (self.get_trimming_parameter(DIG_T1) << 1)) * self.get_trimming_parameter(DIG_T2)) >> 11
+        var2 = (((((adc_t >> 4) - self.get_trimming_parameter(DIG_T1)) * ((adc_t >> 4) - self.get_trimming_parameter(DIG_T1))) >> 12) * self.get_trimming_parameter(DIG_T3)) >> 14
+        t_fine = var1 + var2
+        temp_c = ((t_fine * 5 + 128) >> 8) / 100.0
+        return t_fine, temp_c
+
+    def compensate_pressure(self, t_fine, adc_p):
+        var1 = t_fine - 128000
+        var2 = var1 * var1 * self.get_trimming_parameter(DIG_P6)
+        var2 = var2 + ((var1 * self.get_trimming_parameter(DIG_P5)) << 17)
+        var2 = var2 + (self.get_trimming_parameter(DIG_P4) << 35)
+        var1 = ((var1 * var1 * self.get_trimming_parameter(DIG_P3)) >> 8) + ((var1 * self.get_trimming_parameter(DIG_P2)) << 12)
+        var1 = (((1 << 47) + var1) * self.get_trimming_parameter(DIG_P1)) >> 33
+        if var1 == 0:
+            pressure_hpa = 0.0
+        else:
+            p = 1048576 - adc_p
+            p = (((p << 31) - var2) * 3125) // var1
+            var1 = (self.get_trimming_parameter(DIG_P9) * (p >> 13) * (p >> 13)) >> 25
+            var2 = (self.get_trimming_parameter(DIG_P8) * p) >> 19
+            pressure = ((p + var1 + var2) >> 8) + (self.get_trimming_parameter(DIG_P7) << 4)
+            pressure_hpa = pressure / 25600.0
+
+        return pressure_hpa
+
+    def compensate_humidity(self, t_fine, adc_h):
+        h = t_fine - 76800
+        h = (((((adc_h << 14) - (self.get_trimming_parameter(DIG_H4) << 20) - (self.get_trimming_parameter(DIG_H5) * h)) + 16384) >> 15)
+             * (((((((h * self.get_trimming_parameter(DIG_H6)) >> 10) * (((h * self.get_trimming_parameter(DIG_H3)) >> 11) + 32768)) >> 10) + 2097152)
+             * self.get_trimming_parameter(DIG_H2) + 8192) >> 14))
+        h = h - (((((h >> 15) * (h >> 15)) >> 7) * self.get_trimming_parameter(DIG_H1)) >> 4)
+        h = max(min(h, 419430400), 0)
+        humidity = (h >> 12) / 1024.0
+        return humidity
+
+
+def compensate_all(compensation, samples):
+    """
+    Compensate every sample using the integer path and return the elapsed time and results
+    """
+    results = []
+    start = time.perf_counter()
+    for adc_t, adc_p, adc_h in samples:
+        t_fine, temp_c = compensation.compensate_temperature(adc_t)
+        results.append((temp_c, compensation.compensate_pressure(t_fine, adc_p), compensation.compensate_humidity(t_fine, adc_h)))
+    return time.perf_counter() - start, results
+
+
+def compensate_all_float(sensor, samples):
+    """
+    Compensate every sample using the floating point path and return the elapsed time and results
+    """
+    results = []
+    start = time.perf_counter()
+    for adc_t, adc_p, adc_h in samples:
+        t_fine, temp_c = sensor.compensate_temperature_float(adc_t)
+        results.append((temp_c, sensor.compensate_pressure_float(t_fine, adc_p), sensor.compensate_humidity_float(t_fine, adc_h)))
+    return time.perf_counter() - start, results
+
+
+def read_all(sensor, count):
+    """
+    Read the sensor repeatedly on the mock bus and return the elapsed time
+    """
+    start = time.perf_counter()
+    for _ in range(count):
+        sensor.read()
+    return time.perf_counter() - start
+
+
+def report(label, count, elapsed):
+    print(f"{label:<32} {count:>8} readings  {elapsed:8.3f} s  {elapsed * 1e6 / count:8.2f} us/reading")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="BME280 Compensation Benchmark")
+    ap.add_argument("--samples", type=int, default=100000, help="Number of raw ADC samples to compensate")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed for the raw ADC samples")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    # Generate raw ADC values across the sensor's range
+    generator = random.Random(args.seed)
+    samples = [(generator.randrange(1 << 20), generator.randrange(1 << 20), generator.randrange(1 << 16)) for _ in range(args.samples)]
+
+    sensor = BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, [85, 28, 112, 125, 93, 240, 142, 35], None), MockSMBus.BME280_ADDRESS, None, None)
+    legacy_elapsed, legacy_results = compensate_all(LegacyCompensation(sensor), samples)
+    elapsed, results = compensate_all(sensor, samples)
+    float_elapsed, float_results = compensate_all_float(sensor, samples)
+    read_elapsed = read_all(sensor, args.samples)
+
+    report("Integer, dictionary lookups", args.samples, legacy_elapsed)
+    report("Integer, precomputed", args.samples, elapsed)
+    report("Floating point", args.samples, float_elapsed)
+    report("Read on the mock bus", args.samples, read_elapsed)
+    print()
+
+    # The precomputed integer path must give identical results. The floating point path is only
+    # expected to be close
+    mismatches = sum(1 for a, b in zip(legacy_results, results) if a != b)
+    print(f"Precomputed integer mismatches : {mismatches}")
+    for i, name in enumerate(["Temperature (C)", "Pressure (hPa)", "Humidity (%)"]):
+        difference = max(abs(a[i] - b[i]) for a, b in zip(results, float_results))
+        print(f"Maximum float difference, {name:<16}: {difference:.6f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+import argparse
+import os
+import time
+import numpy as np
+from sensors import BME280
+from helpers import MockSMBus, BME280_TRIMMING_PARAMETERS
+
+
+def compensate_scalar(sensor, adc_t, adc_p, adc_h):
+    """
+    Compensate each sample in turn using the scalar integer path and return the elapsed time and results
+    """
+    results = []
+    start = time.perf_counter()
+    for t, p, h in zip(adc_t.tolist(), adc_p.tolist(), adc_h.tolist()):
+        t_fine, temp_c = sensor.compensate_temperature(t)
+        results.append((temp_c, sensor.compensate_pressure(t_fine, p), sensor.compensate_humidity(t_fine, h)))
+    return time.perf_counter() - start, results
+
+
+def compensate_batch(sensor, adc_t, adc_p, adc_h):
+    """
+    Compensate all the samples using the vectorised path and return the elapsed time and results
+    """
+    start = time.perf_counter()
+    results = sensor.compensate_batch(adc_t, adc_p, adc_h)
+    return time.perf_counter() - start, results
+
+
+def report(label, count, elapsed):
+    print(f"{label:<24} {count:>10} samples  {elapsed:8.3f} s  {count / elapsed:14.1f} samples/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="BME280 Batch Compensation Benchmark")
+    ap.add_argument("--samples", type=int, default=5000000, help="Number of raw ADC samples to compensate in bulk")
+    ap.add_argument("--verify", type=int, default=200000, help="Number of samples to compensate with the scalar path and compare")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed for the raw ADC samples")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    # Generate raw ADC values across the sensor's range
+    generator = np.random.default_rng(args.seed)
+    adc_t = generator.integers(0, 1 << 20, args.samples)
+    adc_p = generator.integers(0, 1 << 20, args.samples)
+    adc_h = generator.integers(0, 1 << 16, args.samples)
+
+    sensor = BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, [0] * 8, None), MockSMBus.BME280_ADDRESS, None, None)
+    batch_elapsed, (temp_c, pressure_hpa, humidity) = compensate_batch(sensor, adc_t, adc_p, adc_h)
+
+    count = min(args.verify, args.samples)
+    scalar_elapsed, scalar_results = compensate_scalar(sensor, adc_t[:count], adc_p[:count], adc_h[:count])
+
+    report("Scalar", count, scalar_elapsed)
+    report("Batch", args.samples, batch_elapsed)
+    print()
+
+    # The batch results must be bit-identical to the scalar path
+    mismatches = sum(1 for i, expected in enumerate(scalar_results) if expected != (temp_c[i], pressure_hpa[i], humidity[i]))
+    print(f"Batch mismatches in the first {count} samples : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
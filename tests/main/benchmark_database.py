@@ -0,0 +1,79 @@
+import argparse
+import os
+import sqlite3
+import tempfile
+import time
+from db import Database
+from db.database import CREATE_SQL, INSERT_BME_SQL
+
+
+def insert_per_connection(db_path, count):
+    """
+    Original insert strategy: open, insert, commit and close for every reading
+    """
+    start = time.perf_counter()
+    for i in range(count):
+        con = sqlite3.connect(db_path)
+        try:
+            cur = con.cursor()
+            cur.execute(INSERT_BME_SQL, ("2025-01-01T00:00:00Z", 21.0 + i * 0.001, 1013.0, 50.0, 1, "0x76"))
+            con.commit()
+        finally:
+            con.close()
+    return time.perf_counter() - start
+
+
+def insert_pooled(db_path, count, journal_mode, synchronous):
+    """
+    Current insert strategy: long-lived connection with cached statements
+    """
+    database = Database(db_path, 0, 1, "0x76", "0x10", 0.25, 100, "0x59", journal_mode, synchronous)
+    database.create_database()
+    start = time.perf_counter()
+    for i in range(count):
+        database.insert_bme_row(21.0 + i * 0.001, 1013.0, 50.0)
+    elapsed = time.perf_counter() - start
+    database.close()
+    return elapsed
+
+
+def create_legacy_database(db_path):
+    con = sqlite3.connect(db_path)
+    for sql in CREATE_SQL:
+        con.executescript(sql)
+    con.commit()
+    con.close()
+
+
+def report(label, count, elapsed):
+    print(f"{label:<40} {count:>8} rows  {elapsed:8.3f} s  {count / elapsed:10.1f} inserts/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Database Insert Benchmark")
+    ap.add_argument("--rows", type=int, default=2000, help="Number of rows to insert per run")
+    ap.add_argument("--folder", default=None, help="Folder for the benchmark databases (e.g. on the SD card)")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    with tempfile.TemporaryDirectory(dir=args.folder) as folder:
+        db_path = os.path.join(folder, "legacy.db")
+        create_legacy_database(db_path)
+        report("Connection per insert (rollback journal)", args.rows, insert_per_connection(db_path, args.rows))
+
+        for journal_mode, synchronous in [("DELETE", "FULL"), ("WAL", "FULL"), ("WAL", "NORMAL")]:
+            db_path = os.path.join(folder, f"pooled-{journal_mode}-{synchronous}.db".lower())
+            elapsed = insert_pooled(db_path, args.rows, journal_mode, synchronous)
+            report(f"Pooled connection ({journal_mode}, {synchronous})", args.rows, elapsed)
+
+
+if __name__ == "__main__":
+    main()
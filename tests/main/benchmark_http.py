@@ -0,0 +1,102 @@
+import argparse
+import os
+import threading
+import time
+import http.client
+from service import RequestHandler, PooledHTTPServer
+from helpers import MockSampler
+
+ROUTES = [
+    "/api/health",
+    "/api/status",
+    "/api/metrics",
+    "/api/latest",
+    "/api/bme/latest",
+    "/api/bme/history?step=1h"
+]
+
+BME_READINGS = {"time_utc": "2025-12-19T09:28:19+00:00Z", "temperature_c": 18.0, "pressure_hpa": 1008.93, "humidity_pct": 44.69}
+HISTORY_CHUNKS = [[dict(BME_READINGS) for _ in range(24)]]
+
+
+def run_client(port, path, count, keep_alive, latencies):
+    """
+    Make a number of requests for a route, on one persistent connection or a new connection per request,
+    and record the latency of each
+    """
+    connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    for _ in range(count):
+        start = time.perf_counter()
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        latencies.append(time.perf_counter() - start)
+        if not keep_alive:
+            connection.close()
+            connection = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    connection.close()
+
+
+def run_route(port, path, clients, count, keep_alive):
+    """
+    Run concurrent clients against a route and return the elapsed time and the request latencies
+    """
+    latencies = []
+    threads = [threading.Thread(target=run_client, args=(port, path, count, keep_alive, latencies)) for _ in range(clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return time.perf_counter() - start, sorted(latencies)
+
+
+def percentile(values, pct):
+    return values[min(len(values) - 1, int(len(values) * pct / 100.0))]
+
+
+def report(label, path, elapsed, latencies):
+    print(f"{label:<12} {path:<26} {len(latencies):>7} requests  {len(latencies) / elapsed:9.1f} req/s  "
+          f"p50 {percentile(latencies, 50) * 1000:7.2f} ms  p99 {percentile(latencies, 99) * 1000:7.2f} ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Weather Service HTTP Load Test")
+    ap.add_argument("--clients", type=int, default=4, help="Number of concurrent clients")
+    ap.add_argument("--requests", type=int, default=500, help="Number of requests per client per route")
+    ap.add_argument("--workers", type=int, default=8, help="Number of server worker threads")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    # Serve the API on the loopback interface, using a mock sampler so only the HTTP handling is measured
+    RequestHandler.sampler = MockSampler([BME_READINGS], None, None, HISTORY_CHUNKS)
+    RequestHandler.log_message = lambda *args: None
+    server = PooledHTTPServer(("127.0.0.1", 0), RequestHandler, args.workers, args.clients * 2)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    port = server.server_address[1]
+
+    try:
+        for keep_alive in [False, True]:
+            label = "keep-alive" if keep_alive else "per-request"
+            for path in ROUTES:
+                elapsed, latencies = run_route(port, path, args.clients, args.requests, keep_alive)
+                report(label, path, elapsed, latencies)
+            print()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    print(f"Server metrics: {server.metrics}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+import argparse
+import json
+import os
+import threading
+import time
+import tracemalloc
+from service.latest_readings import LatestReadings
+from service.readings import BME280Reading, to_json_bytes
+
+
+class LegacyStore:
+    """
+    Publishes the latest reading as a dictionary that's copied under the lock for each reader and serialised
+    for each request, as the samplers did before readings were immutable
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = None
+
+    def publish(self, epoch):
+        with self.lock:
+            self.latest = {
+                "time_utc": str(epoch),
+                "temperature_c": round(18.0 + (epoch % 100) / 100.0, 2),
+                "pressure_hpa": 1008.93,
+                "humidity_pct": 44.69
+            }
+
+    def poll(self):
+        with self.lock:
+            latest = dict(self.latest)
+        return json.dumps(latest).encode("utf-8")
+
+    def lcd(self):
+        with self.lock:
+            latest = dict(self.latest)
+        return latest["temperature_c"]
+
+
+class ReadingStore:
+    """
+    Publishes the latest reading as an immutable record by swapping the reference and serialises it once per
+    change, as the samplers do now
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = None
+        self.body = None
+        self.latest_readings = LatestReadings()
+
+    def publish(self, epoch):
+        reading = BME280Reading(str(epoch), round(18.0 + (epoch % 100) / 100.0, 2), 1008.93, 44.69)
+        with self.lock:
+            self.latest = reading
+        body = to_json_bytes(reading)
+        self.body = body
+        self.latest_readings.update_serialised({"bme": body})
+
+    def poll(self):
+        return self.body
+
+    def lcd(self):
+        return self.latest.temperature_c
+
+
+def run_sustained(store, readers, duration, interval):
+    """
+    Publish readings at a fixed interval while reader threads poll for the latest reading, and return the
+    number of polls
+    """
+    stop = threading.Event()
+    counts = [0] * readers
+
+    def reader(index):
+        count = 0
+        while not stop.is_set():
+            store.poll()
+            store.lcd()
+            count += 1
+        counts[index] = count
+
+    def writer():
+        epoch = 0
+        while not stop.wait(interval):
+            epoch += 1
+            store.publish(epoch)
+
+    store.publish(0)
+    threads = [threading.Thread(target=reader, args=(i,)) for i in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return sum(counts)
+
+
+def measure_poll_allocation(store, polls):
+    """
+    Return the mean number of bytes allocated, at peak, by a poll of the latest reading and an LCD read
+    """
+    store.publish(0)
+    tracemalloc.start()
+    total = 0
+    for _ in range(polls):
+        tracemalloc.reset_peak()
+        current, _ = tracemalloc.get_traced_memory()
+        store.poll()
+        store.lcd()
+        total += tracemalloc.get_traced_memory()[1] - current
+    tracemalloc.stop()
+    return total / polls
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Latest Reading Allocation Benchmark")
+    ap.add_argument("--readers", type=int, default=4, help="Number of polling reader threads")
+    ap.add_argument("--duration", type=float, default=5.0, help="Duration of each sustained polling run, in seconds")
+    ap.add_argument("--interval", type=float, default=0.1, help="Interval between published readings, in seconds")
+    ap.add_argument("--polls", type=int, default=10000, help="Number of polls traced to measure allocation")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    for label, store_class in [("Legacy", LegacyStore), ("Readings", ReadingStore)]:
+        allocated = measure_poll_allocation(store_class(), args.polls)
+        polls = run_sustained(store_class(), args.readers, args.duration, args.interval)
+        rate = polls / args.duration
+        print(f"{label:<10} {rate:12.1f} polls/s  {allocated:8.1f} bytes/poll  "
+              f"{allocated * rate / 1e6:8.2f} MB/s allocated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+import argparse
+import os
+import time
+from sensors import SGP40
+from sensors.sgp40 import crc8_sgp40
+from i2c import I2CDevice
+from helpers import MockSMBus, MockI2CMsg, MockVOCAlgorithm
+
+SRAW = 0x6A3C
+
+
+class RespondingSMBus(MockSMBus):
+    """
+    Mock bus that answers every SGP40 read with the same valid SRAW response
+    """
+
+    def __init__(self):
+        super().__init__(None, None, None)
+        raw = bytes([SRAW >> 8, SRAW & 0xFF])
+        self.response = raw + bytes([crc8_sgp40(raw)])
+
+    def i2c_rdwr(self, *msgs):
+        for m in msgs:
+            if m["type"] == "read":
+                m["buffer"] = self.response
+
+
+class LegacySGP40(SGP40):
+    """
+    Original command construction: calculate the CRCs bit by bit and build the frame on every call
+    """
+
+    def _crc8_sgp40(self, two_bytes: bytes) -> int:
+        crc = 0xFF
+        for b in two_bytes:
+            crc ^= b
+            for _ in range(8):
+                if crc & 0x80:
+                    crc = ((crc << 1) ^ 0x31) & 0xFF
+                else:
+                    crc = (crc << 1) & 0xFF
+        return crc
+
+    def _build_command(self, humidity, temperature) -> bytes:
+        rh_ticks = self._humidity_to_ticks(humidity)
+        t_ticks = self._temperature_to_ticks(temperature)
+
+        rh_msb = (rh_ticks >> 8) & 0xFF
+        rh_lsb = rh_ticks & 0xFF
+        t_msb = (t_ticks >> 8) & 0xFF
+        t_lsb = t_ticks & 0xFF
+
+        rh_crc = self._crc8_sgp40(bytes([rh_msb, rh_lsb]))
+        t_crc = self._crc8_sgp40(bytes([t_msb, t_lsb]))
+        return bytes([0x26, 0x0F, rh_msb, rh_lsb, rh_crc, t_msb, t_lsb, t_crc])
+
+
+def construct_sensor(sensor_class):
+    device = I2CDevice(RespondingSMBus(), MockSMBus.SGP40_ADDRESS, None, None, MockI2CMsg())
+    return sensor_class(device, MockVOCAlgorithm(100), measurement_delay=0.0)
+
+
+def time_calls(count, callback):
+    start = time.perf_counter()
+    for i in range(count):
+        callback(i)
+    return time.perf_counter() - start
+
+
+def report(label, count, elapsed):
+    print(f"{label:<32} {count:>8} calls  {elapsed:8.3f} s  {elapsed * 1e6 / count:8.2f} us/call")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="SGP40 Per-Second Path Benchmark")
+    ap.add_argument("--samples", type=int, default=100000, help="Number of one-second samples to simulate")
+    ap.add_argument("--bme-interval", type=int, default=60, help="Seconds between changes to the compensation values")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    # The compensation values change with each new BME280 reading, i.e. every "bme-interval" samples
+    def compensation(i):
+        step = i // args.bme_interval
+        return 40.0 + (step % 200) * 0.1, 18.0 + (step % 100) * 0.05
+
+    legacy = construct_sensor(LegacySGP40)
+    current = construct_sensor(SGP40)
+
+    # The frames must be identical
+    mismatches = sum(1 for i in range(0, args.samples, args.bme_interval) if legacy._build_command(*compensation(i)) != current._build_command(*compensation(i)))
+
+    report("CRC, bitwise", args.samples, time_calls(args.samples, lambda i: legacy._crc8_sgp40(b"\xBE\xEF")))
+    report("CRC, table", args.samples, time_calls(args.samples, lambda i: current._crc8_sgp40(b"\xBE\xEF")))
+    report("Command frame, built each time", args.samples, time_calls(args.samples, lambda i: legacy._build_command(*compensation(i))))
+    report("Command frame, cached", args.samples, time_calls(args.samples, lambda i: current._build_command(*compensation(i))))
+    report("Read on the mock bus, legacy", args.samples, time_calls(args.samples, lambda i: legacy.read(*compensation(i))))
+    report("Read on the mock bus, current", args.samples, time_calls(args.samples, lambda i: current.read(*compensation(i))))
+    print()
+    print(f"Command frame mismatches : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import argparse
+import os
+import time
+import numpy as np
+from experimental.voc_index_calculator import VOCIndexCalculator
+
+
+def update_scalar(raw, alpha, scale):
+    """
+    Calculate the index for each value in turn using the scalar update and return the elapsed time and results
+    """
+    calculator = VOCIndexCalculator(alpha, scale)
+    start = time.perf_counter()
+    results = [calculator.update(value) for value in raw.tolist()]
+    return time.perf_counter() - start, results
+
+
+def update_batch(raw, alpha, scale):
+    """
+    Calculate the index for all the values using the batch update and return the elapsed time and results
+    """
+    calculator = VOCIndexCalculator(alpha, scale)
+    start = time.perf_counter()
+    results = calculator.update_batch(raw)
+    return time.perf_counter() - start, results
+
+
+def report(label, count, elapsed):
+    print(f"{label:<24} {count:>10} samples  {elapsed:8.3f} s  {count / elapsed:14.1f} samples/s")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="VOC Index Calculator Batch Benchmark")
+    ap.add_argument("--samples", type=int, default=31 * 86400, help="Number of 1 Hz SRAW samples, default one month")
+    ap.add_argument("--verify", type=int, default=1000000, help="Number of samples to calculate with the scalar path and compare")
+    ap.add_argument("--alpha", type=float, default=0.001, help="Baseline alpha")
+    ap.add_argument("--scale", type=float, default=300.0, help="Deviation scale")
+    ap.add_argument("--seed", type=int, default=1, help="Random seed for the SRAW samples")
+    args = ap.parse_args()
+
+    # Show the argument values
+    print()
+    print(os.path.basename(__file__).upper())
+    print()
+    args_dict = vars(args)
+    for name, value in args_dict.items():
+        print(f"{name} : {value}")
+    print()
+
+    # Generate a random walk of SRAW values around a typical indoor reading
+    generator = np.random.default_rng(args.seed)
+    raw = np.clip(30000 + np.cumsum(generator.normal(0, 20, args.samples)), 0, 65535).astype(np.int64)
+
+    batch_elapsed, batch_results = update_batch(raw, args.alpha, args.scale)
+
+    count = min(args.verify, args.samples)
+    scalar_elapsed, scalar_results = update_scalar(raw[:count], args.alpha, args.scale)
+
+    report("Scalar", count, scalar_elapsed)
+    report("Batch", args.samples, batch_elapsed)
+    print()
+
+    # The batch results must match the scalar path
+    mismatches = int(np.count_nonzero(np.array(scalar_results) != batch_results[:count]))
+    print(f"Batch mismatches in the first {count} samples : {mismatches}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,5 +1,9 @@
 import pytest
 from registry import AppSettings, DeviceFactory, DeviceType
+from sensors import BME280, BME280CalibrationCache, BME280Mode
+from sensors.bme280 import REG_CTRL_HUM, REG_STATUS, REG_CTRL_MEAS, REG_CONFIG, STATUS_MEASURING
+from sensors.bme280_trimming_parameters import TRIMMING_PARAMETER_REGISTERS
+from sensors.bme280_trimming_parameters import DIG_T1, DIG_T2, DIG_P1, DIG_P9, DIG_H1, DIG_H2, DIG_H4, DIG_H5, DIG_H6
 from helpers import MockSMBus, BME280_TRIMMING_PARAMETERS
 
 
@@ -97,3 +101,151 @@ def test_bme280_wrapper(fixture):
     assert T == pytest.approx(fixture["temperature"], abs=0.2)
     assert P == pytest.approx(fixture["pressure"], abs=2.0)
     assert H == pytest.approx(fixture["humidity"], abs=3.0)
+
+
+def expected_trimming_parameter(register, signed, length=2):
+    """
+    Decode a trimming parameter from the mock registers, a byte at a time
+    """
+    data = bytes(BME280_TRIMMING_PARAMETERS.get(register + i, 0) for i in range(length))
+    return int.from_bytes(data, "little", signed=signed)
+
+
+def test_trimming_parameters_are_decoded_from_blocks():
+    sensor = BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, None, None), MockSMBus.BME280_ADDRESS, None, None)
+    e4 = expected_trimming_parameter(0xE4, True, 1)
+    e5 = expected_trimming_parameter(0xE5, False, 1)
+    e6 = expected_trimming_parameter(0xE6, True, 1)
+
+    assert sensor.get_trimming_parameter(DIG_T1) == expected_trimming_parameter(DIG_T1, False)
+    assert sensor.get_trimming_parameter(DIG_T2) == expected_trimming_parameter(DIG_T2, True)
+    assert sensor.get_trimming_parameter(DIG_P1) == expected_trimming_parameter(DIG_P1, False)
+    assert sensor.get_trimming_parameter(DIG_P9) == expected_trimming_parameter(DIG_P9, True)
+    assert sensor.get_trimming_parameter(DIG_H1) == expected_trimming_parameter(DIG_H1, False, 1)
+    assert sensor.get_trimming_parameter(DIG_H2) == expected_trimming_parameter(DIG_H2, True)
+    assert sensor.get_trimming_parameter(DIG_H4) == (e4 << 4) | (e5 & 0x0F)
+    assert sensor.get_trimming_parameter(DIG_H5) == (e6 << 4) | (e5 >> 4)
+    assert sensor.get_trimming_parameter(DIG_H6) == expected_trimming_parameter(DIG_H6, True, 1)
+
+
+def test_calibration_cache_is_reused(tmp_path):
+    cache = BME280CalibrationCache(tmp_path / "calibration.json", 1)
+    sensor = BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, None, None), MockSMBus.BME280_ADDRESS, None, None, cache)
+    assert (tmp_path / "calibration.json").exists()
+
+    # The second sensor would read different parameters from the bus, so matching shows the cache was used
+    cached = BME280(MockSMBus({}, None, None), MockSMBus.BME280_ADDRESS, None, None, cache)
+    assert cached.trimming_parameters == sensor.trimming_parameters
+
+
+def test_calibration_cache_is_keyed_by_chip_id(tmp_path):
+    cache = BME280CalibrationCache(tmp_path / "calibration.json", 1)
+    BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, None, None), MockSMBus.BME280_ADDRESS, None, None, cache)
+    assert cache.load(MockSMBus.BME280_ADDRESS, None, 0x61, TRIMMING_PARAMETER_REGISTERS) is None
+
+
+def test_invalid_calibration_cache_is_ignored(tmp_path):
+    cache_file = tmp_path / "calibration.json"
+    cache_file.write_text("{ not json")
+    cache = BME280CalibrationCache(cache_file, 1)
+    sensor = BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, None, None), MockSMBus.BME280_ADDRESS, None, None, cache)
+
+    # The file's rewritten with a valid entry
+    assert cache.load(MockSMBus.BME280_ADDRESS, None, 0x00, TRIMMING_PARAMETER_REGISTERS) == sensor.trimming_parameters
+
+
+@pytest.mark.parametrize("fixture", [
+    ROOM_STANDARD,
+    COLD_NEAR_MIN,
+    HOT_NEAR_MAX,
+    HIGH_ALTITUDE
+])
+def test_float_compensation_matches_integer(fixture):
+    sensor = BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, fixture["block"], None), MockSMBus.BME280_ADDRESS, None, None)
+    data = fixture["block"]
+    adc_p = (data[0] << 12) | (data[1] << 4) | (data[2] >> 4)
+    adc_t = (data[3] << 12) | (data[4] << 4) | (data[5] >> 4)
+    adc_h = (data[6] << 8) | data[7]
+
+    t_fine, temp_c = sensor.compensate_temperature(adc_t)
+    t_fine_float, temp_c_float = sensor.compensate_temperature_float(adc_t)
+
+    assert temp_c_float == pytest.approx(temp_c, abs=0.01)
+    assert sensor.compensate_pressure_float(t_fine_float, adc_p) == pytest.approx(sensor.compensate_pressure(t_fine, adc_p), abs=0.01)
+    assert sensor.compensate_humidity_float(t_fine_float, adc_h) == pytest.approx(sensor.compensate_humidity(t_fine, adc_h), abs=0.01)
+
+
+class ForcedModeBus(MockSMBus):
+    """
+    Mock bus that records register writes and reports a measurement in progress for a number of
+    status register polls
+    """
+
+    def __init__(self, busy_polls):
+        super().__init__(BME280_TRIMMING_PARAMETERS, ROOM_STANDARD["block"], None)
+        self.busy_polls = busy_polls
+        self.writes = []
+
+    def write_byte_data(self, addr, reg, value):
+        self.writes.append((reg, value))
+
+    def read_byte_data(self, addr, reg):
+        if reg == REG_STATUS and self.busy_polls:
+            self.busy_polls -= 1
+            return STATUS_MEASURING
+        return super().read_byte_data(addr, reg)
+
+
+def test_configures_oversampling_and_filter():
+    bus = ForcedModeBus(0)
+    BME280(bus, MockSMBus.BME280_ADDRESS, None, None, None, BME280Mode.FORCED, {"temperature": 2, "pressure": 16, "humidity": 4}, 8)
+    assert bus.writes == [(REG_CTRL_MEAS, 0x00), (REG_CONFIG, 0x0C), (REG_CTRL_HUM, 0x03), (REG_CTRL_MEAS, 0x54)]
+
+
+def test_normal_mode_start_does_not_poll_status():
+    # In normal mode the sensor is measuring nearly all the time, which mustn't cause a timeout
+    bus = ForcedModeBus(1000)
+    sensor = BME280(bus, MockSMBus.BME280_ADDRESS, None, None, None, BME280Mode.NORMAL)
+    assert 1000 == bus.busy_polls
+    assert (REG_CTRL_MEAS, 0x27) == bus.writes[-1]
+
+    T, _, _ = sensor.read()
+    assert T == pytest.approx(ROOM_STANDARD["temperature"], abs=0.2)
+
+
+def test_forced_mode_triggers_measurement_and_polls_status():
+    bus = ForcedModeBus(0)
+    sensor = BME280(bus, MockSMBus.BME280_ADDRESS, None, None, None, BME280Mode.FORCED)
+    bus.writes.clear()
+    bus.busy_polls = 3
+
+    T, _, _ = sensor.read()
+
+    assert bus.writes == [(REG_CTRL_MEAS, 0x25)]
+    assert bus.busy_polls == 0
+    assert T == pytest.approx(ROOM_STANDARD["temperature"], abs=0.2)
+    assert sensor.measurement_status(60)["measurements"] == 1
+
+
+def test_forced_mode_measurement_timeout():
+    sensor = BME280(ForcedModeBus(0), MockSMBus.BME280_ADDRESS, None, None, None, BME280Mode.FORCED)
+    sensor.sm_bus.busy_polls = 1000
+    with pytest.raises(TimeoutError):
+        sensor.read()
+
+
+def test_invalid_oversampling_is_rejected():
+    with pytest.raises(ValueError):
+        BME280(ForcedModeBus(0), MockSMBus.BME280_ADDRESS, None, None, None, BME280Mode.FORCED, {"humidity": 3})
+
+
+def test_measurement_status_estimates_current():
+    forced = BME280(ForcedModeBus(0), MockSMBus.BME280_ADDRESS, None, None, None, BME280Mode.FORCED).measurement_status(60)
+    normal = BME280(ForcedModeBus(0), MockSMBus.BME280_ADDRESS, None, None).measurement_status(60)
+
+    assert forced["mode"] == "forced"
+    assert normal["mode"] == "normal"
+    assert forced["typical_measurement_ms"] == pytest.approx(8.0)
+    assert forced["max_measurement_ms"] == pytest.approx(9.3)
+    assert forced["estimated_current_ua"] < 1.0
+    assert normal["estimated_current_ua"] > 100 * forced["estimated_current_ua"]
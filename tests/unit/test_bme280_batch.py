@@ -0,0 +1,52 @@
+import numpy as np
+from sensors import BME280
+from helpers import MockSMBus, BME280_TRIMMING_PARAMETERS
+
+
+def construct_sensor():
+    return BME280(MockSMBus(BME280_TRIMMING_PARAMETERS, [0] * 8, None), MockSMBus.BME280_ADDRESS, None, None)
+
+
+def compensate_scalar(sensor, adc_t, adc_p, adc_h):
+    t_fine, temp_c = sensor.compensate_temperature(adc_t)
+    return temp_c, sensor.compensate_pressure(t_fine, adc_p), sensor.compensate_humidity(t_fine, adc_h)
+
+
+def test_batch_matches_scalar_compensation():
+    sensor = construct_sensor()
+    generator = np.random.default_rng(1)
+    adc_t = generator.integers(0, 1 << 20, 5000)
+    adc_p = generator.integers(0, 1 << 20, 5000)
+    adc_h = generator.integers(0, 1 << 16, 5000)
+
+    temp_c, pressure_hpa, humidity = sensor.compensate_batch(adc_t, adc_p, adc_h)
+
+    for i in range(len(adc_t)):
+        expected = compensate_scalar(sensor, int(adc_t[i]), int(adc_p[i]), int(adc_h[i]))
+        assert expected == (temp_c[i], pressure_hpa[i], humidity[i])
+
+
+def test_batch_matches_scalar_at_range_limits():
+    sensor = construct_sensor()
+    limits = [(t, p, h) for t in (0, (1 << 20) - 1) for p in (0, (1 << 20) - 1) for h in (0, (1 << 16) - 1)]
+    adc_t, adc_p, adc_h = (list(values) for values in zip(*limits))
+
+    temp_c, pressure_hpa, humidity = sensor.compensate_batch(adc_t, adc_p, adc_h)
+
+    for i, (t, p, h) in enumerate(limits):
+        assert compensate_scalar(sensor, t, p, h) == (temp_c[i], pressure_hpa[i], humidity[i])
+
+
+def test_batch_matches_scalar_at_pressure_limits_with_extreme_calibration():
+    # A small dig_P1 and the largest dig_P9 take the pressure intermediates beyond 64 bits at these
+    # ADC values, including 0x80000, reported when the pressure measurement was skipped
+    trimming_parameters = dict(BME280_TRIMMING_PARAMETERS)
+    trimming_parameters.update({0x8E: 0x01, 0x8F: 0x00, 0x9E: 0xFF, 0x9F: 0x7F})
+    sensor = BME280(MockSMBus(trimming_parameters, [0] * 8, None), MockSMBus.BME280_ADDRESS, None, None)
+    limits = [(t, p, 0) for t in (0, 0x80000, (1 << 20) - 1) for p in (0, 1, 0x80000, (1 << 20) - 1)]
+    adc_t, adc_p, adc_h = (list(values) for values in zip(*limits))
+
+    temp_c, pressure_hpa, humidity = sensor.compensate_batch(adc_t, adc_p, adc_h)
+
+    for i, (t, p, h) in enumerate(limits):
+        assert compensate_scalar(sensor, t, p, h) == (temp_c[i], pressure_hpa[i], humidity[i])
@@ -1,15 +1,15 @@
 import pytest
 from registry import AppSettings, DeviceFactory, DeviceType
-from service import BME280Sampler
+from service import BME280Sampler, EventBroadcaster
 from helpers import MockSMBus, BME280_TRIMMING_PARAMETERS, MockDatabase
 
 
-def construct_sampler(data, enabled):
+def construct_sampler(data, enabled, broadcaster=None, recent_capacity=0):
     settings = AppSettings(AppSettings.default_settings_file())
     bus = MockSMBus(BME280_TRIMMING_PARAMETERS, data, None)
     factory = DeviceFactory(bus, None, None, settings)
     sensor = factory.create_device(DeviceType.BME280)
-    return BME280Sampler(sensor, enabled, MockDatabase())
+    return BME280Sampler(sensor, enabled, MockDatabase(), broadcaster, recent_capacity)
 
 ROOM_STANDARD = {
     "block": [85, 28, 112, 125, 93, 240, 142, 35],
@@ -28,9 +28,9 @@ def test_bme280_sampler(fixture):
 
     assert True == sampler.is_enabled
     assert True == sampler.is_available
-    assert readings["temperature_c"] == pytest.approx(fixture["temperature"], abs=0.2)
-    assert readings["pressure_hpa"] == pytest.approx(fixture["pressure"], abs=2.0)
-    assert readings["humidity_pct"] == pytest.approx(fixture["humidity"], abs=3.0)
+    assert readings.temperature_c == pytest.approx(fixture["temperature"], abs=0.2)
+    assert readings.pressure_hpa == pytest.approx(fixture["pressure"], abs=2.0)
+    assert readings.humidity_pct == pytest.approx(fixture["humidity"], abs=3.0)
 
 
 def test_bme280_sampler_disabled_on_start():
@@ -60,12 +60,42 @@ def test_bme280_sampler_enable_after_start(fixture):
     readings = sampler.latest
 
     assert True == sampler.is_enabled
-    assert readings["temperature_c"] == pytest.approx(fixture["temperature"], abs=0.2)
-    assert readings["pressure_hpa"] == pytest.approx(fixture["pressure"], abs=2.0)
-    assert readings["humidity_pct"] == pytest.approx(fixture["humidity"], abs=3.0)
+    assert readings.temperature_c == pytest.approx(fixture["temperature"], abs=0.2)
+    assert readings.pressure_hpa == pytest.approx(fixture["pressure"], abs=2.0)
+    assert readings.humidity_pct == pytest.approx(fixture["humidity"], abs=3.0)
 
 
 def test_bme280_sampler_with_no_sensor():
     sampler = BME280Sampler(None, True, MockDatabase())
     assert False == sampler.is_enabled
     assert False == sampler.is_available
+
+
+def test_bme280_sampler_publishes_readings():
+    broadcaster = EventBroadcaster()
+    subscription = broadcaster.subscribe()
+    sampler = construct_sampler(ROOM_STANDARD["block"], True, broadcaster)
+    sampler.sample_and_store()
+    sampler.disable()
+
+    assert subscription.get(0).startswith(b"event: bme\ndata: {\"time_utc\"")
+    assert b"event: bme\ndata: null\n\n" == subscription.get(0)
+
+
+def test_bme280_sampler_keeps_recent_readings():
+    sampler = construct_sampler(ROOM_STANDARD["block"], True, recent_capacity=2)
+    for _ in range(3):
+        sampler.sample_and_store()
+    latest = sampler.latest
+    sampler.disable()
+
+    # Disabling the sensor clears the latest reading but not the recent history
+    recent = sampler.recent_readings()
+    assert 2 == len(recent)
+    assert latest._asdict() == recent[-1]
+
+
+def test_bme280_sampler_without_recent_readings():
+    sampler = construct_sampler(ROOM_STANDARD["block"], True)
+    sampler.sample_and_store()
+    assert [] == sampler.recent_readings()
@@ -0,0 +1,94 @@
+import threading
+import time
+from i2c import BusArbiter, I2CDevice, bus_transaction
+from helpers import MockSMBus, MockI2CMsg
+
+MUX_ADDRESS = 0x70
+
+
+class ChannelCheckingBus(MockSMBus):
+    """
+    Mock bus that records the selected mux channel and fails a read if the channel has been switched
+    to another device's since it was selected
+    """
+
+    def __init__(self):
+        super().__init__(None, None, None)
+        self.channel = None
+        self.errors = 0
+
+    def write_byte(self, addr, byte):
+        if addr == MUX_ADDRESS:
+            self.channel = byte
+            # Give the other thread a chance to switch the channel if the bus isn't serialised
+            time.sleep(0.001)
+
+    def read_i2c_block_data(self, addr, reg, length):
+        if self.channel != 1 << reg:
+            self.errors += 1
+        return [0] * length
+
+
+def test_proxies_bus_methods():
+    bus = BusArbiter(MockSMBus(None, None, None))
+    bus.write_byte(MUX_ADDRESS, 1)
+    assert bus.VEML7700_ADDRESS == MockSMBus.VEML7700_ADDRESS
+    assert bus.metrics["transactions"] == 1
+
+
+def test_nested_transactions_are_counted_once():
+    bus = BusArbiter(MockSMBus(None, None, None))
+    with bus.transaction():
+        bus.write_byte(MUX_ADDRESS, 1)
+        bus.write_byte_data(MockSMBus.BME280_ADDRESS, 0xF4, 0x27)
+    assert bus.metrics["transactions"] == 1
+
+
+def test_unshared_bus_transaction_is_a_no_op():
+    bus = MockSMBus(None, None, None)
+    with bus_transaction(bus) as held:
+        assert held is bus
+
+
+def test_channel_select_and_transfer_are_serialised():
+    mock_bus = ChannelCheckingBus()
+    bus = BusArbiter(mock_bus)
+
+    # Two devices on different mux channels, each reading a register that identifies its channel
+    def read(channel):
+        device = I2CDevice(bus, MockSMBus.VEML7700_ADDRESS, MUX_ADDRESS, channel, MockI2CMsg())
+        for _ in range(20):
+            device.read_u16(channel)
+
+    threads = [threading.Thread(target=read, args=(channel,)) for channel in (1, 2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert mock_bus.errors == 0
+    assert bus.metrics["transactions"] == 40
+
+
+def test_waits_between_transactions_do_not_hold_the_bus():
+    bus = BusArbiter(MockSMBus(None, None, None))
+    device = I2CDevice(bus, MockSMBus.SGP40_ADDRESS, None, None, MockI2CMsg())
+
+    # Hold the bus in one thread and check another can't use it until it's released
+    released = threading.Event()
+    finished = []
+
+    def write():
+        device.write_bytes_raw(b"\x26\x0f")
+        finished.append(released.is_set())
+
+    with bus.transaction():
+        thread = threading.Thread(target=write)
+        thread.start()
+        thread.join(0.05)
+        assert not finished
+        released.set()
+
+    thread.join()
+    assert finished == [True]
+    assert bus.metrics["max_wait_ms"] > 0
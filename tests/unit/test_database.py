@@ -0,0 +1,553 @@
+import pytest
+import sqlite3
+from pathlib import Path
+from db import Database, DatabaseMaintenance
+from db.database import epoch_seconds, utc_timestamp
+from db.size_estimates import estimate_record_bytes
+
+
+def construct_database(tmp_path, **kwargs):
+    database = Database(str(tmp_path / "weather.db"), 0, 1, "0x76", "0x10", 0.25, 100, "0x59", **kwargs)
+    database.create_database()
+    return database
+
+
+def count_rows(database, table):
+    with sqlite3.connect(database.db_path) as con:
+        return con.execute(f"SELECT COUNT(*) FROM {table};").fetchone()[0]
+
+
+def test_insert_readings(tmp_path):
+    database = construct_database(tmp_path)
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.insert_veml_row(100, 120, 23.04, False)
+    database.insert_sgp_row(30000, 100, "Good", "****")
+    database.close()
+
+    assert 1 == count_rows(database, "BME280_READINGS")
+    assert 1 == count_rows(database, "VEML7700_READINGS")
+    assert 1 == count_rows(database, "SGP40_READINGS")
+
+
+def test_connection_is_reused(tmp_path):
+    database = construct_database(tmp_path)
+    connection = database.connection
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.insert_bme_row(21.5, 1012.0, 51.0)
+
+    assert connection is not None
+    assert connection is database.connection
+    database.close()
+
+
+def test_wal_journal_mode(tmp_path):
+    database = construct_database(tmp_path)
+    journal_mode = database.connection.execute("PRAGMA journal_mode;").fetchone()[0]
+    synchronous = database.connection.execute("PRAGMA synchronous;").fetchone()[0]
+    database.close()
+
+    assert "wal" == journal_mode
+    # NORMAL is reported as 1
+    assert 1 == synchronous
+
+
+def test_configurable_synchronous(tmp_path):
+    database = construct_database(tmp_path, journal_mode="delete", synchronous="full")
+    journal_mode = database.connection.execute("PRAGMA journal_mode;").fetchone()[0]
+    synchronous = database.connection.execute("PRAGMA synchronous;").fetchone()[0]
+    database.close()
+
+    assert "delete" == journal_mode
+    assert 2 == synchronous
+
+
+@pytest.mark.parametrize("journal_mode, synchronous", [
+    ("WAL", "SOMETIMES"),
+    ("WAL; DROP TABLE X", "NORMAL")
+])
+def test_invalid_pragma_settings(tmp_path, journal_mode, synchronous):
+    with pytest.raises(ValueError):
+        Database(str(tmp_path / "weather.db"), 0, 1, "0x76", "0x10", 0.25, 100, "0x59", journal_mode, synchronous)
+
+
+def test_close_and_reopen(tmp_path):
+    database = construct_database(tmp_path)
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.close()
+    assert database.connection is None
+
+    # Closing twice is harmless and the connection is reopened on demand
+    database.close()
+    database.insert_bme_row(21.5, 1012.0, 51.0)
+    database.close()
+
+    assert 2 == count_rows(database, "BME280_READINGS")
+
+
+def test_snapshot_sizes(tmp_path):
+    database = construct_database(tmp_path)
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.snapshot_sizes()
+    database.close()
+
+    assert count_rows(database, "DB_SIZE_SNAPSHOTS") > 0
+
+
+def query_size_estimate(database, table):
+    with sqlite3.connect(database.db_path) as con:
+        return con.execute("SELECT Rows, Bytes FROM TABLE_SIZE_ESTIMATES WHERE Object_Name = ?;", (table,)).fetchone()
+
+
+def measure_payload_bytes(database, table):
+    with sqlite3.connect(database.db_path) as con:
+        columns = [r[1] for r in con.execute(f"PRAGMA table_info({table});").fetchall()]
+        expr = " + ".join(f"COALESCE(LENGTH(CAST({c} AS BLOB)), 0)" for c in columns)
+        return con.execute(f"SELECT SUM({expr}) FROM {table};").fetchone()[0]
+
+
+@pytest.mark.parametrize("values, expected", [
+    ((None, 0, 1, True), 5),
+    ((127, -128, 128), 4 + 1 + 1 + 2),
+    ((1 << 40, 1 << 50), 3 + 6 + 8),
+    ((21.5, "Good"), 3 + 8 + 4)
+])
+def test_estimate_record_bytes(values, expected):
+    assert expected == estimate_record_bytes(values)
+
+
+@pytest.mark.parametrize("schema_version, table", [
+    (1, "BME280_READINGS"),
+    (2, "BME280_READINGS_V2")
+])
+def test_size_estimates_maintained_on_insert(tmp_path, schema_version, table):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    write_bme_readings(database, 2)
+    database.close()
+
+    rows, size = query_size_estimate(database, table)
+    assert count_rows(database, table) == rows
+    # The estimate includes the record headers, so is a little larger than the column payload
+    assert measure_payload_bytes(database, table) < size < 2 * measure_payload_bytes(database, table)
+
+
+@pytest.mark.parametrize("schema_version", [1, 2])
+def test_size_estimates_maintained_on_purge(tmp_path, schema_version):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    database.retention = 60
+    write_old_and_new_readings(database, 50, 1)
+    table = "BME280_READINGS_V2" if schema_version == 2 else "BME280_READINGS"
+    _, size_before = query_size_estimate(database, table)
+    database.purge(7, 0.0)
+    database.close()
+
+    rows, size = query_size_estimate(database, table)
+    assert 1 == rows
+    assert 0 < size < size_before
+
+
+def test_size_estimates_added_to_existing_database(tmp_path):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 1)
+    with sqlite3.connect(database.db_path) as con:
+        con.execute("DROP TABLE TABLE_SIZE_ESTIMATES;")
+
+    database.create_database()
+    database.close()
+
+    rows, size = query_size_estimate(database, "BME280_READINGS")
+    assert count_rows(database, "BME280_READINGS") == rows
+    assert measure_payload_bytes(database, "BME280_READINGS") == size
+
+
+def test_size_estimates_recalculated_on_migration(tmp_path):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 1)
+    database.migrate_to_v2(drop_v1=True)
+    database.close()
+
+    rows, _ = query_size_estimate(database, "BME280_READINGS_V2")
+    assert count_rows(database, "BME280_READINGS_V2") == rows
+    assert query_size_estimate(database, "BME280_READINGS") is None
+
+
+def test_snapshot_uses_size_estimates_without_dbstat(tmp_path, monkeypatch):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 1)
+    monkeypatch.setattr(database, "_has_dbstat", lambda con: False)
+    database.snapshot_sizes()
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        bytes, method = con.execute("SELECT Bytes, Method FROM DB_SIZE_SNAPSHOTS WHERE Object_Name = 'BME280_READINGS';").fetchone()
+        task, elapsed = con.execute("SELECT Task, Elapsed_MS FROM MAINTENANCE_LOG;").fetchone()
+
+    assert "incremental_estimate" == method
+    assert query_size_estimate(database, "BME280_READINGS")[1] == bytes
+    assert "snapshot" == task
+    assert elapsed >= 0
+
+
+def test_insert_readings_v2(tmp_path):
+    database = construct_database(tmp_path, schema_version=2)
+    timestamp = database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.insert_veml_row(100, 120, 23.04, False)
+    database.insert_sgp_row(30000, 100, "Good", "****")
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        epoch, device_type, address = con.execute(
+            "SELECT r.Timestamp, d.DeviceType, d.Address FROM BME280_READINGS_V2 r JOIN DEVICES d ON d.Id = r.DeviceId;").fetchone()
+        tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()]
+
+    assert epoch_seconds(timestamp) == epoch
+    assert "BME280" == device_type
+    assert "0x76" == address
+    assert "BME280_READINGS" not in tables
+    assert 1 == count_rows(database, "VEML7700_READINGS_V2")
+    assert 1 == count_rows(database, "SGP40_READINGS_V2")
+    assert 3 == count_rows(database, "DEVICES")
+
+
+def test_invalid_schema_version(tmp_path):
+    with pytest.raises(ValueError):
+        Database(str(tmp_path / "weather.db"), 0, 1, "0x76", "0x10", 0.25, 100, "0x59", schema_version=3)
+
+
+def test_epoch_seconds():
+    assert 1735689600 == epoch_seconds("2025-01-01T00:00:00+00:00Z")
+    assert 1735689600 == epoch_seconds("2025-01-01T00:00:00Z")
+
+
+@pytest.mark.parametrize("chunk_size", [1, 7, 1000])
+def test_migrate_to_v2(tmp_path, chunk_size):
+    database = construct_database(tmp_path)
+    database.write_readings([("BME280", f"2025-01-01T00:{i:02d}:00+00:00Z", (20.0 + i, 1013.0, 50.0)) for i in range(20)])
+    database.write_readings([("VEML7700", f"2025-01-01T00:{i:02d}:00+00:00Z", (i, i, i * 0.2304, False)) for i in range(15)])
+    copied = database.migrate_to_v2(chunk_size)
+
+    # New readings go into the version 2 tables
+    database.insert_sgp_row(30000, 100, "Good", "****")
+    database.close()
+
+    assert 2 == database.schema_version
+    assert {"BME280_READINGS": 20, "VEML7700_READINGS": 15, "SGP40_READINGS": 0} == copied
+    assert 20 == count_rows(database, "BME280_READINGS_V2")
+    assert 15 == count_rows(database, "VEML7700_READINGS_V2")
+    assert 1 == count_rows(database, "SGP40_READINGS_V2")
+
+    with sqlite3.connect(database.db_path) as con:
+        first, temperature = con.execute("SELECT Timestamp, Temperature FROM BME280_READINGS_V2 ORDER BY Timestamp LIMIT 1;").fetchone()
+    assert 1735689600 == first
+    assert 20.0 == temperature
+
+
+def test_migrate_to_v2_and_drop_v1(tmp_path):
+    database = construct_database(tmp_path)
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.migrate_to_v2(drop_v1=True)
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        tables = [r[0] for r in con.execute("SELECT name FROM sqlite_master WHERE type='table';").fetchall()]
+
+    assert "BME280_READINGS" not in tables
+    assert 1 == count_rows(database, "BME280_READINGS_V2")
+
+
+@pytest.mark.parametrize("schema_version, table", [
+    (1, "BME280_READINGS"),
+    (2, "BME280_READINGS_V2")
+])
+def test_snapshot_records_query_timings(tmp_path, schema_version, table):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.snapshot_sizes()
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        rows, elapsed = con.execute("SELECT Rows, Elapsed_MS FROM DB_QUERY_SNAPSHOTS WHERE Object_Name = ?;", (table,)).fetchone()
+
+    assert 1 == rows
+    assert elapsed >= 0
+
+
+def query_rollups(database, granularity, metric):
+    with sqlite3.connect(database.db_path) as con:
+        return con.execute("""
+            SELECT PeriodStart, Count, Sum, Min, Max FROM READING_ROLLUPS
+            WHERE Granularity = ? AND Metric = ? ORDER BY PeriodStart;""", (granularity, metric)).fetchall()
+
+
+def write_bme_readings(database, hours):
+    # One reading every 20 minutes starting at midnight on 1st January 2025
+    readings = [("BME280", f"2025-01-01T{i // 3:02d}:{(i % 3) * 20:02d}:00+00:00Z", (float(i), 1000.0 + i, 50.0)) for i in range(3 * hours)]
+    database.write_readings(readings)
+
+
+@pytest.mark.parametrize("schema_version", [1, 2])
+def test_rollups_maintained_on_insert(tmp_path, schema_version):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    write_bme_readings(database, 2)
+    database.close()
+
+    hourly = query_rollups(database, "hour", "temperature")
+    daily = query_rollups(database, "day", "temperature")
+
+    assert [(1735689600, 3, 3.0, 0.0, 2.0), (1735693200, 3, 12.0, 3.0, 5.0)] == hourly
+    assert [(1735689600, 6, 15.0, 0.0, 5.0)] == daily
+
+
+def test_duplicate_second_is_not_rolled_up_v2(tmp_path):
+    database = construct_database(tmp_path, schema_version=2)
+    timestamp = "2025-01-01T00:00:00+00:00Z"
+    database.write_readings([("BME280", timestamp, (20.0, 1000.0, 50.0)), ("BME280", timestamp, (30.0, 1000.0, 50.0))])
+    database.close()
+
+    # The first reading in the second is kept and the rollups agree with the raw data
+    with sqlite3.connect(database.db_path) as con:
+        assert [(20.0,)] == con.execute("SELECT Temperature FROM BME280_READINGS_V2;").fetchall()
+    assert [(1735689600, 1, 20.0, 20.0, 20.0)] == query_rollups(database, "hour", "temperature")
+    assert 1 == query_size_estimate(database, "BME280_READINGS_V2")[0]
+
+
+@pytest.mark.parametrize("schema_version", [1, 2])
+def test_rebuild_rollups_matches_incremental(tmp_path, schema_version):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    write_bme_readings(database, 5)
+    database.insert_veml_row(100, 120, 23.04, False)
+    database.insert_sgp_row(30000, 100, "Good", "****")
+    expected = [query_rollups(database, g, m) for g in ["hour", "day"] for m in ["temperature", "illuminance", "voc_index"]]
+
+    database.rebuild_rollups()
+    database.close()
+
+    actual = [query_rollups(database, g, m) for g in ["hour", "day"] for m in ["temperature", "illuminance", "voc_index"]]
+    assert expected == actual
+
+
+def test_rollups_added_to_existing_database(tmp_path):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 1)
+    with sqlite3.connect(database.db_path) as con:
+        con.execute("DROP TABLE READING_ROLLUPS;")
+
+    database.create_database()
+    database.close()
+
+    assert [(1735689600, 3, 3.0, 0.0, 2.0)] == query_rollups(database, "hour", "temperature")
+
+
+@pytest.mark.parametrize("sql_file, granularity, days", [
+    ("bme280-rollups.sql", "hour", "NULL"),
+    ("veml7700-rollups.sql", "day", "NULL"),
+    ("sgp40-rollups.sql", "hour", 30)
+])
+def test_report_rollup_queries(tmp_path, sql_file, granularity, days):
+    database = construct_database(tmp_path)
+    database.insert_bme_row(21.0, 1013.0, 50.0)
+    database.insert_veml_row(100, 120, 23.04, False)
+    database.insert_sgp_row(30000, 100, "Good", "****")
+    database.close()
+
+    # Substitute the placeholders in the same way as the reporting notebooks
+    query_file = Path(__file__).resolve().parent.parent.parent / "reports" / "sql" / sql_file
+    query = query_file.read_text().replace("$GRANULARITY", granularity).replace("$DAYS", str(days))
+    with sqlite3.connect(database.db_path) as con:
+        rows = con.execute(query).fetchall()
+
+    assert 1 == len(rows)
+    assert rows[0][0].endswith("Z")
+
+
+def write_old_and_new_readings(database, old_count, new_count):
+    old = "2000-01-01T00:00:00+00:00Z"
+    readings = [("BME280", old, (21.0, 1013.0, 50.0)) for _ in range(old_count)]
+    readings += [("BME280", utc_timestamp(), (21.0, 1013.0, 50.0)) for _ in range(new_count)]
+    if database.schema_version == 2:
+        # Version 2 permits one reading per device per second, so spread the old readings out
+        readings = [("BME280", f"2000-01-01T00:{i // 60:02d}:{i % 60:02d}+00:00Z", r[2]) for i, r in enumerate(readings[:old_count])]
+        readings.append(("BME280", utc_timestamp(), (21.0, 1013.0, 50.0)))
+    database.write_readings(readings)
+
+
+@pytest.mark.parametrize("schema_version, chunk_size", [
+    (1, 7),
+    (1, 500),
+    (2, 7),
+    (2, 500)
+])
+def test_chunked_purge(tmp_path, schema_version, chunk_size):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    database.retention = 60
+    write_old_and_new_readings(database, 50, 1)
+    database.purge(chunk_size, 0.0, True)
+    database.close()
+
+    table = "BME280_READINGS_V2" if schema_version == 2 else "BME280_READINGS"
+    assert 1 == count_rows(database, table)
+
+    with sqlite3.connect(database.db_path) as con:
+        task, rows, chunks, elapsed = con.execute("SELECT Task, Rows, Chunks, Elapsed_MS FROM MAINTENANCE_LOG;").fetchone()
+
+    assert "purge" == task
+    assert 50 == rows
+    assert chunks >= 50 // chunk_size + 1
+    assert elapsed >= 0
+
+
+def test_purge_keeps_rollups(tmp_path):
+    database = construct_database(tmp_path)
+    database.retention = 60
+    write_old_and_new_readings(database, 5, 0)
+    database.purge(500, 0.0)
+    database.close()
+
+    assert 0 == count_rows(database, "BME280_READINGS")
+    assert [(946684800, 5, 105.0, 21.0, 21.0)] == query_rollups(database, "hour", "temperature")
+
+
+def test_purge_with_no_retention(tmp_path):
+    database = construct_database(tmp_path)
+    write_old_and_new_readings(database, 5, 1)
+    database.purge()
+    database.close()
+
+    assert 6 == count_rows(database, "BME280_READINGS")
+    assert 0 == count_rows(database, "MAINTENANCE_LOG")
+
+
+def test_purge_returns_pages_with_incremental_vacuum(tmp_path):
+    database = construct_database(tmp_path)
+    database.retention = 60
+    write_old_and_new_readings(database, 20000, 1)
+    database.purge(5000, 0.0, True)
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        pages_freed = con.execute("SELECT Pages_Freed FROM MAINTENANCE_LOG;").fetchone()[0]
+        free_pages = con.execute("PRAGMA freelist_count;").fetchone()[0]
+        auto_vacuum = con.execute("PRAGMA auto_vacuum;").fetchone()[0]
+
+    assert 2 == auto_vacuum
+    assert pages_freed > 0
+    assert 0 == free_pages
+
+
+def test_maintenance_runs_tasks(tmp_path):
+    database = construct_database(tmp_path)
+    database.retention = 60
+    write_old_and_new_readings(database, 10, 1)
+    maintenance = DatabaseMaintenance(database, interval=3600, purge_chunk_size=3, purge_chunk_delay=0.0)
+    maintenance.run_once()
+    database.close()
+
+    assert 1 == count_rows(database, "BME280_READINGS")
+    assert count_rows(database, "DB_SIZE_SNAPSHOTS") > 0
+
+
+def test_maintenance_thread_stops(tmp_path):
+    database = construct_database(tmp_path)
+    maintenance = DatabaseMaintenance(database, interval=3600)
+    maintenance.start()
+    maintenance.stop.set()
+    maintenance.join(5.0)
+    database.close()
+
+    assert not maintenance.is_alive()
+
+
+def read_history(database, reading_type, start, end, step=None, chunk_size=500):
+    return [item for chunk in database.iter_history(reading_type, start, end, step, chunk_size) for item in chunk]
+
+
+@pytest.mark.parametrize("schema_version", [1, 2])
+def test_raw_history(tmp_path, schema_version):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    write_bme_readings(database, 2)
+
+    # The range is inclusive of the start and exclusive of the end
+    history = read_history(database, "BME280", 1735689600 + 1200, 1735689600 + 3600)
+    database.close()
+
+    assert [
+        {"time_utc": "2025-01-01T00:20:00+00:00Z", "temperature_c": 1.0, "pressure_hpa": 1001.0, "humidity_pct": 50.0},
+        {"time_utc": "2025-01-01T00:40:00+00:00Z", "temperature_c": 2.0, "pressure_hpa": 1002.0, "humidity_pct": 50.0}
+    ] == history
+
+
+@pytest.mark.parametrize("chunk_size, expected", [
+    (1, [1, 1, 1, 1, 1, 1]),
+    (4, [4, 2]),
+    (500, [6])
+])
+def test_history_is_chunked(tmp_path, chunk_size, expected):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 2)
+    chunks = list(database.iter_history("BME280", 1735689600, 1735689600 + 7200, None, chunk_size))
+    database.close()
+
+    assert expected == [len(chunk) for chunk in chunks]
+
+
+@pytest.mark.parametrize("schema_version, step", [
+    (1, 1800),
+    (1, 3600),
+    (2, 1800),
+    (2, 7200)
+])
+def test_downsampled_history(tmp_path, schema_version, step):
+    database = construct_database(tmp_path, schema_version=schema_version)
+    write_bme_readings(database, 2)
+    history = read_history(database, "BME280", 1735689600, 1735689600 + 7200, step)
+    database.close()
+
+    # Readings are 20 minutes apart, with temperatures 0, 1, 2 ... 5
+    buckets = {}
+    for i in range(6):
+        buckets.setdefault(i * 1200 // step, []).append(float(i))
+    buckets = list(buckets.values())
+    assert len(buckets) == len(history)
+    for bucket, item in zip(buckets, history):
+        assert len(bucket) == item["count"]
+        assert pytest.approx(sum(bucket) / len(bucket)) == item["temperature_c"]
+        assert min(bucket) == item["temperature_c_min"]
+        assert max(bucket) == item["temperature_c_max"]
+    assert "2025-01-01T00:00:00+00:00Z" == history[0]["time_utc"]
+
+
+def test_coarse_history_uses_rollups(tmp_path):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 2)
+    with sqlite3.connect(database.db_path) as con:
+        con.execute("DELETE FROM BME280_READINGS;")
+
+    # With the raw readings gone, only the rollups can answer an hourly query
+    assert 2 == len(read_history(database, "BME280", 1735689600, 1735689600 + 7200, 3600))
+    assert 0 == len(read_history(database, "BME280", 1735689600, 1735689600 + 7200, 1200))
+    database.close()
+
+
+def test_rollup_history_includes_period_containing_start(tmp_path):
+    database = construct_database(tmp_path)
+    write_bme_readings(database, 2)
+    with sqlite3.connect(database.db_path) as con:
+        con.execute("DELETE FROM BME280_READINGS;")
+
+    # The start is part way through the first hour, whose rollup still covers it
+    history = read_history(database, "BME280", 1735689600 + 1200, 1735689600 + 7200, 3600)
+    database.close()
+
+    assert ["2025-01-01T00:00:00+00:00Z", "2025-01-01T01:00:00+00:00Z"] == [item["time_utc"] for item in history]
+    assert [3, 3] == [item["count"] for item in history]
+
+
+def test_write_voc_replay_replaces_previous_values(tmp_path):
+    database = construct_database(tmp_path)
+    database.write_voc_replay("sensirion", [(1000, 30000, 100), (1001, 30010, 101)])
+    database.write_voc_replay("calculator", [(1000, 30000, 90)])
+    database.write_voc_replay("sensirion", [(1001, 30010, 120)])
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        rows = con.execute("SELECT Algorithm, Timestamp, VOCIndex FROM SGP40_VOC_REPLAY ORDER BY Algorithm, Timestamp;").fetchall()
+    assert rows == [("calculator", 1000, 90), ("sensirion", 1000, 100), ("sensirion", 1001, 120)]
@@ -0,0 +1,58 @@
+import pytest
+import threading
+from service import EventBroadcaster
+
+
+def test_event_is_serialised_once_for_all_clients():
+    broadcaster = EventBroadcaster()
+    subscriptions = [broadcaster.subscribe() for _ in range(3)]
+    broadcaster.publish("bme", {"temperature_c": 21.5})
+
+    events = [s.get(0) for s in subscriptions]
+    assert b'event: bme\ndata: {"temperature_c":21.5}\n\n' == events[0]
+    assert all(event is events[0] for event in events)
+
+
+def test_no_event_within_timeout():
+    broadcaster = EventBroadcaster()
+    subscription = broadcaster.subscribe()
+
+    assert subscription.get(0.01) is None
+    assert not subscription.closed
+
+
+def test_slow_client_is_dropped():
+    broadcaster = EventBroadcaster(buffer_size=2)
+    slow = broadcaster.subscribe()
+    fast = broadcaster.subscribe()
+    for i in range(3):
+        broadcaster.publish("sgp", {"sraw": i})
+        fast.get(0)
+
+    assert slow.closed
+    assert not fast.closed
+    assert {"clients": 1, "published": 3, "dropped_clients": 1} == broadcaster.metrics
+
+
+def test_close_wakes_waiting_client():
+    broadcaster = EventBroadcaster()
+    subscription = broadcaster.subscribe()
+    results = []
+    thread = threading.Thread(target=lambda: results.append(subscription.get(5.0)))
+    thread.start()
+    broadcaster.close()
+    thread.join(1.0)
+
+    assert [None] == results
+    assert subscription.closed
+    assert broadcaster.subscribe().closed
+
+
+def test_unsubscribe():
+    broadcaster = EventBroadcaster()
+    subscription = broadcaster.subscribe()
+    broadcaster.unsubscribe(subscription)
+    broadcaster.publish("veml", None)
+
+    assert subscription.closed
+    assert 0 == broadcaster.metrics["clients"]
@@ -0,0 +1,68 @@
+import pytest
+from i2c import I2CMux, BusArbiter, I2CDevice, get_mux, bus_transaction
+from sensors import BME280
+from helpers import MockSMBus, MockI2CMsg, BME280_TRIMMING_PARAMETERS
+
+MUX_ADDRESS = 0x70
+
+
+class MuxRecordingBus(MockSMBus):
+    """
+    Mock bus that records writes to the mux control register
+    """
+
+    def __init__(self):
+        super().__init__(BME280_TRIMMING_PARAMETERS, [0] * 8, None)
+        self.mux_writes = []
+
+    def write_byte(self, addr, byte):
+        if addr == MUX_ADDRESS:
+            self.mux_writes.append(byte)
+
+
+def test_channel_is_only_written_when_it_changes():
+    bus = MuxRecordingBus()
+    mux = I2CMux()
+    mux.select(bus, MUX_ADDRESS, 1)
+    mux.select(bus, MUX_ADDRESS, 1)
+    mux.select(bus, MUX_ADDRESS, 2)
+    mux.select(bus, MUX_ADDRESS, 2)
+    assert bus.mux_writes == [0x02, 0x04]
+    assert mux.metrics == {"writes": 2, "writes_saved": 2, "invalidations": 0}
+
+
+def test_devices_not_behind_the_mux_are_ignored():
+    bus = MuxRecordingBus()
+    mux = I2CMux()
+    mux.select(bus, None, None)
+    assert not bus.mux_writes
+    assert mux.metrics["writes_saved"] == 0
+
+
+def test_mux_is_shared_per_bus():
+    bus = MuxRecordingBus()
+    assert get_mux(bus) is get_mux(bus)
+    assert get_mux(BusArbiter(bus)) is get_mux(bus)
+    assert get_mux(MuxRecordingBus()) is not get_mux(bus)
+
+
+def test_bus_error_invalidates_selection():
+    bus = MuxRecordingBus()
+    device = I2CDevice(bus, MockSMBus.VEML7700_ADDRESS, MUX_ADDRESS, 1, MockI2CMsg())
+    device.write_u16(0x00, 0x0000)
+
+    with pytest.raises(OSError):
+        with bus_transaction(bus):
+            raise OSError(121, "Remote I/O error")
+
+    device.write_u16(0x00, 0x0000)
+    assert bus.mux_writes == [0x02, 0x02]
+    assert get_mux(bus).metrics["invalidations"] == 1
+
+
+def test_bme280_selects_channel_once():
+    bus = MuxRecordingBus()
+    sensor = BME280(bus, MockSMBus.BME280_ADDRESS, MUX_ADDRESS, 1)
+    sensor.read()
+    assert bus.mux_writes == [0x02]
+    assert get_mux(bus).metrics["writes_saved"] > 0
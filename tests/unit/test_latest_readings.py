@@ -0,0 +1,26 @@
+import json
+from service.latest_readings import LatestReadings
+
+
+def test_body_is_built_once():
+    latest = LatestReadings()
+    latest.update_serialised({"bme": b'{"temperature_c":21.5}', "veml": b"null"})
+    body, etag = latest.get()
+
+    assert b'{"bme":{"temperature_c":21.5},"veml":null}' == body
+    assert {"bme": {"temperature_c": 21.5}, "veml": None} == json.loads(body)
+    assert etag.startswith('"') and etag.endswith('"')
+    assert latest.get()[0] is body
+
+
+def test_etag_follows_content():
+    latest = LatestReadings()
+    latest.update_serialised({"bme": b'{"temperature_c":21.5}'})
+    _, first = latest.get()
+    latest.update_serialised({"bme": b'{"temperature_c":21.5}'})
+    _, same = latest.get()
+    latest.update_serialised({"bme": b'{"temperature_c":21.6}'})
+    _, changed = latest.get()
+
+    assert first == same
+    assert first != changed
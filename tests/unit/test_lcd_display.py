@@ -1,35 +1,36 @@
 from helpers import MockLCD, MockSampler
 from service import LCDDisplay
+from service.readings import BME280Reading, VEML7700Reading, SGP40Reading
 from pprint import pprint as pp
 
 DEGREE = chr(223)
 
-BME_READINGS = {
-    "humidity_pct": 44.69,
-    "pressure_hpa": 1008.93,
-    "temperature_c": 18,
-    "time_utc": "2025-12-19T09:28:19+00:00Z"
-}
-
-VEML_READINGS = {
-    "als": 35434,
-    "gain": 2,
-    "illuminance_lux": 255.12,
-    "integration_time_ms": 400,
-    "saturated": False,
-    "time_utc": "2025-12-19T09:50:07+00:00Z",
-    "white": 65535
-}
-
-SGP_READINGS = {
-    "humidity_pc": 42.63,
-    "sraw": 31940,
-    "temperature_c": 19.01,
-    "time_utc": "2025-12-19T09:52:26+00:00Z",
-    "voc_index": 33,
-    "voc_label": "Excellent",
-    "voc_rating": "*****"
-}
+BME_READINGS = BME280Reading(
+    humidity_pct=44.69,
+    pressure_hpa=1008.93,
+    temperature_c=18,
+    time_utc="2025-12-19T09:28:19+00:00Z"
+)
+
+VEML_READINGS = VEML7700Reading(
+    als=35434,
+    gain=2,
+    illuminance_lux=255.12,
+    integration_time_ms=400,
+    saturated=False,
+    time_utc="2025-12-19T09:50:07+00:00Z",
+    white=65535
+)
+
+SGP_READINGS = SGP40Reading(
+    humidity_pc=42.63,
+    sraw=31940,
+    temperature_c=19.01,
+    time_utc="2025-12-19T09:52:26+00:00Z",
+    voc_index=33,
+    voc_label="Excellent",
+    voc_rating="*****"
+)
 
 def _confirm_valid_timestamp(timestamp):
     tokens = timestamp.split(":")
@@ -51,7 +52,7 @@ def _confirm_displayed_output(lcd, values, member, label, units):
 
     line, text = lcd.output[1]
     assert 2 == line
-    assert f"{label} = {values[member]}{units}" == text
+    assert f"{label} = {getattr(values, member)}{units}" == text
 
 
 def test_display_readings():
@@ -0,0 +1,47 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler
+from service import PooledHTTPServer
+
+
+class BlockingHandler(BaseHTTPRequestHandler):
+    release = threading.Event()
+
+    def do_GET(self):
+        self.release.wait(5.0)
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+def test_connections_beyond_the_queue_are_refused():
+    server = PooledHTTPServer(("127.0.0.1", 0), BlockingHandler, workers=1, queue_size=1)
+    BlockingHandler.release.clear()
+    clients = []
+    try:
+        # The first connection occupies the only worker and the second fills the queue
+        for _ in range(2):
+            client = socket.create_connection(server.server_address, timeout=5)
+            client.sendall(b"GET / HTTP/1.0\r\n\r\n")
+            server.handle_request()
+            clients.append(client)
+            while not server.metrics["active_connections"]:
+                threading.Event().wait(0.01)
+
+        # The third is refused without waiting for a worker
+        client = socket.create_connection(server.server_address, timeout=5)
+        server.handle_request()
+        clients.append(client)
+        assert client.recv(1024).startswith(b"HTTP/1.1 503")
+
+        BlockingHandler.release.set()
+        assert clients[0].recv(1024).startswith(b"HTTP/1.0 204")
+        assert clients[1].recv(1024).startswith(b"HTTP/1.0 204")
+        assert {"accepted": 2, "rejected": 1} == {k: server.metrics[k] for k in ["accepted", "rejected"]}
+    finally:
+        BlockingHandler.release.set()
+        for client in clients:
+            client.close()
+        server.server_close()
@@ -0,0 +1,97 @@
+import threading
+import pytest
+from service.reading_buffer import ReadingBuffer
+from db.database import iso_timestamp
+
+FIELDS = [("value", "d", float), ("count", "l", int), ("flag", "b", bool)]
+
+
+def test_empty_buffer():
+    buffer = ReadingBuffer(3, FIELDS)
+    assert [] == buffer.snapshot()
+    assert 0 == len(buffer)
+
+
+def test_readings_are_returned_oldest_first():
+    buffer = ReadingBuffer(3, FIELDS)
+    buffer.append(1000, (1.5, 1, True))
+    buffer.append(1001, (2.5, 2, False))
+
+    assert [
+        {"time_utc": iso_timestamp(1000), "value": 1.5, "count": 1, "flag": True},
+        {"time_utc": iso_timestamp(1001), "value": 2.5, "count": 2, "flag": False}
+    ] == buffer.snapshot()
+
+
+def test_oldest_readings_are_overwritten():
+    buffer = ReadingBuffer(3, FIELDS)
+    for i in range(7):
+        buffer.append(1000 + i, (i, i, False))
+
+    assert 3 == len(buffer)
+    assert [4, 5, 6] == [reading["count"] for reading in buffer.snapshot()]
+
+
+def test_snapshot_since():
+    buffer = ReadingBuffer(4, FIELDS)
+    for i in range(6):
+        buffer.append(1000 + i * 10, (i, i, False))
+
+    assert [4, 5] == [reading["count"] for reading in buffer.snapshot(1035)]
+    assert [3, 4, 5] == [reading["count"] for reading in buffer.snapshot(1030)]
+    assert [] == buffer.snapshot(2000)
+
+
+def test_missing_values_are_none():
+    buffer = ReadingBuffer(2, FIELDS)
+    buffer.append(1000, (None, 1, False))
+    assert buffer.snapshot()[0]["value"] is None
+
+
+def test_missing_integer_and_boolean_values_are_none():
+    buffer = ReadingBuffer(2, FIELDS)
+    buffer.append(1000, (1.5, None, None))
+    buffer.append(1001, (2.5, 2, True))
+
+    assert [
+        {"time_utc": iso_timestamp(1000), "value": 1.5, "count": None, "flag": None},
+        {"time_utc": iso_timestamp(1001), "value": 2.5, "count": 2, "flag": True}
+    ] == buffer.snapshot()
+
+
+def test_overwritten_missing_value_is_reported():
+    buffer = ReadingBuffer(1, FIELDS)
+    buffer.append(1000, (1.5, None, False))
+    buffer.append(1001, (2.5, 3, False))
+    buffer.append(1002, (3.5, None, False))
+    assert buffer.snapshot()[0]["count"] is None
+
+
+def test_invalid_capacity():
+    with pytest.raises(ValueError):
+        ReadingBuffer(0, FIELDS)
+
+
+def test_snapshots_are_consistent_while_writing():
+    # Each reading has the same value in every field, so a snapshot taken part way through a write
+    # would show up as a reading with mismatched fields
+    buffer = ReadingBuffer(50, [("a", "l", int), ("b", "l", int)])
+    stop = threading.Event()
+
+    def write():
+        i = 0
+        while not stop.is_set():
+            buffer.append(i, (i, i))
+            i += 1
+
+    writer = threading.Thread(target=write, daemon=True)
+    writer.start()
+    try:
+        for _ in range(200):
+            readings = buffer.snapshot()
+            assert all(reading["a"] == reading["b"] for reading in readings)
+            counts = [reading["a"] for reading in readings]
+            assert counts == sorted(counts)
+    finally:
+        stop.set()
+        writer.join()
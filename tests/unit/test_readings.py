@@ -0,0 +1,33 @@
+import json
+import pytest
+from service.readings import BME280Reading, SGP40Reading, as_dict, to_json_bytes
+
+BME_READING = BME280Reading(time_utc="2025-12-19T09:28:19+00:00Z", temperature_c=18.2, pressure_hpa=1008.93,
+                            humidity_pct=44.69)
+
+
+def test_reading_is_immutable():
+    with pytest.raises(AttributeError):
+        BME_READING.temperature_c = 19.0
+
+
+def test_as_dict():
+    assert {
+        "time_utc": "2025-12-19T09:28:19+00:00Z",
+        "temperature_c": 18.2,
+        "pressure_hpa": 1008.93,
+        "humidity_pct": 44.69
+    } == as_dict(BME_READING)
+
+
+def test_as_dict_passes_through_other_values():
+    other = {"temperature_c": 18.2}
+    assert other is as_dict(other)
+    assert as_dict(None) is None
+
+
+def test_to_json_bytes():
+    reading = SGP40Reading(time_utc="2025-12-19T09:52:26+00:00Z", sraw=31940, voc_index=None, voc_label=None,
+                           voc_rating=None, temperature_c=19.01, humidity_pc=42.63)
+    assert reading._asdict() == json.loads(to_json_bytes(reading))
+    assert b"null" == to_json_bytes(None)
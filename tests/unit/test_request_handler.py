@@ -0,0 +1,259 @@
+import pytest
+import json
+import threading
+import http.client
+from registry import DeviceType
+from service import RequestHandler, PooledHTTPServer
+from helpers import MockSampler
+
+HISTORY_CHUNKS = [
+    [{"time_utc": "2025-01-01T00:00:00+00:00Z", "temperature_c": 18.5}],
+    [{"time_utc": "2025-01-01T00:20:00+00:00Z", "temperature_c": 18.7}, {"time_utc": "2025-01-01T00:40:00+00:00Z", "temperature_c": 18.9}]
+]
+
+
+@pytest.fixture
+def server():
+    server = PooledHTTPServer(("127.0.0.1", 0), RequestHandler, workers=4, queue_size=4)
+    thread = threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+def get(server, path):
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.request("GET", path)
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+    return response, body
+
+
+def test_latest_readings(server):
+    RequestHandler.sampler = MockSampler([{"temperature_c": 18.5}], None, None)
+    response, body = get(server, "/api/bme/latest")
+
+    assert 200 == response.status
+    assert {"temperature_c": 18.5} == json.loads(body)
+
+
+def test_unknown_route(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, _ = get(server, "/api/missing")
+
+    assert 404 == response.status
+
+
+@pytest.mark.parametrize("path, device", [
+    ("/api/bme/history", DeviceType.BME280),
+    ("/api/veml/history", DeviceType.VEML7700),
+    ("/api/sgp/history", DeviceType.SGP40)
+])
+def test_history_is_streamed(server, path, device):
+    RequestHandler.sampler = MockSampler(None, None, None, HISTORY_CHUNKS)
+    response, body = get(server, f"{path}?from=1735689600&to=1735693200")
+
+    assert 200 == response.status
+    assert "chunked" == response.getheader("Transfer-Encoding")
+    assert [item for chunk in HISTORY_CHUNKS for item in chunk] == json.loads(body)
+    assert (device, 1735689600, 1735693200, None) == RequestHandler.sampler.history_request
+
+
+def test_empty_history(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, body = get(server, "/api/bme/history")
+
+    assert 200 == response.status
+    assert [] == json.loads(body)
+
+    # The range defaults to the last day
+    _, start, end, _ = RequestHandler.sampler.history_request
+    assert 86400 == end - start
+
+
+@pytest.mark.parametrize("query, start, end, step", [
+    ("from=2025-01-01T00:00:00Z&to=2025-01-02T00:00:00Z", 1735689600, 1735776000, None),
+    ("from=2025-01-01T00:00:00&to=1735776000&step=300", 1735689600, 1735776000, 300),
+    ("from=1735689600&to=1735776000&step=15m", 1735689600, 1735776000, 900),
+    ("from=1735689600&to=1735776000&step=1h", 1735689600, 1735776000, 3600),
+    ("from=1735689600&to=1735776000&step=1d", 1735689600, 1735776000, 86400)
+])
+def test_history_parameters(server, query, start, end, step):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, _ = get(server, f"/api/bme/history?{query}")
+
+    assert 200 == response.status
+    assert (DeviceType.BME280, start, end, step) == RequestHandler.sampler.history_request
+
+
+@pytest.mark.parametrize("query", [
+    "from=yesterday",
+    "from=1735689600&to=1735689600",
+    "step=0",
+    "step=1w"
+])
+def test_invalid_history_parameters(server, query):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, _ = get(server, f"/api/bme/history?{query}")
+
+    assert 400 == response.status
+    assert RequestHandler.sampler.history_request is None
+
+
+def test_event_stream(server):
+    RequestHandler.sampler = MockSampler([{"temperature_c": 18.5}], None, None)
+    RequestHandler.heartbeat_interval = 0.05
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.request("GET", "/api/events")
+    response = connection.getresponse()
+
+    # The latest readings are sent on connection, followed by a heartbeat as nothing is published
+    expected = [
+        b'event: bme\ndata: {"temperature_c":18.5}\n\n',
+        b"event: veml\ndata: null\n\n",
+        b"event: sgp\ndata: null\n\n",
+        b": keepalive\n\n"
+    ]
+    assert "text/event-stream" == response.getheader("Content-Type")
+    assert expected == [response.read(len(event)) for event in expected]
+
+    # Published events follow. Closing the broadcaster ends the response
+    RequestHandler.sampler.broadcaster.publish("sgp", {"sraw": 30000})
+    RequestHandler.sampler.broadcaster.close()
+    remainder = response.read()
+    connection.close()
+
+    assert b'event: sgp\ndata: {"sraw":30000}\n\n' == remainder.replace(b": keepalive\n\n", b"")
+    assert 0 == RequestHandler.sampler.broadcaster.metrics["clients"]
+
+
+def test_combined_latest_readings(server):
+    RequestHandler.sampler = MockSampler([{"temperature_c": 18.5}], None, None)
+    response, body = get(server, "/api/latest")
+    etag = response.getheader("ETag")
+
+    assert 200 == response.status
+    assert {"bme": {"temperature_c": 18.5}} == json.loads(body)
+    assert RequestHandler.sampler.get_latest() == (body, etag)
+
+
+def test_combined_latest_readings_not_modified(server):
+    RequestHandler.sampler = MockSampler([{"temperature_c": 18.5}], None, None)
+    response, _ = get(server, "/api/latest")
+    etag = response.getheader("ETag")
+
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.request("GET", "/api/latest", headers={"If-None-Match": etag})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+
+    assert 304 == response.status
+    assert b"" == body
+    assert etag == response.getheader("ETag")
+
+    # Once the readings change, the ETag no longer matches
+    RequestHandler.sampler.latest_readings.update_serialised({"bme": b'{"temperature_c":19.0}'})
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.request("GET", "/api/latest", headers={"If-None-Match": etag})
+    response = connection.getresponse()
+    body = response.read()
+    connection.close()
+
+    assert 200 == response.status
+    assert {"bme": {"temperature_c": 19.0}} == json.loads(body)
+
+
+def test_persistent_connection(server):
+    RequestHandler.sampler = MockSampler([{"temperature_c": 18.5}], None, None, HISTORY_CHUNKS)
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    statuses = []
+    for path in ["/api/health", "/api/latest", "/api/bme/history", "/api/missing", "/api/bme/latest"]:
+        connection.request("GET", path)
+        response = connection.getresponse()
+        response.read()
+        statuses.append(response.status)
+    connection.close()
+
+    # All the requests were served on one connection
+    assert [200, 200, 200, 404, 200] == statuses
+    assert 1 == server.metrics["accepted"]
+
+
+def test_put_body_is_discarded_on_persistent_connection(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.request("PUT", "/api/lcd/on", body=b'{"ignored": true}')
+    put_response = connection.getresponse()
+    put_response.read()
+
+    # The body mustn't be mistaken for the next request on the connection
+    connection.request("GET", "/api/health")
+    get_response = connection.getresponse()
+    get_response.read()
+    connection.close()
+
+    assert 200 == put_response.status
+    assert 200 == get_response.status
+    assert 1 == server.metrics["accepted"]
+
+
+def test_idle_connection_is_closed(server, monkeypatch):
+    monkeypatch.setattr(RequestHandler, "timeout", 0.1)
+    RequestHandler.sampler = MockSampler(None, None, None)
+    connection = http.client.HTTPConnection("127.0.0.1", server.server_address[1], timeout=5)
+    connection.request("GET", "/api/health")
+    connection.getresponse().read()
+
+    # Once the idle timeout has passed, the server closes the connection
+    assert b"" == connection.sock.recv(1)
+    connection.close()
+
+
+def test_too_many_event_clients(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    RequestHandler.sampler.broadcaster.max_clients = 1
+    RequestHandler.sampler.subscribe()
+    response, _ = get(server, "/api/events")
+
+    assert 503 == response.status
+
+
+def test_metrics_include_http_server(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, body = get(server, "/api/metrics")
+
+    assert 200 == response.status
+    assert 4 == json.loads(body)["http"]["workers"]
+
+
+@pytest.mark.parametrize("path, device", [
+    ("/api/bme/recent", DeviceType.BME280),
+    ("/api/veml/recent", DeviceType.VEML7700),
+    ("/api/sgp/recent", DeviceType.SGP40)
+])
+def test_recent_readings(server, path, device):
+    RequestHandler.sampler = MockSampler(None, None, None, HISTORY_CHUNKS)
+    response, body = get(server, path)
+
+    assert 200 == response.status
+    assert [item for chunk in HISTORY_CHUNKS for item in chunk] == json.loads(body)
+    assert (device, None) == RequestHandler.sampler.recent_request
+
+
+def test_recent_readings_since(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, _ = get(server, "/api/sgp/recent?from=2025-01-01T00:00:00Z")
+
+    assert 200 == response.status
+    assert (DeviceType.SGP40, 1735689600) == RequestHandler.sampler.recent_request
+
+
+def test_invalid_recent_readings_parameters(server):
+    RequestHandler.sampler = MockSampler(None, None, None)
+    response, _ = get(server, "/api/bme/recent?from=yesterday")
+
+    assert 400 == response.status
+    assert RequestHandler.sampler.recent_request is None
@@ -0,0 +1,53 @@
+import json
+from registry import AppSettings, DeviceFactory, DeviceType
+from service import Sampler
+from helpers import MockSMBus, BME280_TRIMMING_PARAMETERS, MockDatabase
+
+ROOM_STANDARD_BLOCK = [85, 28, 112, 125, 93, 240, 142, 35]
+
+
+def construct_sampler():
+    settings = AppSettings(AppSettings.default_settings_file())
+    bus = MockSMBus(BME280_TRIMMING_PARAMETERS, ROOM_STANDARD_BLOCK, None)
+    sensor = DeviceFactory(bus, None, None, settings).create_device(DeviceType.BME280)
+    devices = {device_type: {"device": None, "enabled": True} for device_type in [DeviceType.VEML7700, DeviceType.SGP40, DeviceType.LCD]}
+    devices[DeviceType.BME280] = {"device": sensor, "enabled": True}
+    return Sampler(devices, MockDatabase(), 60, 5)
+
+
+def test_latest_readings_reuse_the_published_event():
+    sampler = construct_sampler()
+    published = []
+    sampler.broadcaster.add_listener(lambda event, data, body: published.append(body))
+    sampler.bme280_sampler.sample_and_store()
+
+    # The reading serialised for the event stream is the one that's served
+    assert [sampler.get_latest_body("bme")] == published
+    assert sampler.get_latest_body("bme") is published[0]
+    body, _ = sampler.get_latest()
+    assert sampler.get_latest_bme()._asdict() == json.loads(body)["bme"]
+
+
+def test_latest_readings_etag_ignores_status_metrics():
+    sampler = construct_sampler()
+    sampler.bme280_sampler.sample_and_store()
+    body, etag = sampler.get_latest()
+
+    # The device states are included but the metrics in the full status, which change every sample, aren't
+    assert {"enabled": True, "available": True} == json.loads(body)["status"]["BME280"]
+    sampler.bme280_sampler.sensor.measurements += 1
+    sampler.broadcaster.publish("bme", sampler.get_latest_bme())
+    assert (body, etag) == sampler.get_latest()
+
+
+def test_latest_readings_follow_disable():
+    sampler = construct_sampler()
+    sampler.bme280_sampler.sample_and_store()
+    reading = sampler.get_latest_bme()
+    sampler.disable_device(DeviceType.BME280)
+
+    # An event published before the sensor was disabled doesn't bring its reading back
+    sampler.broadcaster.publish("bme", reading)
+    body, _ = sampler.get_latest()
+    assert b"null" == sampler.get_latest_body("bme")
+    assert {"enabled": False, "available": True} == json.loads(body)["status"]["BME280"]
@@ -0,0 +1,161 @@
+import pytest
+import threading
+from service import Scheduler, SchedulePolicy, FollowUp
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def construct_scheduler(policy=SchedulePolicy.SKIP, max_catch_up=5):
+    clock = FakeClock()
+    return Scheduler(policy, max_catch_up, clock), clock
+
+
+def test_tasks_run_at_their_own_cadence():
+    scheduler, clock = construct_scheduler()
+    runs = []
+    scheduler.add("fast", 1, lambda: runs.append(("fast", clock.now)))
+    scheduler.add("slow", 3, lambda: runs.append(("slow", clock.now)))
+
+    for _ in range(6):
+        clock.now += scheduler.run_pending()
+
+    assert [
+        ("fast", 1000.0), ("slow", 1000.0), ("fast", 1001.0), ("fast", 1002.0),
+        ("fast", 1003.0), ("slow", 1003.0), ("fast", 1004.0), ("fast", 1005.0)
+    ] == runs
+
+
+def test_deadlines_do_not_drift():
+    scheduler, clock = construct_scheduler()
+    starts = []
+
+    def work():
+        # Each run takes 0.25 s, which would accumulate as drift if the next run were timed from the end
+        starts.append(clock.now)
+        clock.now += 0.25
+
+    scheduler.add("task", 1, work)
+    for _ in range(5):
+        delay = scheduler.run_pending()
+        clock.now += delay
+
+    assert [1000.0, 1001.0, 1002.0, 1003.0, 1004.0] == starts
+    assert 0 == scheduler.metrics["tasks"]["task"]["overruns"]
+
+
+def test_lateness_is_recorded():
+    scheduler, clock = construct_scheduler()
+    scheduler.add("task", 1, lambda: None)
+    scheduler.run_pending()
+    clock.now += 1.25
+    scheduler.run_pending()
+    metrics = scheduler.metrics["tasks"]["task"]
+
+    assert 2 == metrics["runs"]
+    assert 250.0 == metrics["last_lateness_ms"]
+    assert 250.0 == metrics["max_lateness_ms"]
+    assert 125.0 == metrics["mean_lateness_ms"]
+
+
+@pytest.mark.parametrize("policy, max_catch_up, expected_runs, expected_skipped", [
+    (SchedulePolicy.SKIP, 5, 1, 3),
+    (SchedulePolicy.CATCH_UP, 5, 4, 0),
+    (SchedulePolicy.CATCH_UP, 2, 3, 1)
+])
+def test_overrun_policy(policy, max_catch_up, expected_runs, expected_skipped):
+    scheduler, clock = construct_scheduler(policy, max_catch_up)
+    durations = [3.5]
+    runs = []
+
+    def work():
+        # The first run overruns by three and a half intervals
+        runs.append(clock.now)
+        clock.now += durations.pop() if durations else 0.0
+
+    scheduler.add("task", 1, work)
+    delay = scheduler.run_pending()
+    metrics = scheduler.metrics["tasks"]["task"]
+
+    # Skipped runs resume on the next whole interval, while caught up runs happen immediately
+    assert expected_runs == len(runs)
+    assert expected_skipped == metrics["skipped"]
+    assert 1 == metrics["overruns"]
+    assert pytest.approx(0.5) == delay
+
+
+def test_errors_do_not_stop_other_tasks():
+    scheduler, clock = construct_scheduler()
+    runs = []
+    scheduler.add("failing", 1, lambda: 1 / 0)
+    scheduler.add("working", 1, lambda: runs.append(clock.now))
+    scheduler.run_pending()
+
+    assert [1000.0] == runs
+    assert 1 == scheduler.metrics["tasks"]["failing"]["runs"]
+
+
+def test_invalid_interval():
+    scheduler, _ = construct_scheduler()
+    with pytest.raises(ValueError):
+        scheduler.add("task", 0, lambda: None)
+
+
+def test_run_until_stopped():
+    scheduler = Scheduler()
+    stop = threading.Event()
+    runs = []
+
+    def work():
+        runs.append(1)
+        if len(runs) == 3:
+            stop.set()
+
+    scheduler.add("task", 0.01, work)
+    thread = threading.Thread(target=scheduler.run, args=(stop,))
+    thread.start()
+    thread.join(5.0)
+
+    assert not thread.is_alive()
+    assert 3 == len(runs)
+
+
+def test_follow_up_runs_at_requested_deadline():
+    scheduler, clock = construct_scheduler()
+    runs = []
+
+    def sample():
+        # The first run asks to be called again in 0.25 s, e.g. when a sensor's been reconfigured
+        runs.append(clock.now)
+        return FollowUp(clock.now + 0.25) if len(runs) == 1 else None
+
+    scheduler.add("task", 1, sample)
+    for _ in range(3):
+        clock.now += scheduler.run_pending()
+
+    metrics = scheduler.metrics["tasks"]["task"]
+    assert [1000.0, 1000.25, 1001.0] == runs
+    assert 1 == metrics["follow_ups"]
+    assert 2 == metrics["runs"]
+
+
+def test_other_return_values_are_not_follow_ups():
+    scheduler, clock = construct_scheduler()
+    runs = []
+
+    def sample():
+        # Returning a value, e.g. a reading, doesn't cause the task to run again early
+        runs.append(clock.now)
+        return clock.now + 0.25
+
+    scheduler.add("task", 1, sample)
+    for _ in range(2):
+        clock.now += scheduler.run_pending()
+
+    assert [1000.0, 1001.0] == runs
+    assert 0 == scheduler.metrics["tasks"]["task"]["follow_ups"]
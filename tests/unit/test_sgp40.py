@@ -1,5 +1,9 @@
+import json
+import time
 import pytest
-from sensors import SGP40
+from sensors import SGP40, VOCStateCheckpoint
+from sensors.sgp40 import crc8_sgp40, VOC_LEARNING_PERIOD
+from experimental.voc_index_calculator import VOCIndexCalculator
 from i2c import I2CDevice
 from helpers import MockSMBus, MockI2CMsg, MockVOCAlgorithm
 
@@ -179,3 +183,154 @@ def test_classify_voc_index_ranges(voc_index, expected_label, expected_rating):
     label, rating = wrapper._classify_voc_index(voc_index)
     assert label == expected_label
     assert rating == expected_rating
+
+
+def crc8_bitwise(two_bytes):
+    crc = 0xFF
+    for b in two_bytes:
+        crc ^= b
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x31) & 0xFF if crc & 0x80 else (crc << 1) & 0xFF
+    return crc
+
+
+def test_crc8_table_matches_bitwise_crc():
+    wrapper, _ = construct_wrapper()
+    for msb in range(256):
+        for lsb in range(0, 256, 7):
+            assert wrapper._crc8_sgp40(bytes([msb, lsb])) == crc8_bitwise(bytes([msb, lsb]))
+
+
+def test_build_command_is_cached_per_tick_pair():
+    wrapper, _ = construct_wrapper()
+    cmd = wrapper._build_command(humidity=50.0, temperature=25.0)
+
+    # Values that round to the same ticks reuse the same frame
+    assert wrapper._build_command(humidity=50.0001, temperature=25.0001) is cmd
+    assert wrapper._build_command(humidity=51.0, temperature=25.0) != cmd
+
+
+def read_bytes_for(sraw):
+    raw = bytes([(sraw >> 8) & 0xFF, sraw & 0xFF])
+    return raw + bytes([crc8_sgp40(raw)])
+
+
+def construct_checkpointed_wrapper(checkpoint, voc_algorithm, checkpoint_interval=60):
+    bus = MockSMBus(None, None, read_bytes_for(0x1234))
+    i2c_dev = I2CDevice(bus, MockSMBus.SGP40_ADDRESS, None, None, MockI2CMsg())
+    return SGP40(i2c_dev, voc_algorithm, measurement_delay=0.0, checkpoint=checkpoint, checkpoint_interval=checkpoint_interval)
+
+
+def test_voc_state_starts_cold_without_checkpoint(tmp_path):
+    checkpoint = VOCStateCheckpoint(tmp_path / "voc.json")
+    wrapper = construct_checkpointed_wrapper(checkpoint, MockVOCAlgorithm(100))
+    status = wrapper.voc_state_status()
+
+    assert status["state"] == "cold"
+    assert status["restored"] is False
+    assert status["checkpoint_age"] is None
+    assert 0 < status["learning_remaining"] <= VOC_LEARNING_PERIOD
+
+
+def test_cold_voc_state_is_not_checkpointed(tmp_path):
+    checkpoint = VOCStateCheckpoint(tmp_path / "voc.json")
+    wrapper = construct_checkpointed_wrapper(checkpoint, MockVOCAlgorithm(100), checkpoint_interval=0)
+    wrapper.read()
+    wrapper.save_voc_state()
+    assert not (tmp_path / "voc.json").exists()
+
+
+def test_warm_voc_state_is_checkpointed_and_restored(tmp_path):
+    checkpoint = VOCStateCheckpoint(tmp_path / "voc.json")
+    wrapper = construct_checkpointed_wrapper(checkpoint, MockVOCAlgorithm(100, (123.5, 45.25)), checkpoint_interval=0)
+
+    # Pretend the learning period has passed, then read, which writes the checkpoint
+    wrapper.cold_start -= VOC_LEARNING_PERIOD
+    wrapper.read()
+    assert wrapper.voc_state_status()["state"] == "warm"
+    assert checkpoint.age is not None
+
+    # A new instance picks up the states and is warm straight away
+    voc_algorithm = MockVOCAlgorithm(100)
+    restarted = construct_checkpointed_wrapper(VOCStateCheckpoint(tmp_path / "voc.json"), voc_algorithm)
+    status = restarted.voc_state_status()
+    assert voc_algorithm.states == (123.5, 45.25)
+    assert status["state"] == "warm"
+    assert status["restored"] is True
+    assert status["learning_remaining"] == 0
+    assert status["checkpoint_age"] is not None
+
+
+def test_checkpoints_are_written_at_the_checkpoint_interval(tmp_path):
+    checkpoint = VOCStateCheckpoint(tmp_path / "voc.json")
+    wrapper = construct_checkpointed_wrapper(checkpoint, MockVOCAlgorithm(100), checkpoint_interval=60)
+    wrapper.cold_start -= VOC_LEARNING_PERIOD
+
+    # Not due yet
+    wrapper.read()
+    assert checkpoint.saved_at is None
+
+    # Due
+    wrapper.next_checkpoint = time.monotonic()
+    wrapper.i2c_device.bus.queue_data.append(read_bytes_for(0x1234))
+    wrapper.read()
+    assert checkpoint.saved_at is not None
+    assert wrapper.next_checkpoint > time.monotonic() + 50
+
+
+def test_stale_voc_checkpoint_is_ignored(tmp_path):
+    checkpoint_file = tmp_path / "voc.json"
+    checkpoint_file.write_text(json.dumps({"saved_at": time.time() - 601, "algorithm": "MockVOCAlgorithm", "states": [1.0, 2.0]}))
+    voc_algorithm = MockVOCAlgorithm(100)
+    wrapper = construct_checkpointed_wrapper(VOCStateCheckpoint(checkpoint_file, max_age=600), voc_algorithm)
+
+    assert voc_algorithm.states == (0.0, 0.0)
+    assert wrapper.voc_state_status()["state"] == "cold"
+    assert wrapper.voc_state_status()["checkpoint_age"] >= 601
+
+
+@pytest.mark.parametrize("content", [
+    "not json",
+    json.dumps({"saved_at": 0}),
+    json.dumps({"saved_at": time.time(), "algorithm": "VocAlgorithm", "states": [1.0, 2.0]})
+])
+def test_invalid_voc_checkpoint_is_ignored(tmp_path, content):
+    checkpoint_file = tmp_path / "voc.json"
+    checkpoint_file.write_text(content)
+    assert VOCStateCheckpoint(checkpoint_file).load("MockVOCAlgorithm") is None
+
+
+def test_voc_index_calculator_state_round_trip(tmp_path):
+    calculator = VOCIndexCalculator()
+    for sraw in [30000, 30100, 29900]:
+        calculator.update(sraw)
+
+    checkpoint = VOCStateCheckpoint(tmp_path / "voc.json")
+    checkpoint.save("VOCIndexCalculator", calculator.get_states())
+
+    restored = VOCIndexCalculator()
+    restored.set_states(*checkpoint.load("VOCIndexCalculator"))
+    assert restored.state == calculator.state
+    assert restored.update(30050) == calculator.update(30050)
+
+
+def test_voc_index_calculator_is_checkpointed_by_sgp40(tmp_path):
+    checkpoint = VOCStateCheckpoint(tmp_path / "voc.json")
+    wrapper = construct_checkpointed_wrapper(checkpoint, VOCIndexCalculator(), checkpoint_interval=0)
+    wrapper.cold_start -= VOC_LEARNING_PERIOD
+    wrapper.read()
+    for sraw in [0x1300, 0x1250]:
+        wrapper.i2c_device.bus.queue_data.append(read_bytes_for(sraw))
+        wrapper.read()
+    assert checkpoint.saved_at is not None
+
+    # A restarted wrapper restores the calculator state and produces the same index as the original
+    restarted = construct_checkpointed_wrapper(VOCStateCheckpoint(tmp_path / "voc.json"), VOCIndexCalculator())
+    assert restarted.voc_state_status()["restored"] is True
+    wrapper.i2c_device.bus.queue_data.append(read_bytes_for(0x2000))
+    restarted.i2c_device.bus.queue_data = [read_bytes_for(0x2000)]
+    reading = restarted.read()
+    assert reading == wrapper.read()
+
+    # A cold calculator would report the neutral index of 100 for its first reading
+    assert reading[1] != 100
@@ -1,6 +1,8 @@
 import pytest
 from registry import AppSettings, DeviceFactory, DeviceType
 from service import SGP40Sampler, BME280Sampler
+from sensors import SRAWCapture
+from sensors.sraw_capture import find_capture_files, read_capture
 from helpers import MockSMBus, MockI2CMsg, MockVOCAlgorithm, MockDatabase
 
 def _crc8_sgp40(two_bytes: bytes) -> int:
@@ -19,7 +21,7 @@ def _crc8_sgp40(two_bytes: bytes) -> int:
     return crc
 
 
-def construct_sampler(voc_algorithm, data, enabled):
+def construct_sampler(voc_algorithm, data, enabled, capture=None):
     settings = AppSettings(AppSettings.default_settings_file())
     bus = MockSMBus(None, None, data)
     i2c_msg = MockI2CMsg()
@@ -27,7 +29,7 @@ def construct_sampler(voc_algorithm, data, enabled):
     sensor = factory.create_device(DeviceType.SGP40)
     database = MockDatabase()
     bme_sampler = BME280Sampler(None, False, database)
-    return SGP40Sampler(sensor, enabled, bme_sampler, database)
+    return SGP40Sampler(sensor, enabled, bme_sampler, database, capture=capture)
 
 
 def test_sgp40_sampler_without_voc_algorithm():
@@ -42,10 +44,10 @@ def test_sgp40_sampler_without_voc_algorithm():
 
     assert True == sampler.is_enabled
     assert True == sampler.is_available
-    assert readings["sraw"] == sraw
-    assert readings["voc_index"] is None
-    assert readings["voc_label"] is None
-    assert readings["voc_rating"] is None
+    assert readings.sraw == sraw
+    assert readings.voc_index is None
+    assert readings.voc_label is None
+    assert readings.voc_rating is None
 
 
 @pytest.mark.parametrize(
@@ -68,10 +70,10 @@ def test_sgp40_sampler_with_voc_algorithm(voc_index, expected_label, expected_ra
 
     assert True == sampler.is_enabled
     assert True == sampler.is_available
-    assert readings["sraw"] == sraw
-    assert readings["voc_index"] == voc_index
-    assert readings["voc_label"] == expected_label
-    assert readings["voc_rating"] == expected_rating
+    assert readings.sraw == sraw
+    assert readings.voc_index == voc_index
+    assert readings.voc_label == expected_label
+    assert readings.voc_rating == expected_rating
 
 
 def test_sgp40_sampler_enable_after_start():
@@ -92,10 +94,10 @@ def test_sgp40_sampler_enable_after_start():
     readings = sampler.latest
 
     assert True == sampler.is_enabled
-    assert readings["sraw"] == sraw
-    assert readings["voc_index"] is None
-    assert readings["voc_label"] is None
-    assert readings["voc_rating"] is None
+    assert readings.sraw == sraw
+    assert readings.voc_index is None
+    assert readings.voc_label is None
+    assert readings.voc_rating is None
 
 
 def test_sgp40_sampler_disabled_on_start():
@@ -112,3 +114,20 @@ def test_sgp40_sampler_with_no_sensor():
     sampler = SGP40Sampler(None, True, None, MockDatabase())
     assert False == sampler.is_enabled
     assert False == sampler.is_available
+
+
+def test_sgp40_sampler_captures_sraw(tmp_path):
+    sraw = 0x2222
+    msb = (sraw >> 8) & 0xFF
+    lsb = sraw & 0xFF
+    crc = _crc8_sgp40(bytes([msb, lsb]))
+
+    capture = SRAWCapture(tmp_path)
+    sampler = construct_sampler(MockVOCAlgorithm(100), bytes([msb, lsb, crc]), True, capture)
+    sampler.sample_and_store(False)
+    capture.close()
+
+    files = find_capture_files([tmp_path])
+    assert len(files) == 1
+    (_, captured_sraw, temperature, humidity), = read_capture(files[0])
+    assert (captured_sraw, temperature, humidity) == (sraw, 25.0, 50.0)
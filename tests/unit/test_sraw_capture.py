@@ -0,0 +1,105 @@
+import pytest
+from sensors import SRAWCapture, VOCReplayAlgorithm
+from sensors.sraw_capture import read_capture, find_capture_files, group_capture_streams, capture_file_name, CAPTURE_HEADER, CAPTURE_RECORD
+from sensors.voc_replay import replay_stream, algorithm_label
+from experimental.voc_index_calculator import VOCIndexCalculator
+
+# 2024-01-01T23:59:58Z
+EPOCH = 1704153598
+
+
+def write_capture(folder, count, flush_interval=60):
+    capture = SRAWCapture(folder, flush_interval)
+    samples = [(EPOCH + i, 30000 + i, 21.25 + i / 100, 45.5) for i in range(count)]
+    for sample in samples:
+        capture.append(*sample)
+    capture.close()
+    return capture, samples
+
+
+def test_capture_round_trip(tmp_path):
+    _, samples = write_capture(tmp_path, 2)
+    path = tmp_path / capture_file_name(EPOCH)
+    assert path.stat().st_size == CAPTURE_HEADER.size + 2 * CAPTURE_RECORD.size
+    assert read_capture(path) == samples
+
+
+def test_capture_files_are_daily(tmp_path):
+    _, samples = write_capture(tmp_path, 5)
+    files = find_capture_files([tmp_path])
+    assert [f.name for f in files] == ["sraw-20240101.bin", "sraw-20240102.bin"]
+    assert read_capture(files[0]) + read_capture(files[1]) == samples
+
+
+def test_capture_is_buffered(tmp_path):
+    capture = SRAWCapture(tmp_path, flush_interval=3)
+    capture.append(EPOCH - 10, 30000, 20.0, 50.0)
+    capture.append(EPOCH - 9, 30000, 20.0, 50.0)
+    assert not find_capture_files([tmp_path])
+
+    capture.append(EPOCH - 8, 30000, 20.0, 50.0)
+    assert len(read_capture(tmp_path / capture_file_name(EPOCH))) == 3
+
+
+def test_partial_record_is_ignored(tmp_path):
+    _, samples = write_capture(tmp_path, 2)
+    path = tmp_path / capture_file_name(EPOCH)
+    with open(path, "ab") as f:
+        f.write(b"\x01\x02\x03")
+    assert read_capture(path) == samples
+
+
+def test_invalid_capture_file(tmp_path):
+    path = tmp_path / "sraw-20240101.bin"
+    path.write_bytes(b"not a capture file")
+    with pytest.raises(ValueError):
+        read_capture(path)
+
+
+def test_invalid_flush_interval(tmp_path):
+    with pytest.raises(ValueError):
+        SRAWCapture(tmp_path, 0)
+
+
+def test_replay_stream_with_calculator(tmp_path):
+    _, samples = write_capture(tmp_path, 2)
+    path = tmp_path / capture_file_name(EPOCH)
+    [(replayed_path, rows, elapsed)] = replay_stream([path], VOCReplayAlgorithm.CALCULATOR, 0.01, 200.0)
+
+    calculator = VOCIndexCalculator(0.01, 200.0)
+    assert replayed_path == str(path)
+    assert rows == [(epoch, sraw, calculator.update(sraw)) for epoch, sraw, _, _ in samples]
+    assert elapsed >= 0
+
+
+def test_replay_stream_carries_state_between_files(tmp_path):
+    capture = SRAWCapture(tmp_path, 60)
+    samples = [(EPOCH + i, 30000 if i < 2 else 36000, 21.25, 45.5) for i in range(4)]
+    for sample in samples:
+        capture.append(*sample)
+    capture.close()
+    files = find_capture_files([tmp_path])
+    results = replay_stream(files, VOCReplayAlgorithm.CALCULATOR, 0.01, 200.0)
+
+    # The second day continues from the first, rather than starting cold at the neutral index
+    calculator = VOCIndexCalculator(0.01, 200.0)
+    assert [path for path, _, _ in results] == [str(f) for f in files]
+    assert results[0][1] + results[1][1] == [(epoch, sraw, calculator.update(sraw)) for epoch, sraw, _, _ in samples]
+    assert results[1][1][0][2] != 100
+
+
+def test_group_capture_streams(tmp_path):
+    first = tmp_path / "first"
+    second = tmp_path / "second"
+    names = ["sraw-20240102.bin", "sraw-20240101.bin"]
+    files = [first / names[0], second / names[1], first / names[1]]
+    streams = group_capture_streams(files)
+    assert [[f.name for f in stream] for stream in streams] == [names[::-1], names[1:]]
+    assert [f.parent for f in streams[0]] == [first, first]
+
+
+def test_algorithm_label():
+    assert algorithm_label("sensirion") == "sensirion"
+    assert algorithm_label("calculator", 0.002, 250.0) == "calculator:alpha=0.002:scale=250"
+    with pytest.raises(ValueError):
+        algorithm_label("unknown")
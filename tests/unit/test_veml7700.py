@@ -30,3 +30,41 @@ def test_veml7700_wrapper_normal_range(fixture):
     assert als == fixture["raw_als"]
     assert white == fixture["raw_white"]
     assert lux == pytest.approx(fixture["lux"], abs=0.2)
+
+
+def construct_sensor(als_bytes, gain, integration_time_ms):
+    bus = MockSMBus(None, { REG_ALS: als_bytes, REG_WHITE: als_bytes }, None)
+    device = I2CDevice(bus, MockSMBus.VEML7700_ADDRESS, None, None, MockI2CMsg())
+    return VEML7700(i2c_device=device, gain=gain, integration_time_ms=integration_time_ms)
+
+
+@pytest.mark.parametrize("als, gain, integration_time_ms, expected", [
+    # In range - no change
+    (100, 0.25, 100, (0.25, 100)),
+    (60000, 0.25, 100, (0.25, 100)),
+    # Saturated - least sensitive
+    (65535, 2.0, 800, (0.125, 25)),
+    # Dark - most sensitive
+    (0, 0.25, 100, (2.0, 800)),
+    # Low light - 60 counts x 128 = 7680, preferring the shorter of the equally sensitive settings
+    (60, 0.125, 25, (2.0, 200)),
+    # Bright - 62000 counts / 8 = 7750, preferring the shorter of the equally sensitive settings
+    (62000, 1.0, 100, (0.25, 50)),
+    # Already as sensitive or as insensitive as possible
+    (20, 2.0, 800, (2.0, 800)),
+    (62000, 0.125, 25, (0.125, 25))
+])
+def test_target_range(als, gain, integration_time_ms, expected):
+    sensor = construct_sensor([0, 0], gain, integration_time_ms)
+    assert sensor._target_range(als) == expected
+
+
+def test_autorange_reconfigures_in_one_step():
+    # Saturated at the most sensitive settings
+    sensor = construct_sensor([0xFF, 0xFF], 2.0, 25)
+    sensor.read()
+
+    status = sensor.ranging_status()
+    assert (status["gain"], status["integration_time_ms"]) == (0.125, 25)
+    assert status["reconfigurations"] == 1
+    assert status["reconfigurations_per_hour"] == 1
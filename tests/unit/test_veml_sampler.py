@@ -1,4 +1,5 @@
 import pytest
+import time
 from registry import AppSettings, DeviceFactory, DeviceType
 from service import VEML7700Sampler
 from helpers import MockSMBus, MockI2CMsg, MockDatabase
@@ -6,12 +7,14 @@ from helpers import MockSMBus, MockI2CMsg, MockDatabase
 REG_ALS = 0x04
 REG_WHITE = 0x05
 
-def construct_sampler(als_data, white_data, enabled):
+def construct_sampler(als_data, white_data, enabled, wait_until_ready=True):
     settings = AppSettings(AppSettings.default_settings_file())
     bus = MockSMBus(None, { REG_ALS: als_data, REG_WHITE: white_data }, None)
     i2c_msg = MockI2CMsg()
     factory = DeviceFactory(bus, i2c_msg, None, settings)
     sensor = factory.create_device(DeviceType.VEML7700)
+    if wait_until_ready:
+        time.sleep(max(0.0, sensor.ready_at - time.monotonic()))
     return VEML7700Sampler(sensor, enabled, MockDatabase())
 
 
@@ -25,9 +28,9 @@ def test_veml7700_wrapper_normal_range(fixture):
 
     assert True == sampler.is_enabled
     assert True == sampler.is_available
-    assert readings["als"] == fixture["raw_als"]
-    assert readings["white"] == fixture["raw_white"]
-    assert readings["illuminance_lux"] == pytest.approx(fixture["lux"], abs=0.2)
+    assert readings.als == fixture["raw_als"]
+    assert readings.white == fixture["raw_white"]
+    assert readings.illuminance_lux == pytest.approx(fixture["lux"], abs=0.2)
 
 
 def test_veml7700_sampler_disabled_on_start():
@@ -57,12 +60,39 @@ def test_veml7700_wrapper_normal_range(fixture):
     readings = sampler.latest
 
     assert True == sampler.is_enabled
-    assert readings["als"] == fixture["raw_als"]
-    assert readings["white"] == fixture["raw_white"]
-    assert readings["illuminance_lux"] == pytest.approx(fixture["lux"], abs=0.2)
+    assert readings.als == fixture["raw_als"]
+    assert readings.white == fixture["raw_white"]
+    assert readings.illuminance_lux == pytest.approx(fixture["lux"], abs=0.2)
 
 
 def test_veml7700_sampler_with_no_sensor():
     sampler = VEML7700Sampler(None, True, MockDatabase())
     assert False == sampler.is_enabled
     assert False == sampler.is_available
+
+
+def test_non_blocking_sampler_waits_for_valid_reading():
+    # The sensor's configured as non-blocking, so there's no reading until the first integration period
+    # after start-up is complete
+    sampler = construct_sampler([40, 92], [40, 92], True, False)
+    ready_at = sampler.sample_and_store()
+
+    assert ready_at == sampler.sensor.ready_at
+    assert None == sampler.latest
+
+    time.sleep(max(0.0, ready_at - time.monotonic()))
+    assert None == sampler.sample_and_store()
+    assert 23592 == sampler.latest.als
+
+
+def test_non_blocking_reconfiguration_defers_reading():
+    # A dark reading reconfigures the sensor to maximum sensitivity, which needs an 800 ms integration
+    # period before there's a valid reading
+    sampler = construct_sampler([0, 0], [0, 0], True)
+    start = time.monotonic()
+    ready_at = sampler.sample_and_store()
+
+    assert time.monotonic() - start < 0.1
+    assert ready_at == pytest.approx(start + 0.8, abs=0.1)
+    assert None == sampler.latest
+    assert 1 == sampler.sensor.ranging_status()["reconfigurations"]
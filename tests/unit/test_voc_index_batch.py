@@ -0,0 +1,74 @@
+import numpy as np
+import pytest
+from experimental.voc_index_calculator import VOCIndexCalculator
+from experimental.voc_index_sweep import evaluate, sweep, CLASS_LABELS
+
+
+def generate_raw(count, seed=1):
+    generator = np.random.default_rng(seed)
+    return (30000 + np.cumsum(generator.normal(0, 20, count))).astype(np.int64)
+
+
+def update_scalar(calculator, raw):
+    return [calculator.update(int(value)) for value in raw]
+
+
+@pytest.mark.parametrize("alpha, scale", [(0.001, 300.0), (0.05, 100.0), (0.5, 500.0), (1.0, 300.0), (0.0, 300.0)])
+def test_batch_matches_scalar_update(alpha, scale):
+    raw = generate_raw(50000)
+    scalar = VOCIndexCalculator(alpha, scale)
+    batch = VOCIndexCalculator(alpha, scale)
+
+    assert update_scalar(scalar, raw) == batch.update_batch(raw).tolist()
+    assert batch.state.baseline == pytest.approx(scalar.state.baseline, rel=1e-12)
+
+
+def test_batch_resumes_from_state():
+    raw = generate_raw(10000)
+    whole = VOCIndexCalculator().update_batch(raw)
+
+    # Split into batches, restoring the state saved after the first into a new instance
+    first = VOCIndexCalculator()
+    head = first.update_batch(raw[:3333])
+    resumed = VOCIndexCalculator()
+    resumed.set_states(*first.get_states())
+    tail = resumed.update_batch(raw[3333:])
+
+    assert whole.tolist() == head.tolist() + tail.tolist()
+
+
+def test_batch_follows_scalar_updates():
+    raw = generate_raw(1000)
+    scalar = VOCIndexCalculator()
+    expected = update_scalar(scalar, raw)
+
+    calculator = VOCIndexCalculator()
+    indices = update_scalar(calculator, raw[:10]) + calculator.update_batch(raw[10:]).tolist()
+    assert indices == expected
+
+
+def test_empty_batch():
+    calculator = VOCIndexCalculator()
+    assert len(calculator.update_batch([])) == 0
+    assert calculator.state.baseline is None
+
+
+def test_evaluate_against_reference():
+    raw = generate_raw(5000)
+    reference = VOCIndexCalculator(0.002, 200.0).update_batch(raw).astype(np.float64)
+    reference[:100] = np.nan
+
+    result = evaluate(raw, reference, 0.002, 200.0)
+    assert result["rmse"] == 0.0
+    assert result["correlation"] == pytest.approx(1.0)
+    assert sum(result["classes"].values()) == pytest.approx(1.0)
+    assert list(result["classes"]) == CLASS_LABELS
+
+
+def test_sweep_evaluates_all_pairs_in_order():
+    raw = generate_raw(2000)
+    parameters = [(0.001, 100.0), (0.001, 300.0), (0.01, 200.0)]
+    results = sweep(raw, None, parameters, workers=2)
+
+    assert [(r["alpha"], r["scale"]) for r in results] == parameters
+    assert results == [evaluate(raw.astype(np.float64), None, *p) for p in parameters]
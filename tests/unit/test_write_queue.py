@@ -0,0 +1,129 @@
+import pytest
+import sqlite3
+import time
+from db import Database, WriteQueue, OverflowPolicy
+from helpers import MockDatabase
+
+
+def test_readings_are_batched_by_count():
+    database = MockDatabase()
+    queue = WriteQueue(database, max_batch_size=3, max_batch_age=3600)
+    queue.start()
+    for i in range(6):
+        queue.insert_bme_row(21.0 + i, 1013.0, 50.0)
+    assert queue.flush(5.0)
+    queue.close()
+
+    assert 2 == len(database.batches)
+    assert [3, 3] == [len(b) for b in database.batches]
+    assert 6 == queue.metrics["written"]
+    assert 2 == queue.metrics["batches"]
+    assert 0 == queue.metrics["queue_depth"]
+
+
+def test_readings_are_flushed_by_age():
+    database = MockDatabase()
+    queue = WriteQueue(database, max_batch_size=100, max_batch_age=0.05)
+    queue.start()
+    queue.insert_veml_row(100, 120, 23.04, False)
+
+    # Wait for the writer thread to write the batch once it's old enough, without requesting a flush
+    deadline = time.monotonic() + 5.0
+    while queue.metrics["written"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert 1 == queue.metrics["written"]
+    queue.close()
+
+    assert 1 == len(database.batches)
+    reading_type, timestamp, values = database.batches[0][0]
+    assert "VEML7700" == reading_type
+    assert timestamp.endswith("Z")
+    assert (100, 120, 23.04, False) == values
+
+
+def test_close_writes_queued_readings():
+    database = MockDatabase()
+    queue = WriteQueue(database, max_batch_size=100, max_batch_age=3600)
+    queue.start()
+    queue.insert_sgp_row(30000, 100, "Good", "****")
+    queue.insert_sgp_row(30001, 101, "Good", "****")
+    queue.close()
+
+    assert 2 == sum(len(b) for b in database.batches)
+    assert not queue.is_alive()
+
+
+def test_close_without_start_writes_queued_readings():
+    database = MockDatabase()
+    queue = WriteQueue(database, max_batch_size=100, max_batch_age=3600)
+    queue.insert_bme_row(21.0, 1013.0, 50.0)
+    queue.close()
+
+    assert 1 == len(database.batches)
+
+
+@pytest.mark.parametrize("policy, expected_enqueued, expected_first", [
+    (OverflowPolicy.DROP_OLDEST, 5, 2),
+    (OverflowPolicy.DROP_NEWEST, 3, 0),
+])
+def test_overflow_policy(policy, expected_enqueued, expected_first):
+    # The writer thread isn't started, so the queue fills up
+    database = MockDatabase()
+    queue = WriteQueue(database, max_batch_size=2, max_batch_age=3600, max_queue_size=3, overflow_policy=policy)
+    for i in range(5):
+        queue.insert_bme_row(i, 1013.0, 50.0)
+
+    assert 3 == queue.metrics["queue_depth"]
+    assert 2 == queue.metrics["dropped"]
+    assert expected_enqueued == queue.metrics["enqueued"]
+
+    queue.close()
+    readings = [r for b in database.batches for r in b]
+    assert expected_first == readings[0][2][0]
+
+
+def test_block_policy_times_out():
+    database = MockDatabase()
+    queue = WriteQueue(database, max_batch_size=1, max_batch_age=3600, max_queue_size=1,
+                       overflow_policy=OverflowPolicy.BLOCK, block_timeout=0.01)
+    queue.insert_bme_row(21.0, 1013.0, 50.0)
+    queue.insert_bme_row(22.0, 1013.0, 50.0)
+
+    assert 1 == queue.metrics["dropped"]
+    queue.close()
+
+
+def test_failed_batches_are_retained():
+    database = MockDatabase(fail_writes=True)
+    queue = WriteQueue(database, max_batch_size=1, max_batch_age=3600)
+    queue.start()
+    queue.insert_bme_row(21.0, 1013.0, 50.0)
+    assert not queue.flush(0.2)
+
+    metrics = queue.metrics
+    assert metrics["failed_batches"] >= 1
+    assert 0 == metrics["written"]
+    assert 1 == metrics["queue_depth"]
+
+    # Allow the retry to succeed
+    database.fail_writes = False
+    assert queue.flush(5.0)
+    queue.close()
+    assert 1 == queue.metrics["written"]
+
+
+def test_batch_written_to_database(tmp_path):
+    database = Database(str(tmp_path / "weather.db"), 0, 1, "0x76", "0x10", 0.25, 100, "0x59")
+    database.create_database()
+    queue = WriteQueue(database, max_batch_size=10, max_batch_age=3600)
+    queue.start()
+    for i in range(25):
+        queue.insert_bme_row(21.0, 1013.0, 50.0)
+        queue.insert_veml_row(100, 120, 23.04, False)
+    queue.close()
+    database.close()
+
+    with sqlite3.connect(database.db_path) as con:
+        assert 25 == con.execute("SELECT COUNT(*) FROM BME280_READINGS;").fetchone()[0]
+        assert 25 == con.execute("SELECT COUNT(*) FROM VEML7700_READINGS;").fetchone()[0]
+    assert queue.metrics["mean_flush_latency_ms"] is not None